@@ -224,6 +224,7 @@ def flush():
 # download FFDC file
 import requests
 import time
+import hashlib
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
 
@@ -254,19 +255,50 @@ def download_ffdc(ip, login_account, login_password, download_uri):
             return
 
         jsonHeader = {"X-Auth-Token":x_auth_token, "Content-Type":"application/json"}
-        # Download FFDC file
+        # Download FFDC file, stream it to disk chunk by chunk and resume it by Range when connection is dropped
         if utils.g_CAFILE is not None and utils.g_CAFILE != "":
-            response_download_uri = requests.get(download_uri, headers=jsonHeader, verify=utils.g_CAFILE)
+            verify = utils.g_CAFILE
         else:
-            response_download_uri = requests.get(download_uri, headers=jsonHeader, verify=False)
-        if response_download_uri.status_code == 200:
-            ffdc_file_name = download_uri.split('/')[-1]
-            get_cwd = os.getcwd()
-            with open(os.getcwd() + os.sep + ffdc_file_name, 'wb') as f:
-                f.write(response_download_uri.content)
-                download_sign = True
+            verify = False
+        ffdc_file_name = download_uri.split('/')[-1]
+        ffdc_file_path = os.getcwd() + os.sep + ffdc_file_name
+        offset = 0
+        total_size = None
+        sha256 = hashlib.sha256()
+        with open(ffdc_file_path, 'wb') as f:
+            for attempt in range(4):
+                headers = dict(jsonHeader)
+                if offset > 0:
+                    headers["Range"] = "bytes=%s-" % offset
+                try:
+                    response_download_uri = requests.get(download_uri, headers=headers, verify=verify, stream=True, timeout=(10, 60))
+                    if response_download_uri.status_code == 200 and offset > 0:
+                        # Range is not supported, download from the beginning again
+                        offset = 0
+                        sha256 = hashlib.sha256()
+                        f.seek(0)
+                        f.truncate()
+                    elif response_download_uri.status_code not in [200, 206]:
+                        print("response manaegr uri Error code %s" %response_download_uri.status_code)
+                        break
+                    if total_size is None and response_download_uri.headers.get('Content-Length', '').isdigit():
+                        total_size = offset + int(response_download_uri.headers['Content-Length'])
+                    for chunk in response_download_uri.iter_content(chunk_size=1024*1024):
+                        f.write(chunk)
+                        sha256.update(chunk)
+                        offset += len(chunk)
+                    if total_size is None or offset == total_size:
+                        download_sign = True
+                        break
+                except requests.exceptions.RequestException as e:
+                    print("Download is interrupted at byte %s, resume it. %s" % (offset, e))
+                time.sleep(2)
+        # Check size of file downloaded
+        if download_sign and os.path.getsize(ffdc_file_path) == offset:
+            print("FFDC file %s is downloaded, size is %s, sha256 is %s." % (ffdc_file_path, offset, sha256.hexdigest()))
         else:
-            print("response manaegr uri Error code %s" %response_download_uri.status_code)
+            download_sign = False
+            print("Failed to download complete FFDC file, %s bytes of %s are received." % (offset, total_size))
     except Exception as e:
         print(e)
     finally:
@@ -25,4 +25,13 @@ from .system_client import SystemClient
 from .chassis_client import ChassisClient
 from .update_client import UpdateClient
 from .account_client import AccountClient
-from .redfish_base import RedfishBase
\ No newline at end of file
+from .redfish_base import RedfishBase
+from .redfish_session import LenovoRedfishSession
+from .fleet import FleetExecutor, run_fleet, read_targets
+from .async_redfish_base import AsyncRedfishBase
+from .async_client import AsyncClient, run_async_clients
+from .task_monitor import TaskHandle, TaskWatcher, get_task_watcher
+from .upload_receiver import UploadReceiver
+from .image_server import ImageServer
+from .deadline import Deadline, DeadlineExceeded, OperationCancelled, deadline_scope
+from .request_profiler import RequestProfiler, add_default_request_hook, remove_default_request_hook
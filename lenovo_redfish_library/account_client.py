@@ -30,12 +30,12 @@ class AccountClient(RedfishBase):
     """A client for managing accounts"""
 
     def __init__(self, ip='', username='', password='',
-                 configfile='config.ini', auth=''):
+                 configfile='config.ini', auth='', session=None):
         """Initialize AccountClient"""
 
         super(AccountClient, self).__init__(
             ip=ip, username=username, password=password, 
-            configfile=configfile, auth=auth
+            configfile=configfile, auth=auth, session=session
         )
 
     #############################################
@@ -78,11 +78,6 @@ class AccountClient(RedfishBase):
     # functions for setting information.
     #############################################
 
-    def _check_bmc_type(self):
-        manager_url = self._find_manager_resource()
-        bmc_type = 'TSM' if 'Self' in manager_url else 'XCC'
-        return bmc_type
-
     PRIVILEGES_XCC = [
         "UserAccountManagement",
         "RemoteConsoleAccess",
@@ -114,16 +109,11 @@ class AccountClient(RedfishBase):
         result = {}
         try:
             roles_url = '/redfish/v1/AccountService/Roles'
-            response = self.get(roles_url)
-            post_flag = False
-            for item in response.getheaders():
-                if item[0].upper() == 'ALLOW' and 'POST' in item[1].upper():
-                    post_flag = True
-                    break
+            post_flag = 'POST' in self._get_allowed_methods(roles_url)
             if post_flag == False:
                 return {'ret': False, 'msg': "This version of bmc does not support adding new role."}
              
-            bmc_type = self._check_bmc_type()
+            bmc_type = self._get_bmc_type()
             
             # Check if privileges are correct.
             privileges_allowable = None  
@@ -182,13 +172,7 @@ class AccountClient(RedfishBase):
         result = {}
         try:
             accounts_url = '/redfish/v1/AccountService/Accounts'
-            
-            response = self.get(accounts_url)
-            post_flag = False
-            for item in response.getheaders():
-                if item[0].upper() == 'ALLOW' and 'POST' in item[1].upper():
-                    post_flag = True
-                    break
+            post_flag = 'POST' in self._get_allowed_methods(accounts_url)
 
             # Set user role
             # for TSM, accept 'Supervisor', 'Administrator', 'Operator' and 'ReadOnly'
@@ -282,7 +266,7 @@ class AccountClient(RedfishBase):
                         privileges_allowable = result_role['entries']['OemPrivileges@Redfish.AllowableValues']
                     
                     if privileges_allowable == None:
-                        bmc_type = self._check_bmc_type()
+                        bmc_type = self._get_bmc_type()
                         if bmc_type == 'XCC':
                             privileges_allowable = self.PRIVILEGES_XCC
                         else:
@@ -0,0 +1,436 @@
+###
+#
+# Lenovo Redfish Library - AsyncClient Class, asyncio version of read-only getters
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import asyncio
+import traceback
+
+from .async_redfish_base import AsyncRedfishBase
+from .utils import *
+
+
+class AsyncClient(AsyncRedfishBase):
+    """A asyncio client for getting inventory, power, thermal, logs and firmware info.
+    Each function is a coroutine returning the same result as the one of SystemClient,
+    ManagerClient, ChassisClient or UpdateClient with the same name.
+    """
+
+    #############################################
+    # functions for getting system information.
+    #############################################
+
+    async def get_cpu_inventory(self):
+        """Get cpu inventory
+        :returns: returns List of all cpu inventory when succeeded or error message when failed
+        """
+        try:
+            system_url = await self._find_system_resource()
+            result = await self._get_collection(system_url + '/Processors')
+            if result['ret'] == False:
+                return result
+
+            list_cpu_info = []
+            for member in result['entries']:
+                if member["Status"]["State"] != 'Absent':
+                    list_cpu_info.append(propertyFilter(member))
+            return {'ret': True, 'entries': list_cpu_info}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get cpu inventory. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_memory_inventory(self, id=None):
+        """Get memory inventory
+        :params id: Memory member id
+        :type id: None or String of id
+        :returns: returns List of all memory inventory when succeeded or error message when failed
+        """
+        try:
+            system_url = await self._find_system_resource()
+            result = await self._get_collection(system_url + '/Memory')
+            if result['ret'] == False:
+                return result
+
+            list_memory_info = []
+            if id == None:
+                for member in result['entries']:
+                    if member["Status"]["State"] != 'Absent':
+                        list_memory_info.append(member)
+            else:
+                for member in result['entries']:
+                    if id == member['Id']:
+                        list_memory_info.append(member)
+                        break
+                if len(list_memory_info) == 0:
+                    return {'ret': False, 'msg': "Failed to find the memory with id %s. \
+                              Please check if the id is correct." % id}
+
+            entries = [propertyFilter(member) for member in list_memory_info]
+            return {'ret': True, 'entries': entries}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get memory inventory. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_system_ethernet_interfaces(self):
+        """Get system EthernetInterfaces
+        :returns: returns List of all system EthernetInterfaces when succeeded or error message when failed
+        """
+        try:
+            system_url = await self._find_system_resource()
+            result = await self._get_collection(system_url + '/EthernetInterfaces')
+            if result['ret'] == False:
+                return result
+
+            list_nic_info = []
+            for member in result['entries']:
+                nic_info = {}
+                for key in member.keys():
+                    if key not in common_property_excluded and 'Redfish.Deprecated' not in key:
+                        nic_info[key] = member[key]
+                list_nic_info.append(nic_info)
+            return {'ret': True, 'entries': list_nic_info}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get system ethernet interfaces. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_system_power_state(self):
+        """Get system's power state
+        :returns: returns Dict of system power state when succeeded or error message when failed
+        """
+        try:
+            system_url = await self._find_system_resource()
+            result = await self._get_url(system_url)
+            if result['ret'] == False:
+                return result
+            return {'ret': True, 'entries': {'PowerState': result['entries']['PowerState']}}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get system power state. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_system_inventory(self):
+        """Get System inventory
+        :returns: returns Dict of system inventory when succeeded or error message when failed
+        """
+        try:
+            system_url = await self._find_system_resource()
+            result_system, result = await asyncio.gather(self._get_url(system_url),
+                                                         self.get_system_ethernet_interfaces())
+            if result_system['ret'] == False:
+                return result_system
+            system_info = propertyFilter(result_system['entries'], \
+                common_property_excluded + ['Processors', 'Memory', \
+                'SecureBoot', 'Storage', 'PCIeDevices', 'PCIeFunctions', \
+                'LogServices', 'PCIeDevices@odata.count', 'PCIeFunctions@odata.count'])
+            if result['ret'] == True:
+                system_info['EthernetInterfaces'] = result['entries']
+            return {'ret': True, 'entries': system_info}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get system inventory. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    #############################################
+    # functions for getting bmc information.
+    #############################################
+
+    async def _get_bmc_resource(self, subpath, name, collection=True):
+        try:
+            manager_url = await self._find_manager_resource()
+            if collection:
+                result = await self._get_collection(manager_url + subpath)
+            else:
+                result = await self._get_url(manager_url + subpath)
+            if result['ret'] == False:
+                return result
+            return {'ret': True, 'entries': propertyFilter(result['entries'])}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get bmc's %s. Error message: %s" % (name, repr(e))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_bmc_networkprotocol(self):
+        """Get bmc network protocol which provide bmc's network services info.
+        :returns: returns Dict of bmc networkprotocol when succeeded or error message when failed
+        """
+        return await self._get_bmc_resource('/NetworkProtocol', 'networkprotocol', collection=False)
+
+    async def get_bmc_serialinterfaces(self):
+        """Get bmc serial interfaces
+        :returns: returns List of bmc serial interfaces when succeeded or error message when failed
+        """
+        return await self._get_bmc_resource('/SerialInterfaces', 'serialinterfaces')
+
+    async def get_bmc_ethernet_interfaces(self):
+        """Get bmc ethernet interfaces
+        :returns: returns List of bmc nic when succeeded or error message when failed
+        """
+        return await self._get_bmc_resource('/EthernetInterfaces', 'ethernet interfaces')
+
+    async def get_bmc_hostinterfaces(self):
+        """Get bmc Host Interfaces
+        :returns: returns List of bmc host interfaces when succeeded or error message when failed
+        """
+        result = await self._get_bmc_resource('/HostInterfaces', 'host interfaces')
+        if result['ret'] == False:
+            return result
+        try:
+            for member in result['entries']:
+                if 'HostEthernetInterfaces' in member.keys():
+                    result_host_eth = await self._get_collection(member["HostEthernetInterfaces"]['@odata.id'])
+                    if result_host_eth['ret'] == False:
+                        return result_host_eth
+                    member['HostEthernetInterfaces'] = propertyFilter(result_host_eth['entries'])
+                if 'ManagerEthernetInterface' in member.keys():
+                    result_manager_eth = await self._get_url(member["ManagerEthernetInterface"]['@odata.id'])
+                    if result_manager_eth['ret'] == False:
+                        return result_manager_eth
+                    member['ManagerEthernetInterface'] = propertyFilter(result_manager_eth['entries'])
+            return result
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get bmc's host interfaces. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_bmc_inventory(self):
+        """Get bmc inventory
+        :returns: returns Dict of bmc inventory when succeeded or error message when failed
+        """
+        try:
+            manager_url = await self._find_manager_resource()
+            results = await asyncio.gather(self._get_url(manager_url),
+                                           self.get_bmc_networkprotocol(),
+                                           self.get_bmc_serialinterfaces(),
+                                           self.get_bmc_ethernet_interfaces(),
+                                           self.get_bmc_hostinterfaces())
+            if results[0]['ret'] == False:
+                return results[0]
+            bmc_info = propertyFilter(results[0]['entries'])
+            names = ['NetworkProtocol', 'SerialInterfaces', 'EthernetInterfaces', 'HostInterfaces']
+            for name, result in zip(names, results[1:]):
+                if result['ret'] == True:
+                    bmc_info[name] = result['entries']
+            return {'ret': True, 'entries': bmc_info}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get bmc inventory. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_event_log(self, type='manager'):
+        """Get event logs
+        :params type: 'system', 'manager' or 'chassis'
+        :type type: string
+        :returns: returns List of event logs
+        """
+        try:
+            if type not in ['system', 'manager', 'chassis']:
+                return {'ret': False, 'msg': "Please specify type in ['system', 'manager', 'chassis']."}
+
+            if type == "system":
+                resource_url = await self._find_system_resource()
+            elif type == "manager":
+                resource_url = await self._find_manager_resource()
+            else:
+                resource_url = await self._find_chassis_resource()
+            result = await self._get_url(resource_url)
+            if result['ret'] == False:
+                return result
+            result = await self._get_collection(result['entries']['LogServices']['@odata.id'])
+            if result['ret'] == False:
+                return result
+
+            services = result['entries']
+            results = await asyncio.gather(*[self._get_collection(member['Entries']['@odata.id']) for member in services])
+            log_details = []
+            for member, result in zip(services, results):
+                if result['ret'] == False:
+                    return result
+                log_details.append({'Id': member['Id'], 'Entries': propertyFilter(result['entries'])})
+            return {'ret': True, 'entries': log_details}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get event logs. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    #############################################
+    # functions for getting chassis information.
+    #############################################
+
+    async def _get_thermal_info(self, property, name, excluded=None):
+        try:
+            chassis_url = await self._find_chassis_resource()
+            result = await self._get_url(chassis_url + '/Thermal')
+            if result['ret'] == False:
+                return result
+            list_info = []
+            if property in result['entries']:
+                list_info = propertyFilter(result['entries'][property], excluded or common_property_excluded)
+            return {'ret': True, 'entries': list_info}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get %s inventory. Error message: %s" % (name, repr(e))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_fan_inventory(self):
+        """Get Fan devices inventory
+        :returns: returns List of all Fan devices when succeeded or error message when failed
+        """
+        return await self._get_thermal_info('Fans', 'fan devices', common_property_excluded + ['Oem'])
+
+    async def get_temperatures_inventory(self):
+        """Get temperatures inventory
+        :returns: returns List of all temperatures when succeeded or error message when failed
+        """
+        return await self._get_thermal_info('Temperatures', 'temperatures')
+
+    async def _get_power_info(self, property=None):
+        """Get property info from chassis power info
+        :returns: returns List of property info of power when succeeded or error message when failed
+        """
+        try:
+            chassis_url = await self._find_chassis_resource()
+            result = await self._get_url(chassis_url + '/Power')
+            if result['ret'] == False:
+                return result
+
+            if property == None:
+                return {'ret': True, 'entries': propertyFilter(result['entries'])}
+
+            list_property_info = []
+            if property in result['entries']:
+                list_property_info = propertyFilter(result['entries'][property])
+            return {'ret': True, 'entries': list_property_info}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get %s info. Error message: %s" % (property, repr(e))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def get_psu_inventory(self):
+        """Get PSU devices inventory
+        :returns: returns List of all PSU devices when succeeded or error message when failed
+        """
+        return await self._get_power_info('PowerSupplies')
+
+    async def get_power_redundancy(self):
+        """Get power redundancy info
+        :returns: returns List of power redundancy info when succeeded or error message when failed
+        """
+        return await self._get_power_info('Redundancy')
+
+    async def get_power_voltages(self):
+        """Get power voltages info
+        :returns: returns List of power voltages info when succeeded or error message when failed
+        """
+        return await self._get_power_info('Voltages')
+
+    async def get_power_metrics(self):
+        """Get power metrics info
+        :returns: returns Dict of power metrics of whole system when succeeded or error message when failed
+        """
+        result = await self._get_power_info('PowerControl')
+        if result['ret'] == False:
+            return result
+        for member in result['entries']:
+            if 'PowerMetrics' in member and 'Name' in member:
+                return {'ret': True, 'entries': member['PowerMetrics']}
+        return {'ret': False, 'msg': "No power metrics exist."}
+
+    async def get_power_limit(self):
+        """Get power limit info
+        :returns: returns Dict of power limit of whole system when succeeded or error message when failed
+        """
+        result = await self._get_power_info('PowerControl')
+        if result['ret'] == False:
+            return result
+        for member in result['entries']:
+            if 'PowerLimit' in member:
+                return {'ret': True, 'entries': member['PowerLimit']}
+        return {'ret': False, 'msg': "No power limit exist."}
+
+    #############################################
+    # functions for getting firmware information.
+    #############################################
+
+    async def get_firmware_inventory(self):
+        """Get firmware inventory
+        :returns: returns List of firmwares when succeeded or error message when failed
+        """
+        try:
+            result = await self._get_url('/redfish/v1/UpdateService')
+            if result['ret'] == False:
+                return result
+
+            result = await self._get_collection(result['entries']['FirmwareInventory']['@odata.id'])
+            if result['ret'] == False:
+                return result
+            return {'ret': True, 'entries': propertyFilter(result['entries'])}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get firmware inventory. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+
+def run_async_clients(targets, method, *args, **kwargs):
+    """Call one function of AsyncClient for each target in one event loop
+    :params targets: list of targets, like [{'ip': ip, 'user': user, 'password': password, 'auth': auth}]
+    :type targets: list
+    :params method: name of AsyncClient function, like 'get_cpu_inventory'
+    :type method: string
+    :params args/kwargs: parameters of function. 'configfile' in kwargs is used to create client.
+    :returns: returns List of results of all targets, with 'ip' added
+    """
+    configfile = kwargs.pop('configfile', 'config.ini')
+
+    async def run_target(target):
+        try:
+            client = AsyncClient(ip=target['ip'], username=target.get('user', ''),
+                                 password=target.get('password', ''), configfile=configfile,
+                                 auth=target.get('auth', ''))
+            async with client:
+                result = await getattr(client, method)(*args, **kwargs)
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            result = {'ret': False, 'msg': "Failed to run on %s. Error message: %s" % (target['ip'], repr(e))}
+        data = {'ip': target['ip']}
+        data.update(result)
+        return data
+
+    async def run_all():
+        return await asyncio.gather(*[run_target(target) for target in targets])
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(run_all())
+    finally:
+        loop.close()
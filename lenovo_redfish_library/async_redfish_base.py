@@ -0,0 +1,311 @@
+###
+#
+# Lenovo Redfish Library - Base class of asyncio redfish client
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import ssl
+import json
+import base64
+import asyncio
+import traceback
+
+from .utils import *
+from .redfish_base import DEFAULT_MAX_WORKERS, get_expand_query, get_collection_key
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncRedfishBase(object):
+    """Base class for accessing lenovo Redfish service with asyncio.
+    One event loop can hold conversations with thousands of BMCs, no thread is needed for each BMC.
+    Functions return the same result as RedfishBase, like {'ret': True, 'entries': ...}.
+
+    Example:
+        async def power_state(ip):
+            async with AsyncClient(ip=ip, username='USERID', password='PASSW0RD') as client:
+                return await client.get_system_power_state()
+        results = asyncio.get_event_loop().run_until_complete(asyncio.gather(*[power_state(ip) for ip in ips]))
+    """
+
+    def __init__(self, ip='', username='', password='',
+                 configfile='config.ini', auth='', max_workers=None):
+        """Initialize AsyncRedfishBase
+
+        :param ip: The url of the remote system
+        :type ip: str
+        :param username: The user name used for authentication
+        :type username: str
+        :param password: The password used for authentication
+        :type password: str
+        :param configfile: config.ini file
+        :type configfile: str
+        :param auth: basic or session
+        :type auth: str
+        :param max_workers: maximum concurrent requests to this bmc, default is MaxWorkers of config file
+        :type max_workers: int
+        """
+        if aiohttp is None:
+            raise Exception("Please install python package 'aiohttp' to use asyncio clients.")
+
+        self._ip = ip
+        self._user = username
+        self._password = password
+        self._auth = auth
+        self._systemid = ''
+        self._managerid = ''
+        self._chassisid = ''
+        self._cafile = ''
+        self._suburl_system = ''
+        self._suburl_manager = ''
+        self._suburl_chassis = ''
+        self._max_workers = DEFAULT_MAX_WORKERS
+        self._protocol_features = None
+        self._expand_query = None
+        # Collections rejecting $expand although the service announces it
+        self._expand_rejected = set()
+        self._session_key = None
+        self._session_location = None
+        self._authorization_key = None
+        self._http = None
+        self._slots = None
+
+        result = read_config(configfile)
+        if result['ret'] == True:
+            if self._ip == '' or self._ip == None:
+                self._ip = result['entries']['bmcip']
+            if self._user == '' or self._user == None:
+                self._user = result['entries']['bmcusername']
+            if self._password == '' or self._password == None:
+                self._password = result['entries']['bmcuserpassword']
+            if (self._auth == '' or self._auth == None) and result['entries']['auth'] != '':
+                self._auth = result['entries']['auth']
+
+            self._systemid = result['entries']['systemid']
+            self._managerid = result['entries']['managerid']
+            self._cafile = result['entries']['cafile']
+            if 'maxworkers' in result['entries'] and result['entries']['maxworkers'] != '':
+                self._max_workers = int(result['entries']['maxworkers'])
+        if max_workers != None:
+            self._max_workers = int(max_workers)
+
+        if self._auth not in ['session', 'basic']:
+            self._auth = 'session'
+
+        if not self._user  or not self._password or not self._ip:
+            raise Exception("Please check ip, user and password are correct.")
+
+        self._base_url = "https://" + self._ip
+
+    async def __aenter__(self):
+        try:
+            await self.login()
+        except BaseException:
+            # __aexit__ is not called when __aenter__ fails, close the http session here
+            await self._close_http()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.logout()
+
+    def _get_http(self):
+        # aiohttp session must be created inside the running event loop.
+        if self._http is None:
+            if self._cafile is not None and self._cafile != "":
+                ssl_context = ssl.create_default_context(cafile=self._cafile)
+            else:
+                # Ignore SSL Certificates
+                ssl_context = False
+            connector = aiohttp.TCPConnector(ssl=ssl_context, limit=max(1, self._max_workers))
+            self._http = aiohttp.ClientSession(connector=connector)
+            self._slots = asyncio.Semaphore(max(1, self._max_workers))
+        return self._http
+
+    def _get_headers(self, headers=None):
+        headers = dict(headers) if headers else {}
+        if self._session_key:
+            headers['X-Auth-Token'] = self._session_key
+        elif self._authorization_key:
+            headers['Authorization'] = self._authorization_key
+        headers.setdefault('Accept', '*/*')
+        headers.setdefault('OData-Version', '4.0')
+        return headers
+
+    async def _request(self, method, suburl, body=None, headers=None):
+        """Send one request
+        :returns: returns Tuple of (status, headers, dict of body)
+        """
+        http = self._get_http()
+        url = suburl if suburl.startswith('http') else self._base_url + suburl
+        data = None
+        headers = self._get_headers(headers)
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+            data = json.dumps(body)
+        async with self._slots:
+            async with http.request(method, url, data=data, headers=headers) as resp:
+                text = await resp.text()
+                try:
+                    resp_dict = json.loads(text) if text else {}
+                except ValueError:
+                    resp_dict = {}
+                return resp.status, resp.headers, resp_dict
+
+    async def login(self):
+        if self._auth == 'basic':
+            auth_key = base64.b64encode(('%s:%s' % (self._user, self._password)).encode('utf-8')).decode('utf-8')
+            self._authorization_key = 'Basic %s' % auth_key
+            status, headers, resp_dict = await self._request('GET', '/redfish/v1/SessionService/Sessions')
+            if status == 401:
+                self._authorization_key = None
+                raise Exception("HTTP 401 Unauthorized returned: Invalid credentials supplied")
+            return
+
+        body = {'UserName': self._user, 'Password': self._password}
+        status, headers, resp_dict = await self._request('POST', '/redfish/v1/SessionService/Sessions', body=body)
+        if status not in [200, 201, 202, 204] or 'X-Auth-Token' not in headers:
+            raise Exception("HTTP %s: Failed to create the session. %s" % (status, resp_dict))
+        self._session_key = headers['X-Auth-Token']
+        self._session_location = headers.get('Location')
+
+    async def logout(self):
+        try:
+            if self._session_key and self._session_location:
+                location = self._session_location
+                if location.startswith('http'):
+                    location = '/' + location.split('/', 3)[3]
+                await self._request('DELETE', location)
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            LOGGER.error("Failed to log out. Error message: %s" % repr(e))
+        finally:
+            self._session_key = None
+            self._session_location = None
+            self._authorization_key = None
+            await self._close_http()
+
+    async def _close_http(self):
+        if self._http is not None:
+            http = self._http
+            self._http = None
+            await http.close()
+
+    async def _get_url(self, suburl):
+        try:
+            status, headers, resp_dict = await self._request('GET', suburl)
+            if status in [200, 201, 202, 204]:
+                return {'ret': True, 'entries': resp_dict, 'headers': list(headers.items())}
+            else:
+                msg = "Failed to get %s. Error code is %s. Error message: %s" % (suburl, status, resp_dict)
+                LOGGER.error(msg)
+                return {'ret': False, 'msg': msg}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get %s. Error message: %s" % (suburl, repr(e))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    async def _get_protocol_features(self):
+        if self._protocol_features is None:
+            result = await self._get_url('/redfish/v1')
+            root = result['entries'] if result['ret'] == True else {}
+            features = root.get('ProtocolFeaturesSupported', {})
+            self._protocol_features = features if isinstance(features, dict) else {}
+        return self._protocol_features
+
+    async def _get_expand_query(self):
+        if self._expand_query is None:
+            self._expand_query = get_expand_query(await self._get_protocol_features())
+        return self._expand_query
+
+    async def _get_collection(self, suburl):
+        data = list()
+        collection_key = get_collection_key(suburl)
+        next_url = suburl
+        while next_url:
+            result = None
+            expand_query = '' if collection_key in self._expand_rejected else await self._get_expand_query()
+            if expand_query and '$expand' not in next_url:
+                result = await self._get_url(next_url + ('&' if '?' in next_url else '?') + expand_query)
+                if result['ret'] == False:
+                    # Expand is announced but rejected by this collection, do not try it again.
+                    self._expand_rejected.add(collection_key)
+                    result = None
+            if result is None:
+                result = await self._get_url(next_url)
+            if result['ret'] == False:
+                return result
+            if 'Members' not in result['entries']:
+                return {'ret': False, 'msg': "Failed to find Members in collection %s." % suburl}
+
+            members = result['entries']['Members']
+            # Members only containing '@odata.id' are not expanded, get them concurrently.
+            missing = [member['@odata.id'] for member in members if len(member) <= 1]
+            got = await asyncio.gather(*[self._get_url(url) for url in missing])
+            for member_result in got:
+                if member_result['ret'] == False:
+                    return member_result
+            got_iter = iter(got)
+            data.extend([member if len(member) > 1 else next(got_iter)['entries'] for member in members])
+            next_url = result['entries'].get('Members@odata.nextLink')
+        return {'ret': True, 'entries': data}
+
+    async def _find_resource(self, collection_url, resource_id):
+        result = await self._get_url(collection_url)
+        if result['ret'] == False:
+            raise Exception(result['msg'])
+        for member in result['entries']['Members']:
+            if resource_id == '' or resource_id == member['@odata.id'].split("/")[-1]:
+                return member['@odata.id']
+        msg = "Error_message: Failed to find the resource under %s. Id is %s ." % (collection_url, resource_id)
+        LOGGER.error(msg)
+        raise Exception(msg)
+
+    async def _find_system_resource(self):
+        if self._suburl_system == '':
+            self._suburl_system = await self._find_resource('/redfish/v1/Systems', self._systemid)
+        return self._suburl_system
+
+    async def _find_manager_resource(self):
+        if self._suburl_manager == '':
+            self._suburl_manager = await self._find_resource('/redfish/v1/Managers', self._managerid)
+        return self._suburl_manager
+
+    async def _find_chassis_resource(self):
+        if self._suburl_chassis != '':
+            return self._suburl_chassis
+
+        result = await self._get_collection('/redfish/v1/Chassis')
+        if result['ret'] == False:
+            raise Exception(result['msg'])
+        for member in result['entries']:
+            if self._chassisid == '':
+                # We must find the chassis linked with one system.
+                if 'Links' in member and 'ComputerSystems' in member['Links']:
+                    self._suburl_chassis = member['@odata.id']
+                    return self._suburl_chassis
+            elif self._chassisid == member['@odata.id'].split("/")[-1]:
+                self._suburl_chassis = member['@odata.id']
+                return self._suburl_chassis
+        msg = "Error_message: Failed to find the chassis resource. Chassis id is %s ." % self._chassisid
+        LOGGER.error(msg)
+        raise Exception(msg)
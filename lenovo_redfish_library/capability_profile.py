@@ -0,0 +1,113 @@
+###
+#
+# Lenovo Redfish Library - Capability profile cache of BMCs
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import time
+import threading
+
+from .utils import *
+
+# Seconds a profile is trusted before probing the bmc again.
+DEFAULT_PROFILE_TTL = 86400
+
+# Profiles known in this process, shared by all clients. Key is same as the one in cache file.
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+
+class ProfileCache(object):
+    """Cache of BMC capability profiles, in memory and optionally on disk.
+    A profile holds what is discovered about one BMC, like resource urls, bmc type,
+    push uris and action targets, so following clients skip discovering them again.
+    A profile is dropped when it expires, when the service root reports another
+    service (UUID or RedfishVersion changed) or when the BMC firmware version changes.
+    """
+
+    def __init__(self, cache_file='', ttl=DEFAULT_PROFILE_TTL):
+        """Initialize ProfileCache
+        :param cache_file: file to save profiles, empty means memory only
+        :type cache_file: str
+        :param ttl: seconds a profile is valid, 0 disables the cache
+        :type ttl: int
+        """
+        self._cache_file = cache_file
+        self._ttl = ttl
+
+    def is_enabled(self):
+        return self._ttl > 0
+
+    def _is_valid(self, profile, service_id):
+        if profile is None or profile.get('ServiceId') != service_id:
+            return False
+        return time.time() - profile.get('Created', 0) < self._ttl
+
+    def load(self, key, service_id):
+        """Load profile
+        :param key: key of profile, like 'ip|systemid|managerid|chassisid'
+        :type key: str
+        :param service_id: id of the service got from service root
+        :type service_id: str
+        :returns: returns Dict of profile, or None if not cached or not valid
+        """
+        if not self.is_enabled():
+            return None
+        with _profiles_lock:
+            profile = _profiles.get(key)
+        if not self._is_valid(profile, service_id) and self._cache_file:
+            profile = load_json_file(self._cache_file).get(key)
+            if self._is_valid(profile, service_id):
+                with _profiles_lock:
+                    _profiles[key] = profile
+        if not self._is_valid(profile, service_id):
+            return None
+        return dict(profile)
+
+    def update(self, key, service_id, values):
+        """Add values into profile, a new profile is created if the old one is not valid
+        :returns: returns Dict of profile updated
+        """
+        if not self.is_enabled():
+            return None
+        with _profiles_lock:
+            profile = _profiles.get(key)
+            if not self._is_valid(profile, service_id):
+                profile = {'ServiceId': service_id, 'Created': time.time()}
+            profile = dict(profile)
+            profile.update(values)
+            _profiles[key] = profile
+        if self._cache_file:
+            try:
+                with lock_json_file(self._cache_file):
+                    profiles = load_json_file(self._cache_file)
+                    profiles[key] = profile
+                    save_json_file(self._cache_file, profiles)
+            except Exception as e:
+                LOGGER.error("Failed to save profile into %s. Error message: %s" % (self._cache_file, repr(e)))
+        return dict(profile)
+
+    def remove(self, key):
+        """Remove profile, it is probed again by next client"""
+        with _profiles_lock:
+            _profiles.pop(key, None)
+        if self._cache_file:
+            with lock_json_file(self._cache_file):
+                profiles = load_json_file(self._cache_file)
+                if profiles.pop(key, None) is not None:
+                    save_json_file(self._cache_file, profiles)
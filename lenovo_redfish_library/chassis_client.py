@@ -34,12 +34,12 @@ class ChassisClient(RedfishBase):
     """A client for accessing lenovo system resource"""
 
     def __init__(self, ip='', username='', password='',
-                 configfile='config.ini', auth=''):
+                 configfile='config.ini', auth='', session=None):
         """Initialize ChassisClient"""
 
         super(ChassisClient, self).__init__(
             ip=ip, username=username, password=password, 
-            configfile=configfile, auth=auth
+            configfile=configfile, auth=auth, session=session
         )
 
     #############################################
@@ -0,0 +1,156 @@
+###
+#
+# Lenovo Redfish Library - Deadlines and cancellation of operations
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import time
+import threading
+from contextlib import contextmanager
+
+from .utils import *
+
+# Seconds to wait for connection to bmc.
+DEFAULT_CONNECT_TIMEOUT = 30
+# Seconds to wait for bmc between bytes of response.
+DEFAULT_READ_TIMEOUT = 300
+
+_current = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """Operation is not completed before its deadline"""
+    pass
+
+
+class OperationCancelled(Exception):
+    """Operation is cancelled by caller"""
+    pass
+
+
+class Deadline(object):
+    """Time limits of one operation: connect and read timeout of each request, and total
+    seconds of the whole operation. Requests, uploads, downloads and task polling started
+    within deadline_scope() use the remaining time, and stop at the next request or chunk
+    once the deadline is over or cancel() is called from another thread.
+
+    Example:
+        deadline = Deadline(total=600, connect=10, read=60)
+        with deadline_scope(deadline):
+            client.lenovo_update_firmware(image)
+    """
+
+    def __init__(self, total=None, connect=None, read=None):
+        """Initialize Deadline
+        :param total: seconds of the whole operation, None means no limit
+        :type total: float
+        :param connect: seconds to wait for connection, None means timeout of client
+        :type connect: float
+        :param read: seconds to wait between bytes of response, None means timeout of client
+        :type read: float
+        """
+        self.total = total
+        self.connect = connect
+        self.read = read
+        self._expires = None if total is None else time.time() + total
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Cancel the operation, it stops at the next request, chunk or poll"""
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """Get seconds left, None means no limit"""
+        if self._expires is None:
+            return None
+        return max(0, self._expires - time.time())
+
+    def check(self):
+        """Raise OperationCancelled or DeadlineExceeded if the operation should stop"""
+        if self._cancelled.is_set():
+            raise OperationCancelled("Operation is cancelled.")
+        if self._expires is not None and time.time() >= self._expires:
+            raise DeadlineExceeded("Operation is not completed in %s seconds." % self.total)
+
+    def get_timeout(self, connect=DEFAULT_CONNECT_TIMEOUT, read=DEFAULT_READ_TIMEOUT):
+        """Get timeout of next request, limited by the time left
+        :returns: returns Tuple of (connect, read) seconds for requests
+        """
+        self.check()
+        connect = self.connect or connect
+        read = self.read or read
+        remaining = self.remaining()
+        if remaining is not None:
+            connect = min(connect, remaining) if connect else remaining
+            read = min(read, remaining) if read else remaining
+        return connect, read
+
+    def sleep(self, seconds):
+        """Sleep, woken up early when the operation is cancelled or the deadline is over
+        :returns: returns True if the operation should stop
+        """
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        self._cancelled.wait(max(0, seconds))
+        return self._cancelled.is_set() or self.remaining() == 0
+
+
+def get_current_deadline():
+    """Get Deadline of the operation run by this thread, None if there is no deadline"""
+    return getattr(_current, 'deadline', None)
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """Run the code within deadline, in this thread and in the workers it starts"""
+    previous = get_current_deadline()
+    _current.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _current.deadline = previous
+
+
+def get_request_timeout(connect=DEFAULT_CONNECT_TIMEOUT, read=DEFAULT_READ_TIMEOUT):
+    """Get (connect, read) timeout of next request, limited by the deadline of this thread"""
+    deadline = get_current_deadline()
+    if deadline is None:
+        return connect, read
+    return deadline.get_timeout(connect, read)
+
+
+def run_in_deadline(deadline, function, *args, **kwargs):
+    """Call function within deadline, used to pass deadline into worker threads"""
+    if deadline is None:
+        return function(*args, **kwargs)
+    with deadline_scope(deadline):
+        return function(*args, **kwargs)
+
+
+def sleep(seconds):
+    """time.sleep which stops early when the deadline of this thread is over or cancelled"""
+    deadline = get_current_deadline()
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
+        deadline.check()
@@ -0,0 +1,201 @@
+###
+#
+# Lenovo Redfish Library - Streamed and resumable file download
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import os
+import hashlib
+import traceback
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import *
+from .deadline import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from .deadline import get_current_deadline, get_request_timeout, run_in_deadline, sleep
+
+# Bytes written to disk at one time.
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Times to resume one download after connection is dropped.
+DEFAULT_DOWNLOAD_RETRIES = 3
+# Smallest range fetched by one worker, smaller files are fetched by one request.
+MIN_RANGE_SIZE = 8 * 1024 * 1024
+
+
+class DownloadInterrupted(Exception):
+    """Connection is closed before all data is received"""
+    pass
+
+
+class RangeNotSupported(Exception):
+    """Server sends the whole file to a Range request"""
+    pass
+
+
+def _get_range_size(url, headers, verify, timeout):
+    """Get size of file if server supports Range
+    :returns: returns Size of file, or None if Range is not supported
+    """
+    request_headers = dict(headers)
+    request_headers['Range'] = 'bytes=0-0'
+    response = requests.get(url, headers=request_headers, verify=verify, stream=True, timeout=get_request_timeout(*timeout))
+    try:
+        content_range = response.headers.get('Content-Range', '')
+        if response.status_code != 206 or '/' not in content_range:
+            return None
+        total = content_range.split('/')[-1].strip()
+        return int(total) if total.isdigit() else None
+    finally:
+        response.close()
+
+
+def _fetch_range(url, headers, verify, file_path, start, end, chunk_size, retries, timeout):
+    """Fetch bytes start~end of url into same offsets of file. end None means to the end of url.
+    Download dropped is resumed from the last byte written.
+    :returns: returns Number of bytes written
+    """
+    offset = start
+    attempt = 0
+    deadline = get_current_deadline()
+    with open(file_path, 'r+b') as f:
+        while True:
+            request_headers = dict(headers)
+            if offset > 0 or end is not None:
+                request_headers['Range'] = 'bytes=%d-%s' % (offset, '' if end is None else end)
+            try:
+                response = requests.get(url, headers=request_headers, verify=verify, stream=True, timeout=get_request_timeout(*timeout))
+                try:
+                    if response.status_code == 200 and 'Range' in request_headers:
+                        if start != 0 or end is not None:
+                            raise RangeNotSupported("Range %s is answered with whole file." % request_headers['Range'])
+                        # Server ignores Range, download from the beginning again
+                        offset = 0
+                    elif response.status_code not in [200, 206]:
+                        raise Exception("Error code is %s. Error message is %s. " % (response.status_code, response.text))
+                    f.seek(offset)
+                    if response.status_code == 200:
+                        f.truncate()
+                    last = end
+                    if last is None and response.headers.get('Content-Length', '').isdigit():
+                        last = offset + int(response.headers['Content-Length']) - 1
+                    for chunk in response.iter_content(chunk_size):
+                        f.write(chunk)
+                        offset += len(chunk)
+                        if deadline is not None:
+                            deadline.check()
+                    if last is not None and offset <= last:
+                        raise DownloadInterrupted("%s bytes are missing." % (last + 1 - offset))
+                finally:
+                    response.close()
+                return offset - start
+            except (requests.exceptions.RequestException, DownloadInterrupted) as e:
+                attempt += 1
+                if attempt > retries:
+                    raise
+                LOGGER.info("Download of %s is interrupted at byte %s, resume it. Error message: %s" % (url, offset, repr(e)))
+                sleep(min(2 ** attempt, 10))
+
+
+def get_file_sha256(file_path, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE):
+    """Get sha256 of file, read chunk by chunk"""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def download_file(url, file_path, headers=None, verify=False, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE,
+                  workers=1, retries=DEFAULT_DOWNLOAD_RETRIES, expected_size=None, sha256=None,
+                  timeout=(DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+    """Download file by streaming it to disk chunk by chunk
+    Data is written into file_path + '.part' which is renamed to file_path after it is checked.
+    :param url: full url of file
+    :type url: str
+    :param file_path: local file to save
+    :type file_path: str
+    :param headers: headers of requests, like auth token
+    :type headers: dict
+    :param verify: verify parameter of requests, cafile or False
+    :type verify: str
+    :param chunk_size: bytes written to disk at one time
+    :type chunk_size: int
+    :param workers: number of ranges fetched in parallel when server supports Range
+    :type workers: int
+    :param retries: times to resume each range after connection is dropped
+    :type retries: int
+    :param expected_size: size of file expected, checked after download
+    :type expected_size: int
+    :param sha256: sha256 of file expected, checked after download
+    :type sha256: str
+    :param timeout: (connect, read) seconds of each request, limited by deadline of this thread
+    :type timeout: tuple
+    :returns: returns Dict like {'ret': True, 'entries': {'File': file_path, 'Size': size, 'Sha256': sha256}}
+    """
+    part_path = file_path + '.part'
+    headers = headers or {}
+    try:
+        size = None
+        if workers > 1:
+            size = _get_range_size(url, headers, verify, timeout)
+        with open(part_path, 'wb') as f:
+            if size is not None:
+                f.truncate(size)
+        if size is not None and size >= 2 * MIN_RANGE_SIZE:
+            count = min(workers, size // MIN_RANGE_SIZE)
+            step = (size + count - 1) // count
+            ranges = [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+            deadline = get_current_deadline()
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(run_in_deadline, deadline, _fetch_range, url, headers, verify, part_path,
+                                           start, end, chunk_size, retries, timeout)
+                           for start, end in ranges]
+                range_supported = True
+                for future in futures:
+                    try:
+                        future.result()
+                    except RangeNotSupported as e:
+                        range_supported = False
+                        LOGGER.info("Failed to download %s by ranges, download it by one stream. %s" % (url, repr(e)))
+            if not range_supported:
+                # All workers are stopped, fetch the whole file again from the beginning
+                _fetch_range(url, headers, verify, part_path, 0, None, chunk_size, retries, timeout)
+        else:
+            _fetch_range(url, headers, verify, part_path, 0, None, chunk_size, retries, timeout)
+
+        # Check integrity of file downloaded
+        actual_size = os.path.getsize(part_path)
+        if expected_size is None:
+            expected_size = size
+        if expected_size is not None and actual_size != expected_size:
+            raise Exception("Size of file downloaded is %s, %s is expected." % (actual_size, expected_size))
+        actual_sha256 = get_file_sha256(part_path, chunk_size)
+        if sha256 and sha256.lower() != actual_sha256:
+            raise Exception("Sha256 of file downloaded is %s, %s is expected." % (actual_sha256, sha256))
+
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        os.rename(part_path, file_path)
+        return {'ret': True, 'entries': {'File': file_path, 'Size': actual_size, 'Sha256': actual_sha256}}
+    except Exception as e:
+        LOGGER.debug("%s" % traceback.format_exc())
+        msg = "Failed to download %s. Error message: %s" % (url, repr(e))
+        LOGGER.error(msg)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return {'ret': False, 'msg': msg}
@@ -0,0 +1,231 @@
+###
+#
+# Lenovo Redfish Library - Fleet executor, run one function on many BMCs
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import os
+import csv
+import json
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .utils import *
+from .deadline import Deadline, deadline_scope
+
+
+def read_targets(targets_file):
+    """Read BMC targets from csv file
+    :targets_file: csv file, each line is 'ip,user,password,auth'. user, password and auth are optional,
+                   empty value means using the value from command line or config file.
+                   The first line is skipped if it is header starting with 'ip'.
+    :type targets_file: string
+    :returns: returns List of targets, like [{'ip': ip, 'user': user, 'password': password, 'auth': auth}]
+    """
+    targets = []
+    with open(targets_file, 'r') as f:
+        for row in csv.reader(f):
+            row = [item.strip() for item in row]
+            if len(row) == 0 or row[0] == '' or row[0].startswith('#'):
+                continue
+            if row[0].lower() == 'ip':
+                continue
+            row = row + [''] * (4 - len(row))
+            targets.append({'ip': row[0], 'user': row[1], 'password': row[2], 'auth': row[3]})
+    return targets
+
+
+def is_read_only(name):
+    """Check whether subcommand or client function only reads from BMC, so it is safe to run it again after failure.
+    Operations changing BMC, like firmware update, config restore or bios settings, may be accepted by BMC
+    before the failure is seen, running them again would repeat them.
+    :name: name of subcommand or client function, like 'get_cpu_inventory'. None is not read only.
+    :type name: string
+    """
+    return bool(name) and name.startswith('get_')
+
+
+class FleetExecutor(object):
+    """Run one client function against many BMCs concurrently.
+    Each BMC is run within a Deadline of timeout seconds, so requests, uploads and task polls
+    of a wedged BMC stop when its time is over. cancel() stops all outstanding work.
+    """
+
+    def __init__(self, max_workers=32, timeout=600, retries=0, retry_interval=5):
+        """Initialize FleetExecutor
+
+        :param max_workers: number of BMCs handled at the same time
+        :type max_workers: int
+        :param timeout: maximum seconds for one BMC, including retries. None means no limit
+        :type timeout: int
+        :param retries: times to retry one BMC after failure, only for jobs run with retryable True
+        :type retries: int
+        :param retry_interval: seconds to wait before retrying
+        :type retry_interval: int
+        """
+        self._max_workers = max(1, int(max_workers))
+        self._timeout = timeout
+        self._retries = max(0, int(retries))
+        self._retry_interval = retry_interval
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        # Deadlines of targets being run
+        self._deadlines = set()
+
+    def cancel(self):
+        """Cancel outstanding work. Targets not started are skipped, running ones stop at their next request, chunk or poll."""
+        self._cancelled.set()
+        with self._lock:
+            deadlines = list(self._deadlines)
+        for deadline in deadlines:
+            deadline.cancel()
+
+    def _run_target(self, target, job, state, retryable=False):
+        state['start'] = time.time()
+        if self._cancelled.is_set():
+            return {'ret': False, 'msg': "Cancelled before running on %s." % target['ip']}
+        deadline = Deadline(total=self._timeout)
+        state['deadline'] = deadline
+        with self._lock:
+            self._deadlines.add(deadline)
+        try:
+            attempts = 0
+            while True:
+                attempts = attempts + 1
+                state['attempts'] = attempts
+                try:
+                    with deadline_scope(deadline):
+                        result = job(target)
+                except Exception as e:
+                    LOGGER.debug("%s" % traceback.format_exc())
+                    result = {'ret': False, 'msg': "Failed to run on %s. Error message: %s" % (target['ip'], repr(e))}
+                if result['ret'] == True or not retryable or attempts > self._retries or state.get('expired'):
+                    return result
+                LOGGER.info("Failed on %s, retry %s of %s." % (target['ip'], attempts, self._retries))
+                if deadline.sleep(self._retry_interval):
+                    return result
+        finally:
+            with self._lock:
+                self._deadlines.discard(deadline)
+
+    def _format_result(self, target, result, state):
+        data = {'ip': target['ip']}
+        data.update(result)
+        data['attempts'] = state.get('attempts', 0)
+        data['elapsed'] = round(time.time() - state['start'], 3) if 'start' in state else 0
+        return data
+
+    def run_jobs(self, targets, job, retryable=False):
+        """Run job for each target
+        :params targets: list of targets, like [{'ip': ip, 'user': user, 'password': password, 'auth': auth}]
+        :type targets: list
+        :params job: function called with one target, returns dict like {'ret': True, 'entries': ...}
+        :type job: function
+        :params retryable: True if job is safe to run again after failure, like reading inventory. \
+                           Jobs changing BMC are not retried by default.
+        :type retryable: bool
+        :returns: yields Dict of result for each target as soon as it is completed, \
+                  with 'ip', 'attempts' and 'elapsed' added
+        """
+        if self._retries > 0 and not retryable:
+            LOGGER.info("Job is not retryable, failed BMCs are not retried.")
+        executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        try:
+            pending = {}
+            for target in targets:
+                state = {}
+                future = executor.submit(self._run_target, target, job, state, retryable)
+                pending[future] = (target, state)
+
+            while pending:
+                wait_time = None
+                if self._timeout != None:
+                    # Wait until the earliest deadline of targets being run.
+                    now = time.time()
+                    deadlines = [state['start'] + self._timeout for (target, state) in pending.values() if 'start' in state]
+                    wait_time = max(0.1, min(deadlines) - now) if deadlines else 1
+                done, not_done = wait(list(pending.keys()), timeout=wait_time, return_when=FIRST_COMPLETED)
+                for future in done:
+                    target, state = pending.pop(future)
+                    yield self._format_result(target, future.result(), state)
+
+                if self._timeout == None:
+                    continue
+                now = time.time()
+                for future in list(pending.keys()):
+                    target, state = pending[future]
+                    if 'start' in state and now - state['start'] > self._timeout:
+                        # The thread can not be killed, it stops at its next request, chunk or poll.
+                        state['expired'] = True
+                        if 'deadline' in state:
+                            state['deadline'].cancel()
+                        pending.pop(future)
+                        result = {'ret': False, 'msg': "Not completed in %s seconds on %s." % (self._timeout, target['ip'])}
+                        yield self._format_result(target, result, state)
+        finally:
+            executor.shutdown(wait=False)
+
+    def run(self, targets, client_class, method, *args, **kwargs):
+        """Call one function of client for each target
+        :params targets: list of targets, like [{'ip': ip, 'user': user, 'password': password, 'auth': auth}]
+        :type targets: list
+        :params client_class: SystemClient, ManagerClient, ChassisClient, UpdateClient or AccountClient
+        :type client_class: class
+        :params method: name of client function, like 'get_cpu_inventory'
+        :type method: string
+        :params args/kwargs: parameters of client function. 'configfile' in kwargs is used to create client. \
+                             'retryable' in kwargs overrides whether failed BMCs are retried, default is True for 'get_' functions.
+        :returns: yields Dict of result for each target as soon as it is completed
+        """
+        configfile = kwargs.pop('configfile', 'config.ini')
+        retryable = kwargs.pop('retryable', is_read_only(method))
+
+        def job(target):
+            client = client_class(ip=target['ip'], username=target.get('user', ''),
+                                  password=target.get('password', ''), configfile=configfile,
+                                  auth=target.get('auth', ''))
+            try:
+                client.login()
+                return getattr(client, method)(*args, **kwargs)
+            finally:
+                client.logout()
+
+        for result in self.run_jobs(targets, job, retryable):
+            yield result
+
+
+def run_fleet(targets, client_class, method, *args, **kwargs):
+    """Call one function of client for each target with default FleetExecutor
+    :returns: returns List of results of all targets
+    """
+    return list(FleetExecutor().run(targets, client_class, method, *args, **kwargs))
+
+
+def write_json_lines(results, stream):
+    """Write results as json lines one by one
+    :returns: returns True if all results succeeded
+    """
+    all_succeeded = True
+    for result in results:
+        if result['ret'] != True:
+            all_succeeded = False
+        stream.write(json.dumps(result, sort_keys=True, default=str) + '\n')
+        stream.flush()
+    return all_succeeded
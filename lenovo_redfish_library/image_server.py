@@ -0,0 +1,249 @@
+###
+#
+# Lenovo Redfish Library - Embedded HTTP server serving images to BMCs
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import os
+import re
+import time
+import hashlib
+import threading
+import traceback
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, unquote, quote
+
+from .utils import *
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        LOGGER.debug("Image server: %s - %s" % (self.client_address[0], format % args))
+
+    def _parse_range(self, size):
+        """Get (start, end) of Range header, None if no Range, or False if Range can not be satisfied"""
+        value = self.headers.get('Range')
+        if not value:
+            return None
+        match = re.match(r'^bytes=(\d*)-(\d*)$', value.strip())
+        if match is None or match.group(1) == match.group(2) == '':
+            # Multiple ranges are not supported, send whole file
+            return None
+        if match.group(1) == '':
+            start = max(0, size - int(match.group(2)))
+            end = size - 1
+        else:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else size - 1
+        end = min(end, size - 1)
+        if start > end:
+            return False
+        return start, end
+
+    def _serve(self, send_body):
+        server = self.server.image_server
+        file_path = server._find_file(unquote(urlparse(self.path).path))
+        if file_path is None or not os.path.isfile(file_path):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            byte_range = self._parse_range(size)
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */%s' % size)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range is None:
+                start, end = 0, size - 1
+                self.send_response(200)
+            else:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', 'bytes %s-%s/%s' % (start, end, size))
+            count = end - start + 1
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(count))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.end_headers()
+            if not send_body or count <= 0:
+                return
+            client_ip = self.client_address[0]
+            server._transfer_started(client_ip)
+            time_start = time.time()
+            sent = 0
+            try:
+                # socket.sendfile uses os.sendfile when it is available, data is not copied into this process
+                sent = self.connection.sendfile(f, start, count)
+            except Exception as e:
+                LOGGER.debug("%s" % traceback.format_exc())
+                LOGGER.info("Sending %s to %s is interrupted. Error message: %s" % (file_path, client_ip, repr(e)))
+                self.close_connection = True
+            finally:
+                server._transfer_finished(client_ip, sent, time.time() - time_start)
+
+    def do_GET(self):
+        self._serve(True)
+
+    def do_HEAD(self):
+        self._serve(False)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ImageServer(object):
+    """HTTP server run in this process, serving firmware images and ISOs pulled by BMCs,
+    like SimpleUpdate over HTTP and virtual media, instead of a separately managed web server.
+    Files are sent by sendfile with Range support, each reader is served by its own thread,
+    and transfer rate of each BMC is recorded. Only files published are served.
+
+    Example:
+        with ImageServer(port=8081) as server:
+            client.set_image_server(server)
+            client.lenovo_mount_virtual_media('ubuntu.iso', 'HTTP', None, '/var/iso')
+    """
+
+    def __init__(self, port=8081, host='', advertise_ip=None):
+        """Initialize ImageServer
+        :param port: port to listen
+        :type port: int
+        :param host: address to listen, empty means all addresses
+        :type host: str
+        :param advertise_ip: ip given to BMCs to pull images. Default is the local address used to reach each BMC.
+        :type advertise_ip: str
+        """
+        self._port = port
+        self._host = host
+        self._advertise_ip = advertise_ip
+        self._files = {}
+        # Times each file is published and not unpublished yet
+        self._references = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def start(self):
+        with self._lock:
+            if self._server is not None:
+                return
+            self._server = _ThreadingHTTPServer((self._host, self._port), _ImageHandler)
+            self._server.image_server = self
+            # Port 0 means any free port
+            self._port = self._server.server_address[1]
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        with self._lock:
+            server = self._server
+            self._server = None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    def get_port(self):
+        return self._port
+
+    def get_address(self, bmc_ip):
+        """Get ip of this server which BMC can reach"""
+        if self._advertise_ip:
+            return self._advertise_ip
+        if self._host:
+            return self._host
+        return get_local_address(bmc_ip)
+
+    def publish(self, file_path):
+        """Serve local file, until it is unpublished as many times as it is published.
+        So one image pulled by several BMCs at the same time is served until the last one is done.
+        :param file_path: path of local file
+        :type file_path: str
+        :returns: returns String of folder on server, file is served as /<folder>/<file name>
+        """
+        self.start()
+        file_path = os.path.abspath(file_path)
+        folder = 'images/' + hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:16]
+        with self._lock:
+            self._files[folder + '/' + os.path.basename(file_path)] = file_path
+            self._references[file_path] = self._references.get(file_path, 0) + 1
+        return folder
+
+    def unpublish(self, file_path):
+        """Stop serving local file, once it is unpublished by all who published it"""
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            references = self._references.get(file_path, 0) - 1
+            if references > 0:
+                self._references[file_path] = references
+                return
+            self._references.pop(file_path, None)
+            for path in [path for path, value in self._files.items() if value == file_path]:
+                del self._files[path]
+
+    def get_host(self, bmc_ip):
+        """Get address and port of this server which BMC can reach, like '10.0.0.1:8081' or '[fd00::1]:8081'"""
+        return format_host(self.get_address(bmc_ip), self._port)
+
+    def get_url(self, bmc_ip, file_path):
+        """Publish local file and get its url for BMC"""
+        folder = self.publish(file_path)
+        return "http://%s/%s/%s" % (self.get_host(bmc_ip), folder, quote(os.path.basename(file_path)))
+
+    def get_transfer_stats(self):
+        """Get transfer statistics of each BMC
+        :returns: returns Dict like {bmc ip: {'Requests': 2, 'Active': 0, 'Bytes': 1048576, 'Seconds': 1.5, 'BytesPerSecond': 699050}}
+        """
+        with self._lock:
+            stats = {}
+            for client_ip, value in self._stats.items():
+                stats[client_ip] = dict(value)
+                stats[client_ip]['BytesPerSecond'] = int(value['Bytes'] / value['Seconds']) if value['Seconds'] > 0 else 0
+            return stats
+
+    def _find_file(self, path):
+        with self._lock:
+            return self._files.get(path.strip('/'))
+
+    def _transfer_started(self, client_ip):
+        with self._lock:
+            stats = self._stats.setdefault(client_ip, {'Requests': 0, 'Active': 0, 'Bytes': 0, 'Seconds': 0.0})
+            stats['Requests'] += 1
+            stats['Active'] += 1
+
+    def _transfer_finished(self, client_ip, sent, seconds):
+        with self._lock:
+            stats = self._stats[client_ip]
+            stats['Active'] -= 1
+            stats['Bytes'] += sent
+            stats['Seconds'] += seconds
+        LOGGER.info("%s bytes are sent to %s in %.2f seconds." % (sent, client_ip, seconds))
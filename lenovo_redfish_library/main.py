@@ -32,6 +32,8 @@ from .manager_client import *
 from .chassis_client import *
 from .update_client import *
 from .account_client import *
+from .fleet import FleetExecutor, read_targets, write_json_lines, is_read_only
+from .request_profiler import RequestProfiler, add_default_request_hook
 
 
 def usage():
@@ -41,11 +43,84 @@ def usage():
     update_usage()
     account_usage()
 
+def run_subcommand(args):
+    """ return result of running subcommand """
+    if args.subcommand_name in system_cmd_list.keys():
+        result = run_system_subcommand(args)
+    elif args.subcommand_name in manager_cmd_list.keys():
+        result = run_manager_subcommand(args)
+    elif args.subcommand_name in chassis_cmd_list.keys():
+        result = run_chassis_subcommand(args)
+    elif args.subcommand_name in update_cmd_list.keys():
+        result = run_update_subcommand(args)
+    elif args.subcommand_name in account_cmd_list.keys():
+        result = run_account_subcommand(args)
+    else:
+        usage()
+        result = {'ret': False, 'msg': "Please specify correct subcommand."}
+    return result
+
+def run_fleet_subcommand(args):
+    """ run subcommand on all bmcs listed in targets file, print results as json lines """
+    cmd_lists = [system_cmd_list, manager_cmd_list, chassis_cmd_list, update_cmd_list, account_cmd_list]
+    if not any(args.subcommand_name in cmd_list.keys() for cmd_list in cmd_lists):
+        # Reject it once here, instead of connecting to every bmc to report it
+        usage()
+        print("Please specify correct subcommand.")
+        return False
+
+    try:
+        targets = read_targets(args.targets)
+    except Exception as e:
+        print("Failed to read targets file %s. Error message: %s" % (args.targets, repr(e)))
+        return False
+
+    def job(target):
+        host_args = argparse.Namespace(**vars(args))
+        host_args.ip = target['ip']
+        if target['user']:
+            host_args.user = target['user']
+        if target['password']:
+            host_args.passwd = target['password']
+        if target['auth']:
+            host_args.auth = target['auth']
+        return run_subcommand(host_args)
+
+    executor = FleetExecutor(max_workers=args.workers, timeout=args.host_timeout, retries=args.retries)
+    # Subcommands changing bmc may be accepted before failure is seen, only reading ones are retried
+    return write_json_lines(executor.run_jobs(targets, job, is_read_only(args.subcommand_name)), sys.stdout)
+
+def write_profile(args, profiler):
+    """ print timing of requests sent by subcommand, in format of --profile """
+    if args.profile == 'json':
+        output = json.dumps(profiler.to_json(), sort_keys=True, indent=2)
+    elif args.profile == 'prometheus':
+        output = profiler.to_prometheus()
+    else:
+        output = profiler.format_summary(title=args.subcommand_name)
+    if args.profile_file:
+        try:
+            with open(args.profile_file, 'w') as f:
+                f.write(output.rstrip('\n') + '\n')
+        except Exception as e:
+            LOGGER.error("Failed to write profile file %s. Error message: %s" % (args.profile_file, repr(e)))
+            print("Failed to write profile file %s. Error message: %s" % (args.profile_file, repr(e)), file=sys.stderr)
+    else:
+        # Keep stdout for results of subcommand
+        sys.stdout.flush()
+        print(output.rstrip('\n'), file=sys.stderr)
+
 def main(argv):
     """Lenovo Redfish client's main"""
 
     argget = argparse.ArgumentParser(description="Lenovo Redfish Tool")
     add_common_parameter(argget)
+    argget.add_argument('--targets', type=str, help='CSV file of bmcs, each line is "ip,user,password,auth". Run subcommand on all of them and print results as json lines')
+    argget.add_argument('--workers', type=int, default=32, help='Number of bmcs handled at the same time with --targets, default is 32')
+    argget.add_argument('--host_timeout', type=int, default=600, help='Maximum seconds for one bmc with --targets, default is 600')
+    argget.add_argument('--retries', type=int, default=0, help='Times to retry one bmc after failure with --targets, only for get_ subcommands, default is 0')
+    argget.add_argument('--profile', type=str, choices=['summary', 'json', 'prometheus'], help='Print timing of requests sent to bmc to stderr: summary with request count, critical path and slowest uris, json with each request, or prometheus metrics')
+    argget.add_argument('--profile_file', type=str, help='Write output of --profile into this file instead of stderr')
     
     subcommand_parsers = argget.add_subparsers(dest='subcommand_name', help='all subcommands')
     add_system_parameter(subcommand_parsers)
@@ -57,24 +132,32 @@ def main(argv):
     # Parse the parameters
     args = argget.parse_args()
 
-    if args.subcommand_name in system_cmd_list.keys():
-        result = run_system_subcommand(args)
-    elif args.subcommand_name in manager_cmd_list.keys():
-        result = run_manager_subcommand(args)
-    elif args.subcommand_name in chassis_cmd_list.keys():
-        result = run_chassis_subcommand(args)
-    elif args.subcommand_name in update_cmd_list.keys():
-        result = run_update_subcommand(args)
-    elif args.subcommand_name in account_cmd_list.keys():
-        result = run_account_subcommand(args)
-    else:
-        usage()
-        result = {'ret': False, 'msg': "Please specify correct subcommand."}
+    result = configure_logger(args.config)
+    if result['ret'] == False:
+        print(result['msg'], file=sys.stderr)
+
+    profiler = None
+    if args.profile:
+        profiler = RequestProfiler()
+        add_default_request_hook(profiler)
+
+    if args.targets:
+        fleet_result = run_fleet_subcommand(args)
+        if profiler is not None:
+            write_profile(args, profiler)
+        if fleet_result == False:
+            sys.exit(1)
+        else:
+            sys.exit(0)
+
+    result = run_subcommand(args)
 
     if 'msg' in result:
         print(result['msg'])
     if 'entries' in result:
         print(json.dumps(result['entries'], sort_keys=True, indent=2))
+    if profiler is not None:
+        write_profile(args, profiler)
     if result['ret'] == False:
         sys.exit(1)
     else:
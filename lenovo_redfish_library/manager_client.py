@@ -28,6 +28,8 @@ import time
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
 from .redfish_base import RedfishBase
+from .task_monitor import END_TASK_STATE, TaskHandle
+from .file_download import download_file
 from .utils import *
 from .utils import add_common_parameter
 from .utils import parse_common_parameter
@@ -36,12 +38,12 @@ class ManagerClient(RedfishBase):
     """A client for managing bmc"""
 
     def __init__(self, ip='', username='', password='',
-                 configfile='config.ini', auth=''):
+                 configfile='config.ini', auth='', session=None):
         """Initialize ManagerClient"""
 
         super(ManagerClient, self).__init__(
             ip=ip, username=username, password=password, 
-            configfile=configfile, auth=auth
+            configfile=configfile, auth=auth, session=session
         )
 
     #############################################
@@ -206,10 +208,55 @@ class ManagerClient(RedfishBase):
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
 
-    def get_event_log(self, type='manager'):
+    def _get_log_services(self, type='manager'):
+        """Get log services of manager, system or chassis
+        :params type: 'system', 'manager' or 'chassis'
+        :type type: string
+        :returns: returns List of log services
+        """
+        if type not in ['system', 'manager', 'chassis']:
+            return {'ret': False, 'msg': "Please specify type in ['system', 'manager', 'chassis']."}
+
+        if type == "system":
+            resource_url = self._find_system_resource()
+        elif type == "manager":
+            resource_url = self._find_manager_resource()
+        else:
+            resource_url = self._find_chassis_resource()
+        result = self._get_url(resource_url)
+        if result['ret'] == False:
+            return result
+
+        log_service_url = result['entries']['LogServices']['@odata.id']
+        return self._get_collection(log_service_url)
+
+    def iter_event_log(self, type='manager', page_size=None):
+        """Iterate event logs entry by entry, pages of log entries are read only when needed.
+        :params type: 'system', 'manager' or 'chassis'
+        :type type: string
+        :params page_size: log entries per page requested from bmc, None means the page size of bmc
+        :type page_size: int
+        :returns: yields Tuple of (log service id, log entry). Exception is raised when failed.
+        """
+        result = self._get_log_services(type)
+        if result['ret'] == False:
+            raise Exception(result['msg'])
+
+        for member in result['entries']:
+            id = member['Id']
+            entries_url = member['Entries']['@odata.id']
+            for entry in self.iter_collection(entries_url, page_size):
+                yield id, propertyFilter(entry)
+
+    def get_event_log(self, type='manager', page_size=None, log_file=None):
         """Get event logs
         :params type: 'system', 'manager' or 'chassis'
         :type type: string
+        :params page_size: log entries per page requested from bmc, None means the page size of bmc
+        :type page_size: int
+        :params log_file: if specified, log entries are written into this file as json lines while reading, \
+                          instead of being returned, so memory used does not grow with log size.
+        :type log_file: string
         :returns: returns List of event logs
         """
         result = {}
@@ -218,30 +265,24 @@ class ManagerClient(RedfishBase):
                 result = {'ret': False, 'msg': "Please specify type in ['system', 'manager', 'chassis']."}
                 return result
 
-            if type == "system":
-                resource_url = self._find_system_resource()
-            elif type == "manager":
-                resource_url = self._find_manager_resource()
-            else:
-                resource_url = self._find_chassis_resource()
-            log_service_url = resource_url + '/LogServices'
-            result = self._get_url(resource_url)
-            if result['ret'] == False:
+            if log_file:
+                count = 0
+                with open(log_file, 'w') as f:
+                    for id, entry in self.iter_event_log(type, page_size):
+                        f.write(json.dumps({'Id': id, 'Entry': entry}) + '\n')
+                        count = count + 1
+                result = {'ret': True, 'msg': "Succeed to export %s event logs into file '%s'." % (count, log_file)}
                 return result
 
-            log_service_url = result['entries']['LogServices']['@odata.id']
-            result = self._get_collection(log_service_url)
+            result = self._get_log_services(type)
             if result['ret'] == False:
                 return result
-            
+
             log_details = []
             for member in result['entries']:
                 id = member['Id']
                 entries_url = member['Entries']['@odata.id']
-                result_logs = self._get_collection(entries_url)
-                if result_logs['ret'] == False:
-                    return result_logs
-                data_filtered = propertyFilter(result_logs['entries'])
+                data_filtered = [propertyFilter(entry) for entry in self.iter_collection(entries_url, page_size)]
                 log = {'Id': id, 'Entries': data_filtered}
                 log_details.append(log)
             result = {'ret': True, 'entries': log_details}
@@ -252,6 +293,153 @@ class ManagerClient(RedfishBase):
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
 
+    def _iter_new_log_entries(self, entries_url, cursor, page_size=None):
+        """Iterate log entries newer than cursor of one log service
+        :params entries_url: url of log entries collection
+        :type entries_url: string
+        :params cursor: last log entry seen, like {'Id': id, 'Created': time, 'Count': count, 'NewestFirst': bool}
+        :type cursor: dict
+        :returns: yields Dict of new log entries, in the order of bmc
+        """
+        last_id = cursor.get('Id')
+        last_created = cursor.get('Created')
+        features = self._get_protocol_features()
+
+        # Let bmc filter old entries out if it supports $filter.
+        # Entries created in the same second as the last entry are kept by 'ge', the last entry itself is skipped.
+        if features.get('FilterQuery') == True and last_created:
+            filter_url = entries_url + "?$filter=Created ge '%s'" % last_created
+            yielded = False
+            try:
+                for entry in self.iter_collection(filter_url, page_size):
+                    if entry.get('Id') != last_id:
+                        yielded = True
+                        yield entry
+                return
+            except Exception as e:
+                if yielded:
+                    # Scanning again would return the entries already yielded
+                    raise
+                LOGGER.info("Failed to filter log entries of %s, scan entries instead. %s" % (entries_url, repr(e)))
+
+        if cursor.get('NewestFirst') != False:
+            # Newest entry comes first, stop once reaching the entry seen last time.
+            for entry in self.iter_collection(entries_url, page_size):
+                if entry.get('Id') == last_id:
+                    return
+                if last_created and entry.get('Created') and entry['Created'] < last_created:
+                    return
+                yield entry
+            return
+
+        # Oldest entry comes first, skip the entries seen last time if bmc supports $skip.
+        count = cursor.get('Count')
+        if features.get('TopSkipQuery') == True and count:
+            entries = self.iter_collection(entries_url, page_size, skip=count - 1)
+            first_entry = next(entries, None)
+            if first_entry != None and first_entry.get('Id') == last_id:
+                for entry in entries:
+                    yield entry
+                return
+            # Log was cleared or wrapped, scan it from the beginning.
+            entries.close()
+
+        found_last = False
+        for entry in self.iter_collection(entries_url, page_size):
+            if found_last or (last_created and entry.get('Created') and entry['Created'] > last_created):
+                yield entry
+            elif entry.get('Id') == last_id:
+                found_last = True
+
+    @staticmethod
+    def _detect_log_order(entries, last_id=None):
+        """Detect order of log entries
+        :params entries: all entries of log service, in the order of bmc
+        :type entries: list
+        :params last_id: Id of the entry seen last time, None if no entry is seen
+        :type last_id: string
+        :returns: returns True if newest entry comes first, False if oldest comes first, None if it is not known yet
+        """
+        if len(entries) < 2:
+            return None
+        first_created = entries[0].get('Created', '')
+        last_created = entries[-1].get('Created', '')
+        if first_created and last_created and first_created != last_created:
+            return first_created > last_created
+        # Entries created in the same second, the entry seen before is older than the others
+        if last_id != None:
+            if entries[0].get('Id') == last_id:
+                return False
+            if entries[-1].get('Id') == last_id:
+                return True
+        return None
+
+    def get_new_event_log(self, type='manager', cursor_file=None, page_size=None):
+        """Get event logs created since last call. Last entry seen of each log service is saved in cursor file,
+           the first call returns all event logs.
+        :params type: 'system', 'manager' or 'chassis'
+        :type type: string
+        :params cursor_file: file to save last entry seen of each bmc's log services. \
+                             Default is 'event_log_cursor.json' under current working directory
+        :type cursor_file: string
+        :params page_size: log entries per page requested from bmc, None means the page size of bmc
+        :type page_size: int
+        :returns: returns List of new event logs
+        """
+        result = {}
+        try:
+            if cursor_file == None or cursor_file == '':
+                cursor_file = os.getcwd() + os.sep + 'event_log_cursor.json'
+            result = self._get_log_services(type)
+            if result['ret'] == False:
+                return result
+
+            cursors = load_json_file(cursor_file).get(self._ip, {})
+            new_cursors = {}
+            log_details = []
+            for member in result['entries']:
+                id = member['Id']
+                entries_url = member['Entries']['@odata.id']
+                cursor = cursors.get(entries_url)
+                new_entries = []
+                if cursor == None or cursor.get('NewestFirst') == None:
+                    # Order of log is not known until two entries are seen, read all entries until then
+                    all_entries = list(self.iter_collection(entries_url, page_size))
+                    last_id = cursor.get('Id') if cursor != None else None
+                    new_entries = [entry for entry in all_entries if last_id == None or entry.get('Id') != last_id]
+                    new_cursor = {'Count': len(all_entries)}
+                    newest_first = self._detect_log_order(all_entries, last_id)
+                    if newest_first != None:
+                        new_cursor['NewestFirst'] = newest_first
+                    if len(all_entries) > 0:
+                        newest = all_entries[-1] if newest_first == False else all_entries[0]
+                        new_cursor['Id'] = newest.get('Id')
+                        new_cursor['Created'] = newest.get('Created')
+                else:
+                    new_entries = list(self._iter_new_log_entries(entries_url, cursor, page_size))
+                    new_cursor = dict(cursor)
+                    if len(new_entries) > 0:
+                        newest = new_entries[0] if cursor.get('NewestFirst') != False else new_entries[-1]
+                        new_cursor['Id'] = newest.get('Id')
+                        new_cursor['Created'] = newest.get('Created')
+                        new_cursor['Count'] = (cursor.get('Count') or 0) + len(new_entries)
+                new_cursors[entries_url] = new_cursor
+                log_details.append({'Id': id, 'Entries': propertyFilter(new_entries)})
+
+            # Save cursors only after all log services are read successfully.
+            with lock_json_file(cursor_file):
+                all_cursors = load_json_file(cursor_file)
+                # Keep cursors of log services not read this time, like 'audit' when polling 'event'
+                all_cursors.setdefault(self._ip, {}).update(new_cursors)
+                save_json_file(cursor_file, all_cursors)
+            result = {'ret': True, 'entries': log_details}
+            return result
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get new event logs. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
     def get_bmc_virtual_media(self):
         """Get virtual media of bmc
         :returns: returns List of virtual media.
@@ -357,6 +545,21 @@ class ManagerClient(RedfishBase):
         :type fsdir: string
         :returns: returns the result of exporting ffdc
         """
+        return self._wait_task(self._start_export_ffdc(data_type, fsprotocol, fsip, fsport, fsdir, fsusername, fspassword))
+
+    def lenovo_export_ffdc_nowait(self, data_type=None, fsprotocol=None, fsip=None, fsport=None, fsdir=None, fsusername=None, fspassword=None, watcher=None):
+        """Start exporting ffdc without waiting it completes.
+        Parameters are same as lenovo_export_ffdc.
+        :params watcher: TaskWatcher following the operation, default is the one shared by all clients
+        :type watcher: TaskWatcher
+        :returns: returns TaskHandle, call its wait() to get the result of exporting ffdc
+        """
+        return self._watch_task(self._start_export_ffdc(data_type, fsprotocol, fsip, fsport, fsdir, fsusername, fspassword), watcher)
+
+    def _start_export_ffdc(self, data_type=None, fsprotocol=None, fsip=None, fsport=None, fsdir=None, fsusername=None, fspassword=None):
+        """Start exporting ffdc
+        :returns: returns TaskHandle of the operation, or Dict of result if it is done already
+        """
         result = {}
         # Check parameter
         if fsprotocol and (fsip is None or fsip == '' or fsprotocol.upper() not in ['SFTP', 'TFTP', 'HTTP']):
@@ -364,7 +567,7 @@ class ManagerClient(RedfishBase):
             return result
         try:
             manager_url = self._find_manager_resource()
-            bmc_type = 'TSM' if 'Self' in manager_url else 'XCC'
+            bmc_type = self._get_bmc_type()
             
             result = self._get_url(manager_url)
             if result['ret'] == False:
@@ -373,6 +576,7 @@ class ManagerClient(RedfishBase):
             dict_bmc = result['entries']
             export_uri = ""
             local_download = False
+            slot = None
             if bmc_type == 'XCC':
                 servicedata_uri = None
                 if 'Oem' in dict_bmc and 'Lenovo' in dict_bmc['Oem'] and 'ServiceData' in dict_bmc['Oem']['Lenovo']:
@@ -415,6 +619,13 @@ class ManagerClient(RedfishBase):
             if bmc_type == 'TSM':
                 if 'Actions' in dict_bmc and 'Oem' in dict_bmc['Actions'] and \
                    '#Manager.DownloadServiceData' in dict_bmc['Actions']['Oem']:
+                    if (fsprotocol == None or fsprotocol == '') and self._upload_receiver is not None:
+                        # Let bmc upload ffdc data to the receiver run in this process
+                        slot = self._upload_receiver.register(self._ip)
+                        fsprotocol = "HTTP"
+                        fsip = self._upload_receiver.get_address(self._ip)
+                        fsport = str(self._upload_receiver.get_port())
+                        fsdir = '/' + slot.folder
                     if fsprotocol == None or fsprotocol.upper() != "HTTP":
                         msg = "Target Server only supports HTTP protocol, please specify HTTP file server to download server data."
                         result = {"ret": False, "msg": msg}
@@ -431,71 +642,79 @@ class ManagerClient(RedfishBase):
             time_start=time.time()
             response = self.post(ffdc_data_uri, body=body)
             if response.status not in [202]:
+                if slot is not None:
+                    slot.close()
                 result = {'ret': False, 'msg': "Failed to export ffdc. Error code is %s. Error message is %s. " % \
                           (response_code, response.text)}
                 LOGGER.error(result['msg'])
                 return result
             task_uri = response.dict['@odata.id']
             # Check collect result via returned task uri
-            print("Start downloading ffdc files and may take 3~10 minutes...")
-            while True:
-                response = self.get(task_uri, None)
-                if response.status not in [200, 202]:
-                    result = {'ret': False, 'msg': "Failed to get task: '%s'. Error code is %s. Error message is %s. " % \
-                              (task_uri, response.status, response.text)}
-                    LOGGER.error(result['msg'])
+            print_progress("Start downloading ffdc files and may take 3~10 minutes...")
+            check = None
+            if slot is not None:
+                check = lambda: self._check_task_upload(task_uri, slot)
+            return TaskHandle(self, task_uri, check=check, finish=lambda result: \
+                              self._finish_export_ffdc(result, task_uri, local_download, export_uri, time_start, slot))
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to export ffdc. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    def _finish_export_ffdc(self, result, task_uri, local_download, export_uri, time_start, slot=None):
+        try:
+            if slot is not None:
+                slot.close()
+                if not slot.is_received() and result.get('entries', {}).get('TaskState') == 'Completed':
+                    result = {'ret': False, 'msg': "FFDC data is not received from bmc in 10 minutes.", 'entries': result['entries']}
+                    return result
+                export_uri = ', '.join(slot.get_files())
+            if result['ret'] == False:
+                if 'entries' not in result or 'TaskState' not in result['entries']:
                     return result
+                task_state = result['entries']['TaskState']
+                if task_state not in END_TASK_STATE:
+                    result = {'ret': False, 'msg':  "It is over 10 minutes to export FFDC data.", 'entries': result['entries']}
+                    return result
+                self.delete(task_uri, None)
+                result = {"ret": False, "msg": "Failed to download FFDC data, task state is '%s'." % task_state, 'entries': result['entries']}
+                return result
 
-                time_end = time.time()
-                task_state = response.dict['TaskState']
-                if task_state == "Completed":
-                    # If the user does not specify export uri, the ffdc data file will be downloaded to the local
-                    if local_download == True:
-                        # Download FFDC data from download uri when the task completed
-                        download_uri = response.dict['Oem']['Lenovo']['FFDCForDownloading']['Path']
-                        requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-                        headers = {}
-                        headers['Content-Type'] = "application/json"
-                        # We must use session connection to get ffdc file.
-                        if self._auth == 'basic':
-                            self.login(auth='session')
-                        headers["X-Auth-Token"] = self.get_session_key()
-
-                        download_uri = "https://" + self._ip + download_uri
-                        response_download = requests.get(download_uri, headers=headers, verify=False)
-                        
-                        if response_download.status_code not in [200, 202]:
-                            result = {'ret': False, 'msg': "Failed to get ffdc data: '%s'. Error code is %s. Error message is %s. " % \
-                                      (download_uri, response_download.status_code, response_download.text)}
-                            LOGGER.error(result['msg'])
-                            return result
-                            
-                        ffdc_file_name = download_uri.split('/')[-1]
-                        ffdc_fullpath = os.getcwd() + os.sep + ffdc_file_name
-                        with open(ffdc_fullpath, 'wb') as f:
-                            f.write(response_download.content)
-
-                        time_end = time.time()
-                        print('time cost: %.2f' %(time_end-time_start)+'s')
-                        self.delete(task_uri, None)
-                        result = {'ret': True, 'msg':  "Succeed to export The FFDC data into file: '%s'." % ffdc_fullpath, 'entries': response.dict}
-                        return result
-                    else:
-                        time_end = time.time()
-                        print('time cost: %.2f' %(time_end-time_start)+'s')
-                        result = {'ret': True, 'msg':  "The FFDC data is saved in %s " % export_uri}
-                        return result
-                elif task_state in ["Exception", "Killed"]:
-                    self.delete(task_uri, None)
-                    result = {"ret": False, "msg": "Failed to download FFDC data, task state is '%s'." % task_state, 'entries': response.dict}
+            task_info = result['entries']
+            # If the user does not specify export uri, the ffdc data file will be downloaded to the local
+            if local_download == True:
+                # Download FFDC data from download uri when the task completed
+                download_uri = task_info['Oem']['Lenovo']['FFDCForDownloading']['Path']
+                headers = {}
+                headers['Content-Type'] = "application/json"
+                # We must use session connection to get ffdc file.
+                if self._auth == 'basic':
+                    self.login(auth='session')
+                headers["X-Auth-Token"] = self.get_session_key()
+
+                download_uri = "https://" + self._ip + download_uri
+                ffdc_file_name = download_uri.split('/')[-1]
+                ffdc_fullpath = os.getcwd() + os.sep + ffdc_file_name
+                # Stream ffdc data to disk, resume it when connection is dropped
+                result = download_file(download_uri, ffdc_fullpath, headers, self._get_verify(), self._download_chunk_size,
+                                       self._download_workers, self._download_retries,
+                                       timeout=self._get_timeout())
+                if result['ret'] == False:
                     return result
-                else: # task not in end state
-                    # Wait max 10 minutes to avoid endless loop.
-                    time_now = time.time()
-                    if time_now - time_start > 600:
-                        result = {'ret': False, 'msg':  "It is over 10 minutes to export FFDC data.", 'entries': response.dict}
-                        return result
-                    time.sleep(10)
+                LOGGER.info("FFDC data %s is downloaded, size is %s, sha256 is %s." % \
+                            (ffdc_fullpath, result['entries']['Size'], result['entries']['Sha256']))
+
+                time_end = time.time()
+                print_progress('time cost: %.2f' %(time_end-time_start)+'s')
+                self.delete(task_uri, None)
+                result = {'ret': True, 'msg':  "Succeed to export The FFDC data into file: '%s'." % ffdc_fullpath, 'entries': task_info}
+                return result
+            else:
+                time_end = time.time()
+                print_progress('time cost: %.2f' %(time_end-time_start)+'s')
+                result = {'ret': True, 'msg':  "The FFDC data is saved in %s " % export_uri}
+                return result
         except Exception as e:
             LOGGER.debug("%s" % traceback.format_exc())
             msg = "Failed to export ffdc. Error message: %s" % repr(e)
@@ -521,9 +740,11 @@ class ManagerClient(RedfishBase):
         :returns: returns the result of mounting virtual media
         """
         result = {}
+        # Image served by image server, kept published while it is mounted
+        published_path = None
         try:
             manager_url = self._find_manager_resource()
-            bmc_type = 'TSM' if 'Self' in manager_url else 'XCC'
+            bmc_type = self._get_bmc_type()
             
             result = self._get_collection(manager_url + '/VirtualMedia')
             if result['ret'] == False:
@@ -546,6 +767,19 @@ class ManagerClient(RedfishBase):
                     result = {'ret': False, 'msg': "There are no avaliable virtual media."}
                     return result
 
+                if fsprotocol.upper() == 'HTTP' and not fsip and self._image_server is not None:
+                    # Serve the image from this process, fsdir is the local directory of image
+                    if fsdir == None or fsdir == '':
+                        fsdir = os.getcwd()
+                    file_path = os.path.join(fsdir, image)
+                    if (not os.path.exists(file_path)):
+                        result = {'ret': False, 'msg': "File '%s' does not exist." % file_path}
+                        return result
+                    fsdir = self._image_server.publish(file_path)
+                    published_path = file_path
+                    fsip = format_host(self._image_server.get_address(self._ip))
+                    fsport = self._image_server.get_port()
+
                 # Via patch request mount virtual media
                 if fsport == None:
                     fsport = ''
@@ -591,6 +825,12 @@ class ManagerClient(RedfishBase):
                 response = self.post(insert_media_url, body=body)
                 
             if response.status in [200, 202, 204]:
+                if published_path is not None:
+                    # BMC reads the image while it is mounted, stop serving it after it is unmounted
+                    if image in self._published_media:
+                        self._image_server.unpublish(self._published_media[image])
+                    self._published_media[image] = published_path
+                    published_path = None
                 result = {'ret': True, 'msg': "Succeed to mount the image: %s." % image}
                 return result
             else:
@@ -603,6 +843,9 @@ class ManagerClient(RedfishBase):
             msg = "Failed to mount virtual media. Error message: %s" % repr(e)
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
+        finally:
+            if published_path is not None:
+                self._image_server.unpublish(published_path)
 
     def lenovo_umount_virtual_media(self, image):
         """Unmount virtual media from system.
@@ -613,7 +856,7 @@ class ManagerClient(RedfishBase):
         result = {}
         try:
             manager_url = self._find_manager_resource()
-            bmc_type = 'TSM' if 'Self' in manager_url else 'XCC'
+            bmc_type = self._get_bmc_type()
             
             result = self._get_collection(manager_url + '/VirtualMedia')
             if result['ret'] == False:
@@ -633,6 +876,9 @@ class ManagerClient(RedfishBase):
                 body = {"Image": None}
                 response = self.patch(target_vm["@odata.id"], body=body)
                 if response.status in [200,204]:
+                    published_path = self._published_media.pop(image, None)
+                    if published_path is not None and self._image_server is not None:
+                        self._image_server.unpublish(published_path)
                     result = {'ret': True, 'msg': "Succeed to unmount image '%s'." % image}
                     return result
                 else:
@@ -674,6 +920,21 @@ class ManagerClient(RedfishBase):
         :type httpdir: string
         :returns: returns the result of backuping bmc configuration
         """
+        return self._wait_task(self._start_bmc_config_backup(backup_password, backup_file, httpip, httpport, httpdir))
+
+    def lenovo_bmc_config_backup_nowait(self, backup_password, backup_file=None, httpip=None, httpport=None, httpdir=None, watcher=None):
+        """Start backing up bmc configuration without waiting it completes.
+        Parameters are same as lenovo_bmc_config_backup.
+        :params watcher: TaskWatcher following the operation, default is the one shared by all clients
+        :type watcher: TaskWatcher
+        :returns: returns TaskHandle, call its wait() to get the result of backuping bmc configuration
+        """
+        return self._watch_task(self._start_bmc_config_backup(backup_password, backup_file, httpip, httpport, httpdir), watcher)
+
+    def _start_bmc_config_backup(self, backup_password, backup_file=None, httpip=None, httpport=None, httpdir=None):
+        """Start backing up bmc configuration
+        :returns: returns TaskHandle of the operation, or Dict of result if it is done already
+        """
         result = {}
         try:
             if len(backup_password) < 9:
@@ -681,7 +942,7 @@ class ManagerClient(RedfishBase):
                 return result
 
             manager_url = self._find_manager_resource()
-            bmc_type = 'TSM' if 'Self' in manager_url else 'XCC'
+            bmc_type = self._get_bmc_type()
             
             result = self._get_url(manager_url)
             if result['ret'] == False:
@@ -720,6 +981,13 @@ class ManagerClient(RedfishBase):
                     return result
 
             if bmc_type == 'TSM':
+                slot = None
+                if httpip is None and self._upload_receiver is not None:
+                    # Let bmc upload backup file to the receiver run in this process
+                    slot = self._upload_receiver.register(self._ip)
+                    httpip = self._upload_receiver.get_address(self._ip)
+                    httpport = self._upload_receiver.get_port()
+                    httpdir = slot.folder
                 if httpip is None or httpdir is None:
                     msg = "This product only supports HTTP protocol, please specify httpip and httpdir."
                     result = {"ret": False, "msg": msg}
@@ -733,20 +1001,23 @@ class ManagerClient(RedfishBase):
                 body['folderPath'] = httpdir.strip("/")
                 export_uri = 'http://' + httpip + ':' + str(httpport) + '/' + httpdir
                 
-                print("Start backing up bmc configuration, may take 1~5 minutes ...")
+                print_progress("Start backing up bmc configuration, may take 1~5 minutes ...")
                 response = self.post(backup_target_url, body=body)
                 if response.status not in [202]:
+                    if slot is not None:
+                        slot.close()
                     result = {'ret': False, 'msg': "Failed to back up bmc configuration. Url: %s. Error code is %s. Error message is %s. " % \
                               (backup_target_url, response.status, response.text)}
                     LOGGER.error(result['msg'])
                     return result
 
                 task_uri = response.dict['@odata.id']
-                result = self._task_monitor(task_uri)
-                self.delete(task_uri, None)
-                if result['ret'] == True:
-                    result['msg'] = "Succeed to back up bmc configuration, file is saved in '%s'." % export_uri
-                return result
+                if slot is not None:
+                    return TaskHandle(self, task_uri, check=lambda: self._check_task_upload(task_uri, slot),
+                                      finish=lambda result: self._finish_config_task(result, task_uri, \
+                                      "Succeed to back up bmc configuration, file is saved in '%s'.", slot))
+                return TaskHandle(self, task_uri, finish=lambda result: self._finish_config_task(result, task_uri, \
+                                  "Succeed to back up bmc configuration, file is saved in '%s'." % export_uri))
         except Exception as e:
             LOGGER.debug("%s" % traceback.format_exc())
             msg = "Failed to back up bmc configuration. Error message: %s" % repr(e)
@@ -768,6 +1039,21 @@ class ManagerClient(RedfishBase):
         :type httpdir: string
         :returns: returns the result of restoring bmc configuration
         """
+        return self._wait_task(self._start_bmc_config_restore(backup_password, backup_file, httpip, httpport, httpdir))
+
+    def lenovo_bmc_config_restore_nowait(self, backup_password, backup_file=None, httpip=None, httpport=None, httpdir=None, watcher=None):
+        """Start restoring bmc configuration without waiting it completes.
+        Parameters are same as lenovo_bmc_config_restore.
+        :params watcher: TaskWatcher following the operation, default is the one shared by all clients
+        :type watcher: TaskWatcher
+        :returns: returns TaskHandle, call its wait() to get the result of restoring bmc configuration
+        """
+        return self._watch_task(self._start_bmc_config_restore(backup_password, backup_file, httpip, httpport, httpdir), watcher)
+
+    def _start_bmc_config_restore(self, backup_password, backup_file=None, httpip=None, httpport=None, httpdir=None):
+        """Start restoring bmc configuration
+        :returns: returns TaskHandle of the operation, or Dict of result if it is done already
+        """
         result = {}
         try:
             if len(backup_password) < 9:
@@ -775,7 +1061,7 @@ class ManagerClient(RedfishBase):
                 return result
 
             manager_url = self._find_manager_resource()
-            bmc_type = 'TSM' if 'Self' in manager_url else 'XCC'
+            bmc_type = self._get_bmc_type()
             
             result = self._get_url(manager_url)
             if result['ret'] == False:
@@ -803,7 +1089,7 @@ class ManagerClient(RedfishBase):
                 restore_body = {}
                 restore_body = {"ConfigContent": list_data, "Passphrase": backup_password}
                 restore_target_url = result['entries']['Actions']['#LenovoConfigurationService.RestoreConfiguration']['target']
-                print("Start restoring bmc configuration, may take 1~5 minutes ...")
+                print_progress("Start restoring bmc configuration, may take 1~5 minutes ...")
                 response = self.post(restore_target_url, body=restore_body)
                 
                 if response.status not in [200]:
@@ -812,18 +1098,9 @@ class ManagerClient(RedfishBase):
                     LOGGER.error(result['msg'])
                     return result
 
-                # Check restore status after action
-                for i in range(120): # Wait max 10 minutes
-                    result = self._get_url(config_url)
-                    if result['ret'] == False:
-                        return result
-                    if 'RestoreStatus' in result['entries'] and 'Restore was successful' in result['entries']['RestoreStatus']:
-                        result = {'ret': True, 'msg':"Succeed to restore bmc configuration."}
-                        return result
-                    time.sleep(5)
-
-                result = {'ret': False, 'msg':"Restoring bmc configuration does not finished in 10 minutes."}
-                return result
+                # Check restore status after action, wait max 10 minutes
+                return TaskHandle(self, check=lambda: self._check_config_restore(config_url),
+                                  timeout_msg="Restoring bmc configuration does not finished in 10 minutes.")
 
             if bmc_type == 'TSM':
                 if httpip is None or httpdir is None or backup_file is None:
@@ -839,7 +1116,7 @@ class ManagerClient(RedfishBase):
                 export_uri = 'http://' + httpip + ':' + str(httpport) + '/' + httpdir
 
                 restore_url = result['entries']['Actions']['Oem']['#Manager.Restore']['target']              
-                print("Start restoring bmc configuration, may take 1~5 minutes ...")
+                print_progress("Start restoring bmc configuration, may take 1~5 minutes ...")
                 response = self.post(restore_url, body=body)
                 if response.status not in [202]:
                     result = {'ret': False, 'msg': "Failed to restore bmc configuration. Url: %s. Error code is %s. Error message is %s. " % \
@@ -847,17 +1124,44 @@ class ManagerClient(RedfishBase):
                     LOGGER.error(result['msg'])
                     return result
                 task_uri = response.dict['@odata.id']
-                result = self._task_monitor(task_uri)
-                self.delete(task_uri, None)
-                if result['ret'] == True:
-                    result['msg'] = "Succeed to restore bmc configuration. BMC will restart to reload the configuration, may take 1~5 minutes ..."
-                return result
+                return TaskHandle(self, task_uri, finish=lambda result: self._finish_config_task(result, task_uri, \
+                                  "Succeed to restore bmc configuration. BMC will restart to reload the configuration, may take 1~5 minutes ..."))
         except Exception as e:
             LOGGER.debug("%s" % traceback.format_exc())
             msg = "Failed to restore bmc configuration. Error message: %s" % repr(e)
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
 
+    def _check_config_restore(self, config_url):
+        # Restore status changes while polling, always read it from bmc
+        result = self._get_url(config_url, use_cache=False)
+        if result['ret'] == False:
+            return True, result, None
+        if 'RestoreStatus' in result['entries'] and 'Restore was successful' in result['entries']['RestoreStatus']:
+            result = {'ret': True, 'msg':"Succeed to restore bmc configuration."}
+            return True, result, None
+        return False, result, None
+
+    def _finish_config_task(self, result, task_uri, msg, slot=None):
+        self.delete(task_uri, None)
+        if slot is not None:
+            # msg has a placeholder for files received
+            slot.close()
+            if not slot.is_received() and result.get('entries', {}).get('TaskState') == 'Completed':
+                result = {'ret': False, 'msg': "File is not received from bmc in 10 minutes.", 'entries': result['entries']}
+                return result
+            msg = msg % ', '.join(slot.get_files())
+        if result['ret'] == True:
+            result['msg'] = msg
+        return result
+
+    def _check_task_upload(self, task_uri, slot):
+        # Task uploading file is done only when the file is received by receiver too
+        done, result, retry_after = self._check_task(task_uri)
+        if done and result['ret'] == True and not slot.is_received():
+            return False, result, None
+        return done, result, retry_after
+
     def reset_bmc(self, reset_type=None):
         """Reset bmc
         :params reset_type: for XCC: ['GracefulRestart', 'ForceRestart']. for TSM: ['ForceRestart']
@@ -866,10 +1170,9 @@ class ManagerClient(RedfishBase):
         """
         result = {}
         try:
-            manager_url = self._find_manager_resource()
-            bmc_type = 'TSM' if 'Self' in manager_url else 'XCC'
+            bmc_type = self._get_bmc_type()
             
-            result = self._get_url(manager_url)
+            result = self._get_manager_actions()
             if result['ret'] == False:
                 return result
 
@@ -878,7 +1181,7 @@ class ManagerClient(RedfishBase):
                 result = {'ret': False, 'msg': "Please specify reset_type in %s." % reset_scope}
                 return result
 
-            reset_url = result['entries']['Actions']['#Manager.Reset']['target']
+            reset_url = result['entries']['#Manager.Reset']
             # Build request body and send requests to restart manager
             body = {}
             if reset_type != None:
@@ -981,7 +1284,15 @@ manager_cmd_list = {
         },
         "get_event_log": {
                 'help': "Get event logs of manager, system or chassis",
-                'args': [{'argname': "--type", 'type': str, 'nargs': "?", 'required': False, 'help': "Log of 'manager', 'system' or 'chassis', default is 'manager'"}]
+                'args': [{'argname': "--type", 'type': str, 'nargs': "?", 'required': False, 'help': "Log of 'manager', 'system' or 'chassis', default is 'manager'"},
+                         {'argname': "--page_size", 'type': int, 'nargs': "?", 'required': False, 'help': "Log entries per page requested from bmc, default is the page size of bmc"},
+                         {'argname': "--log_file", 'type': str, 'nargs': "?", 'required': False, 'help': "Write log entries into this file as json lines while reading, instead of printing them"}]
+        },
+        "get_new_event_log": {
+                'help': "Get event logs created since last call, the first call gets all event logs",
+                'args': [{'argname': "--type", 'type': str, 'nargs': "?", 'required': False, 'help': "Log of 'manager', 'system' or 'chassis', default is 'manager'"},
+                         {'argname': "--cursor_file", 'type': str, 'nargs': "?", 'required': False, 'help': "File to save last log entry seen of each bmc. Default is 'event_log_cursor.json' under current working directory"},
+                         {'argname': "--page_size", 'type': int, 'nargs': "?", 'required': False, 'help': "Log entries per page requested from bmc, default is the page size of bmc"}]
         },
         "set_bmc_networkprotocol": {
                 'help': "Set network service of bmc, like: enable/disable service, or change the port",
@@ -1094,7 +1405,12 @@ def run_manager_subcommand(args):
     elif cmd == 'get_event_log':
         if args.type == None:
             args.type = 'manager'
-        result = client.get_event_log(args.type)
+        result = client.get_event_log(args.type, args.page_size, args.log_file)
+
+    elif cmd == 'get_new_event_log':
+        if args.type == None:
+            args.type = 'manager'
+        result = client.get_new_event_log(args.type, args.cursor_file, args.page_size)
 
     elif cmd == 'get_bmc_users':
         result = client.get_bmc_users()
@@ -0,0 +1,159 @@
+###
+#
+# Lenovo Redfish Library - Streaming multipart encoder for uploading images
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import os
+import time
+import binascii
+import requests
+
+from .utils import *
+from .deadline import get_current_deadline
+
+# Bytes read from image file at one time.
+DEFAULT_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class MultipartEncoder(object):
+    """multipart/form-data body generated chunk by chunk while it is sent.
+    Only one chunk of image is in memory at a time, so memory used by an upload does not
+    depend on image size. Length of body is known in advance, requests sends it with
+    Content-Length instead of chunked transfer encoding. When a deadline is given, upload stops
+    at the next chunk once the deadline is over or cancelled.
+
+    Example:
+        with open(file_path, 'rb') as f:
+            encoder = MultipartEncoder([('data-binary', ('image.bin', f, None))])
+            requests.post(url, data=encoder, headers={'Content-Type': encoder.content_type})
+    """
+
+    def __init__(self, fields, chunk_size=DEFAULT_UPLOAD_CHUNK_SIZE, callback=None, boundary=None, deadline=None):
+        """Initialize MultipartEncoder
+        :param fields: list of (name, (filename, data, content_type)). data is file object opened in binary mode, bytes or str.
+                       content_type can be None, then no Content-Type is sent for that part.
+        :type fields: list
+        :param chunk_size: bytes read from file at one time
+        :type chunk_size: int
+        :param callback: called as callback(bytes_sent, bytes_total, bytes_per_second) after each chunk
+        :type callback: function
+        :param boundary: boundary of parts, random one is generated by default
+        :type boundary: str
+        :param deadline: deadline of the upload
+        :type deadline: Deadline
+        """
+        self._chunk_size = max(1, int(chunk_size))
+        self._callback = callback
+        self._deadline = deadline
+        self._boundary = boundary or binascii.hexlify(os.urandom(16)).decode('ascii')
+        self.content_type = 'multipart/form-data; boundary=%s' % self._boundary
+        # Each part is (header bytes, data, offset of file data, length of data)
+        self._parts = []
+        for name, value in fields:
+            filename, data, content_type = value
+            header = '--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\n' % (self._boundary, name, filename)
+            if content_type:
+                header += 'Content-Type: %s\r\n' % content_type
+            header += '\r\n'
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            if isinstance(data, bytes):
+                offset, length = 0, len(data)
+            else:
+                offset = data.tell()
+                length = os.fstat(data.fileno()).st_size - offset
+            self._parts.append((header.encode('utf-8'), data, offset, length))
+        self._footer = ('--%s--\r\n' % self._boundary).encode('utf-8')
+        self._length = sum(len(header) + length + 2 for header, data, offset, length in self._parts) + len(self._footer)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        time_start = time.time()
+        sent = 0
+        for header, data, offset, length in self._parts:
+            yield header
+            sent += len(header)
+            if isinstance(data, bytes):
+                for start in range(0, length, self._chunk_size):
+                    chunk = data[start:start + self._chunk_size]
+                    sent += len(chunk)
+                    yield chunk
+                    self._report(sent, time_start)
+            else:
+                # Start from the beginning again when body is sent once more
+                data.seek(offset)
+                remaining = length
+                while remaining > 0:
+                    chunk = data.read(min(self._chunk_size, remaining))
+                    if not chunk:
+                        raise IOError("File is truncated while uploading it.")
+                    remaining -= len(chunk)
+                    sent += len(chunk)
+                    yield chunk
+                    self._report(sent, time_start)
+            yield b'\r\n'
+            sent += 2
+        yield self._footer
+        self._report(sent + len(self._footer), time_start)
+
+    def _report(self, sent, time_start):
+        if self._deadline is not None:
+            self._deadline.check()
+        if self._callback is None:
+            return
+        elapsed = time.time() - time_start
+        try:
+            self._callback(sent, self._length, sent / elapsed if elapsed > 0 else 0)
+        except Exception as e:
+            LOGGER.error("Failed to report upload progress. Error message: %s" % repr(e))
+
+
+def post_multipart(client, url, fields, chunk_size=DEFAULT_UPLOAD_CHUNK_SIZE, callback=None, content_type=None):
+    """Post multipart body to bmc with streaming upload
+    :param client: client logged in
+    :type client: RedfishBase
+    :param url: full url to post
+    :type url: str
+    :param fields: parts of body, see MultipartEncoder
+    :type fields: list
+    :param content_type: Content-Type header sent instead of multipart/form-data one. Body is still multipart,
+                         same as requests does when files are posted with Content-Type set by caller.
+    :type content_type: str
+    :returns: returns requests.Response
+    """
+    encoder = MultipartEncoder(fields, chunk_size=chunk_size, callback=callback, deadline=get_current_deadline())
+    headers = client._get_auth_headers()
+    headers['Content-Type'] = content_type or encoder.content_type
+    if not client._request_hooks:
+        return requests.post(url, headers=headers, data=encoder, verify=client._get_verify(), timeout=client._get_timeout())
+    # Sent outside of client session, connect and tls time are not known
+    time_start = time.time()
+    response = None
+    error = None
+    try:
+        response = requests.post(url, headers=headers, data=encoder, verify=client._get_verify(), timeout=client._get_timeout())
+        return response
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        client._record_request('POST', url, response.status_code if response is not None else None, response, time_start,
+                               {'Connect': 0.0, 'Tls': 0.0, 'Attempts': 1, 'Resends': 0}, len(encoder), error)
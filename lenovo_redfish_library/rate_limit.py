@@ -0,0 +1,209 @@
+###
+#
+# Lenovo Redfish Library - Per BMC rate limiter and circuit breaker
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import time
+import threading
+import requests
+
+from .utils import *
+from .task_monitor import parse_retry_after, MAX_RETRY_AFTER
+
+# Times one request is retried when bmc returns 429 Too Many Requests or 503 Service Unavailable.
+DEFAULT_BUSY_RETRIES = 2
+# Consecutive failures (connection errors, timeouts, 503) opening the circuit of a bmc.
+DEFAULT_BREAKER_FAILURES = 5
+# Seconds the circuit stays open before one request is let through to probe the bmc.
+DEFAULT_BREAKER_RESET_TIME = 30
+
+# Guards shared by all clients of this process, keyed by bmc ip.
+_host_guards = {}
+_host_guards_lock = threading.Lock()
+
+
+class CircuitOpen(Exception):
+    """Request is not sent because bmc stopped responding"""
+    pass
+
+
+class TokenBucket(object):
+    """Allow rate requests per second on average, and up to burst requests at once"""
+
+    def __init__(self, rate, burst=None):
+        """Initialize TokenBucket
+        :param rate: requests per second
+        :type rate: float
+        :param burst: requests sent at once after idle time, default is rate rounded up
+        :type burst: int
+        """
+        self._rate = float(rate)
+        self._burst = float(max(1, burst if burst else int(self._rate + 0.999)))
+        self._tokens = self._burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token
+        :returns: returns Seconds to wait before sending the request
+        """
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self._rate
+
+
+class CircuitBreaker(object):
+    """Fail fast for bmc which stopped responding.
+    After failures consecutive failures the circuit opens and requests fail at once.
+    When reset_time is over it is half-open, one request probes the bmc and closes
+    the circuit if it succeeds, or opens it again if it fails.
+    """
+
+    CLOSED = 'Closed'
+    OPEN = 'Open'
+    HALF_OPEN = 'HalfOpen'
+
+    def __init__(self, failures=DEFAULT_BREAKER_FAILURES, reset_time=DEFAULT_BREAKER_RESET_TIME):
+        self.failures = failures
+        self.reset_time = reset_time
+        self._state = self.CLOSED
+        self._failure_count = 0
+        self._opened_at = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def get_state(self):
+        return self._state
+
+    def is_failing(self):
+        """True if last requests failed, retries are not worth it"""
+        return self._failure_count > 0
+
+    def allow(self, host):
+        """Check whether request can be sent, CircuitOpen is raised if not"""
+        if self.failures <= 0:
+            return
+        with self._lock:
+            if self._state == self.OPEN:
+                wait_time = self._opened_at + self.reset_time - time.time()
+                if wait_time > 0:
+                    raise CircuitOpen("%s is not responding after %s failures, retry after %.0f seconds." % \
+                                      (host, self._failure_count, wait_time))
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpen("%s is not responding, it is being probed by another request." % host)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failure_count = 0
+            self._probing = False
+
+    def release(self):
+        """Request allowed is not sent, let another request probe the bmc"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failure_count += 1
+            self._probing = False
+            if self.failures > 0 and (self._state == self.HALF_OPEN or self._failure_count >= self.failures):
+                if self._state != self.OPEN:
+                    LOGGER.info("Circuit is open after %s failures." % self._failure_count)
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+
+class HostGuard(object):
+    """Rate limiter, Retry-After backoff and circuit breaker of one bmc, shared by all its clients"""
+
+    def __init__(self, host):
+        self.host = host
+        self.busy_retries = DEFAULT_BUSY_RETRIES
+        self.breaker = CircuitBreaker()
+        self._bucket = None
+        self._bucket_settings = (0, None)
+        self._not_before = 0
+        self._lock = threading.Lock()
+
+    def configure(self, rate=None, burst=None, busy_retries=None, breaker_failures=None, breaker_reset_time=None):
+        """Change settings, None keeps the current one. rate 0 removes the rate limit."""
+        with self._lock:
+            if rate is not None and (rate, burst) != self._bucket_settings:
+                # Clients created later with same settings keep tokens of the bucket
+                self._bucket = TokenBucket(rate, burst) if rate > 0 else None
+                self._bucket_settings = (rate, burst)
+            if busy_retries is not None:
+                self.busy_retries = max(0, int(busy_retries))
+            if breaker_failures is not None:
+                self.breaker.failures = int(breaker_failures)
+            if breaker_reset_time is not None:
+                self.breaker.reset_time = float(breaker_reset_time)
+
+    def get_delay(self):
+        """Check circuit and take a token
+        :returns: returns Seconds to wait before sending the request. CircuitOpen is raised if bmc is not responding.
+        """
+        self.breaker.allow(self.host)
+        with self._lock:
+            bucket = self._bucket
+            delay = max(0, self._not_before - time.time())
+        if bucket is not None:
+            delay = max(delay, bucket.reserve())
+        return delay
+
+    def record_busy(self, retry_after, attempt):
+        """Record 429 or 503 response, following requests to bmc wait for Retry-After
+        :returns: returns Seconds to wait before retrying
+        """
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = min(2 ** attempt, MAX_RETRY_AFTER)
+        delay = min(delay, MAX_RETRY_AFTER)
+        with self._lock:
+            self._not_before = max(self._not_before, time.time() + delay)
+        return delay
+
+
+def get_connection_failure(error):
+    """Find connection error or timeout causing error, like the one wrapped by RetriesExhaustedError
+    :returns: returns the requests exception, or None if error is not caused by connection to bmc
+    """
+    while error is not None:
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return error
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def get_host_guard(host):
+    """Get HostGuard of bmc, shared by all clients of this process"""
+    with _host_guards_lock:
+        if host not in _host_guards:
+            _host_guards[host] = HostGuard(host)
+        return _host_guards[host]
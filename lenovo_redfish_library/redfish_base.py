@@ -28,19 +28,59 @@ import json
 import traceback 
 import requests
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 from redfish.rest.v1 import HttpClient
 from .utils import *
+from .session_cache import SessionCache
+from .registry_cache import RegistryCache
+from .capability_profile import ProfileCache, DEFAULT_PROFILE_TTL
+from .task_monitor import END_TASK_STATE, TaskHandle, get_task_watcher
+from .multipart_upload import DEFAULT_UPLOAD_CHUNK_SIZE
+from .file_download import DEFAULT_DOWNLOAD_CHUNK_SIZE, DEFAULT_DOWNLOAD_RETRIES
+from .response_cache import ResponseCache, DEFAULT_RESPONSE_CACHE_SIZE, DEFAULT_RESPONSE_TTL
+from .single_flight import SingleFlight
+from .rate_limit import get_host_guard, get_connection_failure
+from .deadline import DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, get_current_deadline, run_in_deadline, deadline_scope
+from .request_profiler import TimedHTTPAdapter, begin_timing, end_timing, add_timing, get_retries, get_uri_template, get_default_request_hooks
 
 warnings.filterwarnings('ignore')
 
 #LOGGER = logging.getLogger(__name__)
 
+# Default number of concurrent requests used to read the members of one collection.
+DEFAULT_MAX_WORKERS = 4
+
+
+def get_expand_query(features):
+    """Get the $expand query supported by the service, shared by sync and asyncio clients
+    :params features: ProtocolFeaturesSupported of service root
+    :type features: dict
+    :returns: returns String of $expand query, or '' if the service does not support it
+    """
+    expand_query = ''
+    expand = features.get('ExpandQuery', {}) if isinstance(features, dict) else {}
+    if isinstance(expand, dict):
+        if expand.get('NoLinks') == True:
+            expand_query = '$expand=.'
+        elif expand.get('ExpandAll') == True:
+            expand_query = '$expand=*'
+        if expand_query and expand.get('Levels') == True:
+            expand_query = expand_query + '($levels=1)'
+    return expand_query
+
+
+def get_collection_key(suburl):
+    """Get path of collection without query and trailing '/', collections rejecting $expand are remembered by it"""
+    return suburl.partition('?')[0].rstrip('/')
+
+
 class RedfishBase(HttpClient):
     """Base class for accessing lenovo Redfish service"""
 
     def __init__(self, ip='', username='', password='',
-                 configfile='config.ini', auth=''):
+                 configfile='config.ini', auth='', session=None):
         """Initialize RedfishBase
 
         :param ip: The url of the remote system
@@ -53,6 +93,8 @@ class RedfishBase(HttpClient):
         :type configfile: str
         :param auth: basic or session
         :type auth: str
+        :param session: LenovoRedfishSession to share login, connections and resource urls with other clients
+        :type session: LenovoRedfishSession
         """
 
         self._ip = ip
@@ -68,6 +110,39 @@ class RedfishBase(HttpClient):
         self._suburl_chassis = ''
         self._long_connection = False
         self._bmc_type = ''
+        self._max_workers = DEFAULT_MAX_WORKERS
+        self._protocol_features = None
+        self._expand_query = None
+        # Collections rejecting $expand although the service announces it
+        self._expand_rejected = set()
+        self._round_trips_saved = 0
+        self._counter_lock = threading.Lock()
+        self._session_cache = None
+        self._registry_cache = RegistryCache()
+        self._profile_cache = None
+        self._profile = None
+        self._task_events = False
+        self._upload_chunk_size = DEFAULT_UPLOAD_CHUNK_SIZE
+        self._upload_callback = None
+        self._download_chunk_size = DEFAULT_DOWNLOAD_CHUNK_SIZE
+        self._download_workers = 1
+        self._download_retries = DEFAULT_DOWNLOAD_RETRIES
+        self._upload_receiver = None
+        self._image_server = None
+        # Images mounted as virtual media, served by image server until they are unmounted
+        self._published_media = {}
+        self._response_cache = None
+        self._single_flight = SingleFlight()
+        self._connect_timeout = DEFAULT_CONNECT_TIMEOUT
+        self._read_timeout = DEFAULT_READ_TIMEOUT
+        self._request_hooks = get_default_request_hooks()
+        throttle = {}
+        max_retry = 3
+        # Thread sending login or logout requests, whose 401 must not re-create the session
+        self._auth_thread = None
+        # Only one thread re-creates the session after concurrent requests get 401
+        self._auth_lock = threading.Lock()
+        self._shared_session = session
 
         config_ini_info = {}
         # Get configuration file info
@@ -86,6 +161,40 @@ class RedfishBase(HttpClient):
             self._systemid = result['entries']['systemid']
             self._managerid = result['entries']['managerid']
             self._cafile = result['entries']['cafile']
+            if 'maxworkers' in result['entries'] and result['entries']['maxworkers'] != '':
+                self._max_workers = int(result['entries']['maxworkers'])
+            if 'sessioncache' in result['entries'] and result['entries']['sessioncache'] != '':
+                self._session_cache = SessionCache(result['entries']['sessioncache'])
+            if 'registrycache' in result['entries'] and result['entries']['registrycache'] != '':
+                self._registry_cache = RegistryCache(result['entries']['registrycache'])
+            profile_ttl = DEFAULT_PROFILE_TTL
+            if 'profilettl' in result['entries'] and result['entries']['profilettl'] != '':
+                profile_ttl = int(result['entries']['profilettl'])
+            self._profile_cache = ProfileCache(result['entries'].get('profilecache', ''), profile_ttl)
+            if 'uploadchunksize' in result['entries'] and result['entries']['uploadchunksize'] != '':
+                self._upload_chunk_size = int(result['entries']['uploadchunksize'])
+            if 'downloadworkers' in result['entries'] and result['entries']['downloadworkers'] != '':
+                self._download_workers = max(1, int(result['entries']['downloadworkers']))
+            if 'connecttimeout' in result['entries'] and result['entries']['connecttimeout'] != '':
+                self._connect_timeout = float(result['entries']['connecttimeout'])
+            if 'readtimeout' in result['entries'] and result['entries']['readtimeout'] != '':
+                self._read_timeout = float(result['entries']['readtimeout'])
+            # Settings of [ThrottleCfg], shared by all clients of the bmc
+            for key, name, convert in [('requestrate', 'rate', float), ('requestburst', 'burst', int),
+                                       ('busyretries', 'busy_retries', int), ('breakerfailures', 'breaker_failures', int),
+                                       ('breakerresettime', 'breaker_reset_time', float)]:
+                if key in result['entries'] and result['entries'][key] != '':
+                    throttle[name] = convert(result['entries'][key])
+            if 'maxretry' in result['entries'] and result['entries']['maxretry'] != '':
+                max_retry = int(result['entries']['maxretry'])
+            if 'responsecachesize' in result['entries'] and result['entries']['responsecachesize'] not in ['', '0']:
+                response_ttl = DEFAULT_RESPONSE_TTL
+                if 'responsecachettl' in result['entries'] and result['entries']['responsecachettl'] != '':
+                    response_ttl = int(result['entries']['responsecachettl'])
+                self._response_cache = ResponseCache(int(result['entries']['responsecachesize']), response_ttl)
+
+        if self._profile_cache is None:
+            self._profile_cache = ProfileCache()
 
         if self._auth not in ['session', 'basic']:
             self._auth = 'session'
@@ -93,13 +202,34 @@ class RedfishBase(HttpClient):
         if not self._user  or not self._password or not self._ip:
             raise Exception("Please check ip, user and password are correct.")
 
+        # Rate limit and circuit breaker are shared by all clients of the bmc
+        self._host_guard = get_host_guard(self._ip)
+        self._host_guard.configure(**throttle)
+
         login_host = "https://" + self._ip
         super(RedfishBase, self).__init__(
             base_url=login_host, 
             username=self._user, password=self._password, 
             default_prefix='/redfish/v1', capath=None, 
-            cafile=None, timeout=None, max_retry=3
+            cafile=None, timeout=(self._connect_timeout, self._read_timeout), max_retry=max_retry,
+            https_adapter=TimedHTTPAdapter() if self._request_hooks else None
         )
+        self._member_slots = threading.BoundedSemaphore(max(1, self._max_workers))
+        if self._shared_session is not None:
+            # Use the keep-alive connections of the session
+            self._session = self._shared_session.get_http_session()
+            # Identical GETs of all clients of the session are coalesced
+            self._single_flight = self._shared_session.get_single_flight()
+
+    def get_root_object(self):
+        # Clients attached to one LenovoRedfishSession reuse the service root read by the session.
+        if self._shared_session is not None:
+            owner = self._shared_session.get_owner()
+            if owner is not self and getattr(owner, 'root_resp', None) is not None:
+                self.root = owner.root
+                self.root_resp = owner.root_resp
+                return
+        return super(RedfishBase, self).get_root_object()
  
     # Once enabling this, logout will not clear the session info.
     # When you want to run several functions continuously, 
@@ -108,10 +238,278 @@ class RedfishBase(HttpClient):
         """enable/disable long connection"""
         self._long_connection = is_enable
 
+    # Once enabling this, session created is saved into cache file and reused by next client
+    # of same ip, user and auth, even in another process. logout will keep the session alive.
+    # Session expired is re-created automatically when bmc returns 401.
+    def set_session_cache(self, cache_file):
+        """enable session cache with cache file, or disable it with None"""
+        self._session_cache = SessionCache(cache_file) if cache_file else None
+
+    # Bios attribute registries are always cached in memory and shared by all clients.
+    # Once setting cache directory, registries are also saved on disk and reused by next run.
+    def set_registry_cache(self, cache_dir=''):
+        """set directory to save bios attribute registries, empty means memory only"""
+        self._registry_cache = RegistryCache(cache_dir)
+
+    # Capability profile of bmc is always cached in memory and shared by all clients.
+    # Once setting cache file, profiles are also saved on disk and reused by next run.
+    # Set ttl to 0 to disable it.
+    def set_profile_cache(self, cache_file='', ttl=DEFAULT_PROFILE_TTL):
+        """set file to save capability profiles and seconds they are valid"""
+        self._profile_cache = ProfileCache(cache_file, ttl)
+        self._profile = None
+
+    # Once enabling this, task monitor also listens to TaskStateChanged events from EventService
+    # SSE stream, so the end of task is seen without waiting for next poll.
+    def set_task_events(self, is_enable=True):
+        """enable/disable waking up task monitor by events"""
+        self._task_events = is_enable
+
+    # Images are uploaded chunk by chunk, only one chunk is in memory for each upload.
+    # callback(bytes_sent, bytes_total, bytes_per_second) is called after each chunk is sent.
+    def set_upload_options(self, chunk_size=DEFAULT_UPLOAD_CHUNK_SIZE, callback=None):
+        """set chunk size and progress callback of image uploading"""
+        self._upload_chunk_size = max(1, int(chunk_size))
+        self._upload_callback = callback
+
+    # Files like FFDC data are streamed to disk chunk by chunk, and resumed by Range when connection is dropped.
+    # When workers is more than 1 and bmc supports Range, big file is fetched by several ranges in parallel.
+    def set_download_options(self, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE, workers=1, retries=DEFAULT_DOWNLOAD_RETRIES):
+        """set chunk size, parallel ranges and resume retries of file downloading"""
+        self._download_chunk_size = max(1, int(chunk_size))
+        self._download_workers = max(1, int(workers))
+        self._download_retries = max(0, int(retries))
+
+    # Once setting an UploadReceiver, operations of TSM which upload files to an http server
+    # (export ffdc, bmc config backup) use the receiver when no http file server is specified.
+    def set_upload_receiver(self, receiver):
+        """set UploadReceiver to receive files uploaded by bmc, or None to disable it"""
+        self._upload_receiver = receiver
+
+    # Once setting an ImageServer, images pulled by bmc over HTTP (firmware SimpleUpdate, virtual media)
+    # are served by this process when no file server ip is specified. fsdir is then the local directory of image.
+    # Images are served until the update task is done, or until the virtual media is unmounted.
+    def set_image_server(self, server):
+        """set ImageServer to serve images pulled by bmc, or None to disable it"""
+        self._image_server = server
+
+    # Once enabling this, resources got by this client are reused until their TTL expires, then revalidated
+    # by If-None-Match when bmc gives etag. ttls overrides seconds of resource types, like {'Power': 5, 'Bios': 60}.
+    # Resources are dropped after PATCH, PUT, POST or DELETE to their uri, or when cache is over max_bytes.
+    def set_response_cache(self, is_enable=True, max_bytes=DEFAULT_RESPONSE_CACHE_SIZE, ttl=DEFAULT_RESPONSE_TTL, ttls=None):
+        """enable/disable caching resources read by this client"""
+        self._response_cache = ResponseCache(max_bytes, ttl, ttls) if is_enable else None
+
+    def get_response_cache_stats(self):
+        """get hits, revalidations and misses of response cache, empty if it is not enabled"""
+        if self._response_cache is None:
+            return {}
+        return self._response_cache.get_stats()
+
+    # Every request waits at most connect seconds for connection and read seconds between bytes of response.
+    # Operations run within deadline_scope(Deadline(total=...)) are also limited by the time left of the deadline.
+    def set_timeouts(self, connect=DEFAULT_CONNECT_TIMEOUT, read=DEFAULT_READ_TIMEOUT):
+        """set connect and read timeout of requests"""
+        self._connect_timeout = connect
+        self._read_timeout = read
+        self._timeout = (connect, read)
+
+    # Requests to one bmc ip are limited by a token bucket of rate requests per second and burst at once,
+    # shared by all clients of the bmc in this process. 429 and 503 are retried busy_retries times after Retry-After,
+    # and after breaker_failures consecutive failures requests fail at once until breaker_reset_time is over.
+    # None keeps the current setting, rate 0 removes the rate limit and breaker_failures 0 disables the breaker.
+    def set_throttle(self, rate=None, burst=None, busy_retries=None, breaker_failures=None, breaker_reset_time=None):
+        """set rate limit, busy retries and circuit breaker of the bmc"""
+        self._host_guard.configure(rate, burst, busy_retries, breaker_failures, breaker_reset_time)
+
+    # Concurrent identical GETs from threads sharing this client (or its LenovoRedfishSession) are sent once,
+    # threads coming while the request is in flight wait and get a copy of its result. It is enabled by default.
+    def set_request_coalescing(self, is_enable=True):
+        """enable/disable coalescing concurrent identical GETs"""
+        self._single_flight = SingleFlight() if is_enable else None
+
+    def get_request_coalescing_stats(self):
+        """get GETs executed and coalesced, empty if coalescing is not enabled"""
+        if self._single_flight is None:
+            return {}
+        return self._single_flight.get_stats()
+
+    # Each request sent to bmc is passed to hooks as a Dict of 'Host', 'Method', 'Uri', 'UriTemplate', 'Status', 'Bytes',
+    # 'RequestBytes', 'Connect', 'Tls', 'Ttfb', 'Total', 'Retries', 'Start' and 'Error', like RequestProfiler collects.
+    # Hooks are called by the thread sending the request, they should be quick and thread safe.
+    def add_request_hook(self, hook):
+        """add function called with timing record of each request"""
+        if not isinstance(self._session.get_adapter('https://'), TimedHTTPAdapter):
+            self._session.mount('https://', TimedHTTPAdapter())
+        self._request_hooks = self._request_hooks + [hook]
+
+    def remove_request_hook(self, hook):
+        """remove function added by add_request_hook"""
+        self._request_hooks = [item for item in self._request_hooks if item is not hook]
+
+    # Members of one collection are read concurrently by at most max_workers requests.
+    # Set it to 1 to read members one by one.
+    def set_max_workers(self, max_workers=DEFAULT_MAX_WORKERS):
+        """set the maximum number of concurrent requests for one client"""
+        self._max_workers = max(1, int(max_workers))
+        self._member_slots = threading.BoundedSemaphore(self._max_workers)
+
+    def _get_profile_key(self):
+        return "%s|%s|%s|%s" % (self._ip, self._systemid, self._managerid, self._chassisid)
+
+    def _get_service_id(self):
+        root = getattr(self, 'root', None) or {}
+        return "%s|%s" % (root.get('UUID', ''), root.get('RedfishVersion', ''))
+
+    def _get_profile_value(self, name):
+        """Get value from capability profile of bmc
+        :params name: name of value, like 'SystemUrl', 'BmcType' or 'HttpPushUri'
+        :type name: string
+        :returns: returns value, or None if it is not known yet
+        """
+        if self._profile is None:
+            self._profile = self._profile_cache.load(self._get_profile_key(), self._get_service_id()) or {}
+        return self._profile.get(name)
+
+    def _set_profile_values(self, **values):
+        """Save values discovered into capability profile of bmc"""
+        profile = self._profile_cache.update(self._get_profile_key(), self._get_service_id(), values)
+        if profile is not None:
+            self._profile = profile
+
+    def _invalidate_profile(self):
+        """Forget capability profile of bmc, like after bmc firmware is updated"""
+        self._profile_cache.remove(self._get_profile_key())
+        self._profile = {}
+
+    def _check_firmware_version(self, manager):
+        # Drop capability profile once bmc firmware changes.
+        version = manager.get('FirmwareVersion') if isinstance(manager, dict) else None
+        known_version = self._get_profile_value('FirmwareVersion')
+        if version is None or version == known_version:
+            return
+        if known_version is not None:
+            LOGGER.info("Firmware of %s changed from %s to %s, profile is refreshed." % (self._ip, known_version, version))
+            self._invalidate_profile()
+        self._set_profile_values(FirmwareVersion=version)
+
+    def get_capability_profile(self, refresh=False):
+        """Get capability profile of bmc, probe all capabilities not known yet
+        :params refresh: True to drop cached profile and probe again
+        :type refresh: bool
+        :returns: returns Dict of capability profile when succeeded or error message when failed
+        """
+        try:
+            if refresh:
+                self._invalidate_profile()
+                self._suburl_system = ''
+                self._suburl_manager = ''
+                self._suburl_chassis = ''
+                self._bmc_type = ''
+            self._find_system_resource()
+            self._find_manager_resource()
+            self._find_chassis_resource()
+            self._get_bmc_type()
+            result = self._get_manager_actions()
+            if result['ret'] == False:
+                return result
+            result = self._get_update_service_uris()
+            if result['ret'] == False:
+                return result
+            features = self._get_protocol_features()
+            if self._get_profile_value('ProtocolFeatures') is None:
+                self._set_profile_values(ProtocolFeatures=features)
+            return {'ret': True, 'entries': dict(self._profile)}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get capability profile. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    def _get_bmc_type(self):
+        """Get type of bmc
+        :returns: returns String of 'XCC' or 'TSM'
+        """
+        if self._bmc_type == '':
+            self._bmc_type = self._get_profile_value('BmcType') or ''
+        if self._bmc_type == '':
+            # TSM names its system and manager 'Self'
+            resource_url = self._suburl_system or self._suburl_manager or self._find_manager_resource()
+            self._bmc_type = 'TSM' if 'Self' in resource_url else 'XCC'
+            self._set_profile_values(BmcType=self._bmc_type)
+        return self._bmc_type
+
+    def _get_manager_actions(self):
+        """Get action targets of manager, including oem actions
+        :returns: returns Dict like {'ret': True, 'entries': {'#Manager.Reset': target}}
+        """
+        actions = self._get_profile_value('ManagerActions')
+        if actions is not None:
+            return {'ret': True, 'entries': actions}
+        result = self._get_url(self._find_manager_resource())
+        if result['ret'] == False:
+            return result
+        actions = {}
+        manager_actions = result['entries'].get('Actions', {})
+        oem_actions = manager_actions.get('Oem', {})
+        for name, action in list(manager_actions.items()) + list(oem_actions.items()):
+            if isinstance(action, dict) and 'target' in action:
+                actions[name] = action['target']
+        self._set_profile_values(ManagerActions=actions)
+        return {'ret': True, 'entries': actions}
+
+    def _get_update_service_uris(self):
+        """Get push uris and SimpleUpdate target of UpdateService
+        :returns: returns Dict like {'ret': True, 'entries': {'HttpPushUri': uri, 'MultipartHttpPushUri': uri, \
+                  'SimpleUpdate': target}}, uri not supported is None
+        """
+        uris = self._get_profile_value('UpdateServiceUris')
+        if uris is not None:
+            return {'ret': True, 'entries': uris}
+        result = self._get_url('/redfish/v1/UpdateService')
+        if result['ret'] == False:
+            return result
+        update_service = result['entries']
+        uris = {'HttpPushUri': update_service.get('HttpPushUri'),
+                'MultipartHttpPushUri': update_service.get('MultipartHttpPushUri'),
+                'SimpleUpdate': None}
+        if '#UpdateService.SimpleUpdate' in update_service.get('Actions', {}):
+            uris['SimpleUpdate'] = update_service['Actions']['#UpdateService.SimpleUpdate'].get('target')
+        self._set_profile_values(UpdateServiceUris=uris)
+        return {'ret': True, 'entries': uris}
+
+    def _get_allowed_methods(self, suburl):
+        """Get methods allowed on resource from ALLOW header
+        :returns: returns String of methods allowed in upper case, like 'GET,POST'
+        """
+        allowed = self._get_profile_value('AllowedMethods') or {}
+        if suburl in allowed:
+            return allowed[suburl]
+        response = self.get(suburl)
+        methods = ''
+        for item in response.getheaders():
+            if item[0].upper() == 'ALLOW':
+                methods = item[1].upper()
+                break
+        if response.status == 200:
+            allowed = dict(allowed)
+            allowed[suburl] = methods
+            self._set_profile_values(AllowedMethods=allowed)
+        return methods
+
     def _find_system_resource(self):
         if self._suburl_system != '':
             return self._suburl_system
+        if self._shared_session is not None:
+            self._suburl_system = self._shared_session.find_resource('system')
+            return self._suburl_system
+        self._suburl_system = self._get_profile_value('SystemUrl') or ''
+        if self._suburl_system == '':
+            self._suburl_system = self._discover_system_resource()
+            self._set_profile_values(SystemUrl=self._suburl_system)
+        return self._suburl_system
 
+    def _discover_system_resource(self):
         suburl = '/redfish/v1/Systems'
         result = self._get_url(suburl)
 
@@ -134,7 +532,16 @@ class RedfishBase(HttpClient):
     def _find_manager_resource(self):
         if self._suburl_manager != '':
             return self._suburl_manager
+        if self._shared_session is not None:
+            self._suburl_manager = self._shared_session.find_resource('manager')
+            return self._suburl_manager
+        self._suburl_manager = self._get_profile_value('ManagerUrl') or ''
+        if self._suburl_manager == '':
+            self._suburl_manager = self._discover_manager_resource()
+            self._set_profile_values(ManagerUrl=self._suburl_manager)
+        return self._suburl_manager
 
+    def _discover_manager_resource(self):
         suburl = '/redfish/v1/Managers'
         result = self._get_url(suburl)
         if result['ret'] == True:
@@ -156,7 +563,16 @@ class RedfishBase(HttpClient):
     def _find_chassis_resource(self):
         if self._suburl_chassis != '':
             return self._suburl_chassis
+        if self._shared_session is not None:
+            self._suburl_chassis = self._shared_session.find_resource('chassis')
+            return self._suburl_chassis
+        self._suburl_chassis = self._get_profile_value('ChassisUrl') or ''
+        if self._suburl_chassis == '':
+            self._suburl_chassis = self._discover_chassis_resource()
+            self._set_profile_values(ChassisUrl=self._suburl_chassis)
+        return self._suburl_chassis
 
+    def _discover_chassis_resource(self):
         suburl = '/redfish/v1/Chassis'
         result = self._get_collection(suburl)
         if result['ret'] == True:
@@ -178,7 +594,30 @@ class RedfishBase(HttpClient):
             raise Exception(result['msg'])
         return self._suburl_chassis
 
+    def _session_cache_enabled(self):
+        return self._session_cache is not None and self._session_cache.is_enabled() and self._auth == 'session'
+
+    def _create_session(self):
+        self._auth_thread = threading.get_ident()
+        try:
+            super(RedfishBase, self).login(username=self._user, password=self._password, auth=self._auth)
+        finally:
+            self._auth_thread = None
+        if self._session_cache_enabled():
+            self._session_cache.save(self._ip, self._user, self._password, self._auth,
+                                     self.get_session_key(), self.get_session_location())
+
+    def _use_shared_auth(self):
+        session_key, authorization_key = self._shared_session.get_auth()
+        self.set_session_key(session_key)
+        self.set_authorization_key(authorization_key)
+
     def login(self, username=None, password=None, auth=None):
+        # Clients attached to one LenovoRedfishSession use the login of the session.
+        if self._shared_session is not None:
+            self._shared_session.login()
+            return self._use_shared_auth()
+
         changed = False
         if username != None and self._user != username:
             changed = True
@@ -194,63 +633,544 @@ class RedfishBase(HttpClient):
         if changed:
             self.set_session_key(None)
             self.set_authorization_key(None)
-            return super(RedfishBase, self).login(username=self._user, password=self._password, auth=self._auth)
+            return self._create_session()
 
         if (self.get_session_key() != None and self._auth == 'session') or \
            (self.get_authorization_key() != None and self._auth == 'basic'):
             pass
         else:
-            return super(RedfishBase, self).login(username=self._user, password=self._password, auth=self._auth)
+            # Reuse cached session without validating it. If it has expired, 
+            # the first request gets 401 and the session is re-created then.
+            if self._session_cache_enabled():
+                session = self._session_cache.load(self._ip, self._user, self._password, self._auth)
+                if session != None:
+                    self.set_session_key(session[0])
+                    self.set_session_location(session[1])
+                    return
+            return self._create_session()
     
     def logout(self):
         # if long_connection is enabled, keep current session.
         if self._long_connection == True:
             return
 
+        # Session is kept for other clients, it is deleted by LenovoRedfishSession.logout.
+        if self._shared_session is not None:
+            self.set_session_key(None)
+            self.set_authorization_key(None)
+            return
+
         if self.get_session_key() == None and self.get_authorization_key() == None:
             return
 
+        # Keep cached session alive for next client, only forget it locally.
+        if self._session_cache_enabled():
+            self.set_session_key(None)
+            self.set_session_location(None)
+            return
+
         # Logout of the current session. If logout failed, clear sessionkey or authorizationkey anyway.
+        self._auth_thread = threading.get_ident()
         try:
-            super(RedfishBase, self).logout()
+            # Session is deleted even if the operation is cancelled or out of time, only timeouts of client apply
+            with deadline_scope(None):
+                super(RedfishBase, self).logout()
         except Exception as e:
             LOGGER.debug("%s" % traceback.format_exc())
             LOGGER.error("Failed to log out. Error message: %s" % repr(e))
         finally:
+            self._auth_thread = None
             # Logout of the current session
             self.set_session_key(None)
             self.set_authorization_key(None)
 
-    def _get_url(self, suburl):
+    def _rest_request(self, path, *args, **kwargs):
+        method = kwargs.get('method', args[0] if args else 'GET')
+        if self._response_cache is not None and method.upper() not in ['GET', 'HEAD']:
+            # Resource is changed, drop it from cache before and after the request
+            self._response_cache.invalidate(self._get_cache_uri(path))
+            try:
+                return self._send_request(path, *args, **kwargs)
+            finally:
+                self._response_cache.invalidate(self._get_cache_uri(path))
+        return self._send_request(path, *args, **kwargs)
+
+    def _send_request(self, path, *args, **kwargs):
+        if not self._request_hooks and not LOGGER.isEnabledFor(logging.DEBUG):
+            return self._send_authenticated_request(path, *args, **kwargs)
+        method = kwargs.get('method', args[0] if args else 'GET')
+        body = kwargs.get('body', args[2] if len(args) > 2 else None)
+        time_start = time.time()
+        begin_timing()
+        resp = None
+        error = None
         try:
-            resp = self.get(suburl)
-            if resp.status in [200, 201, 202, 204]:
-                return {'ret': True, 'entries': resp.dict, 'headers': resp.getheaders()}
+            resp = self._send_authenticated_request(path, *args, **kwargs)
+            return resp
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            timing = end_timing()
+            request_bytes = len(body) if isinstance(body, (str, bytes)) else len(json.dumps(body)) if isinstance(body, (dict, list)) else 0
+            self._record_request(method, path, resp.status if resp is not None else None,
+                                 getattr(resp, '_http_response', None), time_start, timing, request_bytes, error)
+
+    def _record_request(self, method, path, status, http_response, time_start, timing, request_bytes=0, error=None):
+        """Pass timing record of one request to hooks
+        :params http_response: requests.Response, None if no response is received
+        :type http_response: requests.Response
+        :params timing: Dict of 'Connect', 'Tls', 'Attempts' and 'Resends' got from end_timing()
+        :type timing: dict
+        """
+        total = time.time() - time_start
+        uri = self._get_cache_uri(path)
+        response_bytes = 0
+        ttfb = total
+        if http_response is not None:
+            ttfb = min(total, http_response.elapsed.total_seconds())
+            if http_response._content_consumed and http_response._content:
+                response_bytes = len(http_response._content)
             else:
-                msg = "Failed to get %s. Error message: %s" % (suburl, str(resp))
-                LOGGER.error(msg)
-                return {'ret': False, 'msg': msg}
+                response_bytes = int(http_response.headers.get('Content-Length', 0) or 0)
+        record = {'Host': self._ip, 'Method': method.upper(), 'Uri': uri, 'UriTemplate': get_uri_template(uri),
+                  'Status': status, 'Bytes': response_bytes, 'RequestBytes': request_bytes,
+                  'Connect': round(timing['Connect'], 6), 'Tls': round(timing['Tls'], 6), 'Ttfb': round(ttfb, 6),
+                  'Total': round(total, 6), 'Retries': get_retries(timing), 'Start': time_start,
+                  'Error': repr(error) if error is not None else None}
+        LOGGER.debug("%s %s %s %s bytes in %.3fs (connect %.3fs, tls %.3fs, ttfb %.3fs, retries %s)" % \
+                     (record['Method'], uri, status, response_bytes, total, record['Connect'], record['Tls'],
+                      record['Ttfb'], record['Retries']))
+        for hook in self._request_hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                LOGGER.debug("%s" % traceback.format_exc())
+                LOGGER.error("Request hook failed. Error message: %s" % repr(e))
+
+    def _send_authenticated_request(self, path, *args, **kwargs):
+        session_key = self.get_session_key()
+        resp = self._send_guarded_request(path, *args, **kwargs)
+        # Session expired or deleted by others, re-create the session and send the request again.
+        if resp.status == 401 and self._auth == 'session' and session_key != None and \
+           self._auth_thread != threading.get_ident():
+            if self._shared_session is not None:
+                LOGGER.info("Session of %s is not valid anymore, create new session." % self._ip)
+                self._shared_session.renew(session_key)
+                self._use_shared_auth()
+            else:
+                with self._auth_lock:
+                    # Concurrent requests rejected with the same session renew it once, the others use the new one
+                    if self.get_session_key() == session_key:
+                        LOGGER.info("Session of %s is not valid anymore, create new session." % self._ip)
+                        self._renew_session()
+            add_timing('Resends', 1)
+            resp = self._send_guarded_request(path, *args, **kwargs)
+        return resp
+
+    def _send_guarded_request(self, path, *args, **kwargs):
+        """Send request within rate limit and circuit breaker of bmc and deadline of operation, retrying 429 and 503"""
+        guard = self._host_guard
+        deadline = get_current_deadline()
+        attempt = 0
+        while True:
+            request_kwargs = dict(kwargs)
+            # Timeout shorter than the client's own, set by deadline of the caller
+            shortened = False
+            delay = guard.get_delay()
+            try:
+                if deadline is not None:
+                    deadline.sleep(delay)
+                    # Stop here if the operation is cancelled or out of time, otherwise wait only the time left
+                    if request_kwargs.get('timeout') is None:
+                        request_kwargs['timeout'] = deadline.get_timeout(self._connect_timeout, self._read_timeout)
+                        shortened = request_kwargs['timeout'] != (self._connect_timeout, self._read_timeout)
+                    if deadline.total is not None:
+                        # Retries would go beyond the deadline, caller of the operation decides whether to retry
+                        request_kwargs['max_retry'] = 0
+                elif delay > 0:
+                    time.sleep(delay)
+            except Exception:
+                guard.breaker.release()
+                raise
+            if guard.breaker.is_failing():
+                # Bmc failed last time, do not soak up retries on it
+                request_kwargs['max_retry'] = 0
+
+            try:
+                resp = super(RedfishBase, self)._rest_request(path, *args, **request_kwargs)
+            except Exception as e:
+                failure = get_connection_failure(e)
+                if failure is None or (shortened and isinstance(failure, requests.exceptions.Timeout)):
+                    # Not a failure of bmc, like timeout of a caller in a hurry
+                    guard.breaker.release()
+                else:
+                    guard.breaker.record_failure()
+                raise
+            if resp.status == 503:
+                guard.breaker.record_failure()
+            else:
+                guard.breaker.record_success()
+            if resp.status not in [429, 503] or attempt >= guard.busy_retries:
+                return resp
+            attempt += 1
+            add_timing('Resends', 1)
+            delay = guard.record_busy(resp.getheader('Retry-After'), attempt)
+            LOGGER.info("%s is busy (%s), retry %s in %.1f seconds." % (self._ip, resp.status, path, delay))
+
+    def _renew_session(self):
+        if self._session_cache_enabled():
+            self._session_cache.remove(self._ip, self._user, self._auth)
+        self.set_session_key(None)
+        self.set_session_location(None)
+        self._create_session()
+
+    def _get_cache_uri(self, path):
+        base_url = self.get_base_url()
+        if path.startswith(base_url):
+            path = path[len(base_url):]
+        return path
+
+    def _get_url(self, suburl, use_cache=True):
+        try:
+            cache = self._response_cache if use_cache else None
+            cached = cache.lookup(self._get_cache_uri(suburl)) if cache is not None else None
+            if cached is not None and cached['fresh']:
+                return {'ret': True, 'entries': cached['entries'], 'headers': cached['headers']}
+            if self._single_flight is None:
+                return self._fetch_url(suburl, cached)
+            # Concurrent identical GETs share one request and its result
+            return self._single_flight.do(self._get_cache_uri(suburl), lambda: self._fetch_url(suburl, cached))
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get %s. Error message: %s" % (suburl, repr(e))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    def _fetch_url(self, suburl, cached=None):
+        """Get resource from bmc, revalidating cached one when it has etag"""
+        headers = {'If-None-Match': cached['etag']} if cached is not None else None
+        resp = self.get(suburl, headers=headers)
+        if resp.status == 304 and cached is not None:
+            self._response_cache.refresh(self._get_cache_uri(suburl))
+            return {'ret': True, 'entries': cached['entries'], 'headers': cached['headers']}
+        if resp.status in [200, 201, 202, 204]:
+            if suburl in [self._suburl_manager, self._get_profile_value('ManagerUrl')]:
+                self._check_firmware_version(resp.dict)
+            if self._response_cache is not None and resp.status == 200:
+                etag = resp.getheader('ETag') or resp.dict.get('@odata.etag')
+                self._response_cache.put(self._get_cache_uri(suburl), resp.dict, resp.getheaders(), etag)
+            return {'ret': True, 'entries': resp.dict, 'headers': resp.getheaders()}
+        else:
+            msg = "Failed to get %s. Error message: %s" % (suburl, str(resp))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    def _get_member_url(self, suburl):
+        # Bound the concurrent requests of this client, even if several threads share it.
+        with self._member_slots:
+            return self._get_url(suburl)
+
+    def _get_members(self, members):
+        """Get resources of collection members
+        :params members: members of collection, like [{'@odata.id': url}]
+        :type members: list
+        :returns: returns List of member resources in the original order, or the first failed result
+        """
+        member_urls = [member['@odata.id'] for member in members]
+        data = list()
+        if self._max_workers <= 1 or len(member_urls) <= 1:
+            for member_url in member_urls:
+                memberurl_result = self._get_url(member_url)
+                if memberurl_result['ret'] == True:
+                    data.append(memberurl_result['entries'])
+                else:
+                    return memberurl_result
+            return {'ret': True, 'entries': data}
+
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(member_urls))) as executor:
+            deadline = get_current_deadline()
+            futures = [executor.submit(run_in_deadline, deadline, self._get_member_url, member_url) for member_url in member_urls]
+            for index, future in enumerate(futures):
+                memberurl_result = future.result()
+                if memberurl_result['ret'] == True:
+                    data.append(memberurl_result['entries'])
+                else:
+                    # Stop the requests not started yet, report the first failure as serial reading does.
+                    for pending in futures[index + 1:]:
+                        pending.cancel()
+                    return memberurl_result
+        return {'ret': True, 'entries': data}
+
+    def _get_url_if_none_match(self, suburl, etag=None):
+        """Get resource only when it is changed since etag
+        :params suburl: url of resource
+        :type suburl: string
+        :params etag: etag got last time, None means getting resource unconditionally
+        :type etag: string
+        :returns: returns Dict like {'ret': True, 'entries': resource, 'etag': etag}. \
+                  'entries' is None when bmc returns 304 Not Modified.
+        """
+        try:
+            headers = {'If-None-Match': etag} if etag else None
+            with self._member_slots:
+                resp = self.get(suburl, headers=headers)
+            if resp.status == 304:
+                return {'ret': True, 'entries': None, 'etag': etag}
+            if resp.status in [200, 201, 202, 204]:
+                entries = resp.dict
+                new_etag = entries.get('@odata.etag') or resp.getheader('ETag')
+                return {'ret': True, 'entries': entries, 'etag': new_etag}
+            msg = "Failed to get %s. Error message: %s" % (suburl, str(resp))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
         except Exception as e:
             LOGGER.debug("%s" % traceback.format_exc())
             msg = "Failed to get %s. Error message: %s" % (suburl, repr(e))
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
 
+    def _get_members_if_none_match(self, member_urls, etags):
+        """Get resources of collection members concurrently, only the changed ones come with body
+        :params member_urls: urls of members
+        :type member_urls: list
+        :params etags: etags got last time, like {url: etag}
+        :type etags: dict
+        :returns: returns List of results of _get_url_if_none_match in the original order, or the first failed result
+        """
+        workers = max(1, min(self._max_workers, len(member_urls)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            deadline = get_current_deadline()
+            futures = [executor.submit(run_in_deadline, deadline, self._get_url_if_none_match, url, etags.get(url)) for url in member_urls]
+            data = list()
+            for index, future in enumerate(futures):
+                result = future.result()
+                if result['ret'] == False:
+                    for pending in futures[index + 1:]:
+                        pending.cancel()
+                    return result
+                data.append(result)
+        return {'ret': True, 'entries': data}
+
+    def _get_protocol_features(self):
+        """Get ProtocolFeaturesSupported of the service, read from service root only once
+        :returns: returns Dict of protocol features, empty if the service does not report them
+        """
+        if self._protocol_features is not None:
+            return self._protocol_features
+
+        root = getattr(self, 'root', None)
+        if not root:
+            result = self._get_url('/redfish/v1')
+            root = result['entries'] if result['ret'] == True else {}
+        features = root.get('ProtocolFeaturesSupported', {})
+        self._protocol_features = features if isinstance(features, dict) else {}
+        return self._protocol_features
+
+    def _get_expand_query(self):
+        """Get the $expand query supported by the service
+        :returns: returns String of $expand query, or '' if the service does not support it
+        """
+        if self._expand_query is None:
+            self._expand_query = get_expand_query(self._get_protocol_features())
+        return self._expand_query
+
+    def get_round_trips_saved(self):
+        """Get the number of member requests saved by $expand
+        :returns: returns Number of GET requests which were not sent because members came expanded
+        """
+        return self._round_trips_saved
+
+    def _iter_collection_pages(self, suburl, page_size=None, skip=0):
+        """Iterate pages of collection, following Members@odata.nextLink and $top/$skip
+        :params suburl: url of collection
+        :type suburl: string
+        :params page_size: members per page requested by $top, None means the page size of the service
+        :type page_size: int
+        :params skip: number of members skipped before the first one returned. Skipped by $skip if the service \
+                      supports $top/$skip, otherwise the first pages are read and their members are dropped.
+        :type skip: int
+        :returns: yields List of members of each page, members may be expanded or only contain '@odata.id'
+        """
+        top_skip_supported = self._get_protocol_features().get('TopSkipQuery') == True
+        use_top_skip = page_size != None and top_skip_supported
+        # Members dropped here, for the service not supporting $skip
+        skip_left = 0 if top_skip_supported else skip
+        collection_key = get_collection_key(suburl)
+        expand_query = '' if collection_key in self._expand_rejected else self._get_expand_query()
+        next_url = suburl
+        previous_ids = None
+        while next_url:
+            query = []
+            if use_top_skip and next_url == suburl:
+                query.append('$top=%s&$skip=%s' % (page_size, skip))
+            elif top_skip_supported and skip > 0 and next_url == suburl:
+                query.append('$skip=%s' % skip)
+            if expand_query and '$expand' not in next_url:
+                query.append(expand_query)
+            page_url = next_url
+            if query:
+                page_url = next_url + ('&' if '?' in next_url else '?') + '&'.join(query)
+            result = self._get_url(page_url)
+            if result['ret'] == False and expand_query and page_url != next_url:
+                # Some services announce $expand but reject it on some collections, read them member by member.
+                # Remember the collection, so it is not asked with $expand again.
+                LOGGER.info("Failed to expand %s, fall back to reading members one by one." % next_url)
+                self._expand_rejected.add(collection_key)
+                expand_query = ''
+                continue
+            if result['ret'] == False:
+                raise Exception(result['msg'])
+            if 'Members' not in result['entries']:
+                raise Exception("Failed to find Members in collection %s." % suburl)
+
+            members = result['entries']['Members']
+            page_ids = [member.get('@odata.id') for member in members if isinstance(member, dict)]
+            if previous_ids is not None and page_ids and \
+               (page_ids[0] == previous_ids[0] or set(page_ids) <= set(previous_ids)):
+                # Service ignores $skip or links to the same page again, stop instead of reading it forever
+                LOGGER.info("Page of %s repeats the previous page, stop paging." % suburl)
+                return
+            previous_ids = page_ids or None
+            if skip_left > 0:
+                skipped = min(skip_left, len(members))
+                skip_left -= skipped
+                yield members[skipped:]
+            else:
+                yield members
+
+            if 'Members@odata.nextLink' in result['entries']:
+                next_url = result['entries']['Members@odata.nextLink']
+            elif use_top_skip and len(members) == page_size and len(members) > 0:
+                skip = skip + len(members)
+                total = result['entries'].get('Members@odata.count')
+                if total != None and skip >= total:
+                    next_url = None
+            else:
+                next_url = None
+
+    def _count_expanded(self, members):
+        expanded_count = len([member for member in members if len(member) > 1])
+        if expanded_count > 0:
+            with self._counter_lock:
+                self._round_trips_saved += expanded_count
+
+    def _fill_members(self, members):
+        """Get resources of members which are not expanded
+        :returns: returns List of member resources in the original order, or the first failed result
+        """
+        # Members only containing '@odata.id' are not expanded, get them by GET requests.
+        members_not_expanded = [member for member in members if len(member) <= 1]
+        if len(members_not_expanded) == 0:
+            return {'ret': True, 'entries': list(members)}
+        result = self._get_members(members_not_expanded)
+        if result['ret'] == False or len(members_not_expanded) == len(members):
+            return result
+        members_got = iter(result['entries'])
+        data = [member if len(member) > 1 else next(members_got) for member in members]
+        return {'ret': True, 'entries': data}
+
+    def iter_collection(self, suburl, page_size=None, skip=0):
+        """Iterate members of collection one by one, without holding the whole collection in memory.
+        Stop iterating at any time to stop reading the following pages.
+        :params suburl: url of collection
+        :type suburl: string
+        :params page_size: members per page requested by $top if the service supports $top/$skip, \
+                           None means the page size of the service
+        :type page_size: int
+        :params skip: number of members skipped before the first one returned. Skipped by $skip if the service \
+                      supports $top/$skip, otherwise members of the first pages are read and dropped.
+        :type skip: int
+        :returns: yields Dict of each member resource. Exception is raised when failed to read the collection.
+        """
+        chunk_size = max(1, self._max_workers)
+        for members in self._iter_collection_pages(suburl, page_size, skip):
+            self._count_expanded(members)
+            # Read members not expanded in small chunks, so the memory used is bounded by the chunk.
+            for index in range(0, len(members), chunk_size):
+                result = self._fill_members(members[index:index + chunk_size])
+                if result['ret'] == False:
+                    raise Exception(result['msg'])
+                for member in result['entries']:
+                    yield member
+
     def _get_collection(self, suburl):
         data = list()
-        suburl_result = self._get_url(suburl)
-        if suburl_result['ret'] == True:
-            if 'Members' in suburl_result['entries']:
-                for member in suburl_result['entries']['Members']:
-                    memberurl_result = self._get_url(member['@odata.id'])
-                    if memberurl_result['ret'] == True:
-                        data.append(memberurl_result['entries'])
-                    else:
-                        return memberurl_result
-                result = {'ret': True, 'entries': data}
-                return result
+        try:
+            for members in self._iter_collection_pages(suburl):
+                self._count_expanded(members)
+                result = self._fill_members(members)
+                if result['ret'] == False:
+                    return result
+                data.extend(result['entries'])
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get collection %s. Error message: %s" % (suburl, repr(e))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+        return {'ret': True, 'entries': data}
+
+    def _get_auth_headers(self):
+        """Get headers of current auth, for requests sent without redfish library"""
+        headers = {}
+        if self._auth == 'session':
+            headers["X-Auth-Token"] = self.get_session_key()
         else:
-            return suburl_result
+            headers["Authorization"] = self.get_authorization_key()
+        return headers
+
+    def _get_timeout(self):
+        """Get (connect, read) timeout for requests sent without HttpClient, like uploads and downloads"""
+        deadline = get_current_deadline()
+        if deadline is None:
+            return self._connect_timeout, self._read_timeout
+        return deadline.get_timeout(self._connect_timeout, self._read_timeout)
+
+    def _get_verify(self):
+        """Get verify parameter for requests sent without redfish library"""
+        if self._cafile is not None and self._cafile != "":
+            return self._cafile
+        # Ignore SSL Certificates
+        requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+        return False
+
+    def _get_sse_uri(self):
+        """Get ServerSentEventUri of EventService
+        :returns: returns String of uri, or '' if bmc does not support SSE
+        """
+        sse_uri = self._get_profile_value('ServerSentEventUri')
+        if sse_uri is None:
+            sse_uri = ''
+            result = self._get_url('/redfish/v1/EventService')
+            if result['ret'] == True:
+                sse_uri = result['entries'].get('ServerSentEventUri', '')
+            self._set_profile_values(ServerSentEventUri=sse_uri)
+        return sse_uri
+
+    def _check_task(self, task_uri):
+        """Check task status once
+        :params task_uri: task uri for tracking the status.
+        :type task_uri: string
+        :returns: returns Tuple of (done, result, retry_after). When task is not done, result holds the task information.
+        """
+        response_task_uri = self.get(task_uri, None)
+        if response_task_uri.status not in [200, 202]:
+            result = {'ret': False, 'msg': "Failed to get the info of task '%s'. Error code is %s. Error message is %s. " % \
+                      (task_uri, response_task_uri.status, response_task_uri.text)}
+            LOGGER.error(result['msg'])
+            return True, result, None
+        if "TaskState" not in response_task_uri.dict:
+            result = {'ret': False, 'msg': "Failed to find task state.", 'entries': response_task_uri.dict}
+            return True, result, None
+        task_state = response_task_uri.dict["TaskState"]
+        if task_state in END_TASK_STATE:
+            if task_state == "Completed":
+                result = {'ret': True, 'msg': "Task completed successfully.", 'entries': response_task_uri.dict}
+            else:
+                result = {'ret': False, 'msg': "Task completed abnormally.", 'entries': response_task_uri.dict}
+            return True, result, None
+        result = {'ret': True, 'msg': "Task is running.", 'entries': response_task_uri.dict}
+        return False, result, response_task_uri.getheader('Retry-After')
 
     def _task_monitor(self, task_uri, wait_time=10):
         """Monitor task status
@@ -260,34 +1180,27 @@ class RedfishBase(HttpClient):
         :type wait_time: int
         :returns: returns the task state and task information.
         """
-        END_TASK_STATE = ["Cancelled", "Completed", "Exception", "Killed", "Interrupted", "Suspended", "Done", "Failed when Flashing Image."]
-        time_start=time.time()
-        while True:
-            response_task_uri = self.get(task_uri, None)
-            if response_task_uri.status in [200, 202]:
-                if "TaskState" in response_task_uri.dict:
-                    task_state = response_task_uri.dict["TaskState"]
-                else:
-                    result = {'ret': False, 'msg': "Failed to find task state.", 'entries': response_task_uri.dict}
-                    return result
-                # Monitor task status until the task terminates
-                if task_state in END_TASK_STATE:
-                    if task_state == "Completed":
-                        result = {'ret': True, 'msg': "Task completed successfully.", 'entries': response_task_uri.dict}
-                    else:
-                        result = {'ret': False, 'msg': "Task completed abnormally.", 'entries': response_task_uri.dict}
-                    return result
-                else:
-                    time_now = time.time()
-                    # wait for max 10 minutes to avoid endless loop.
-                    wait_seconds = wait_time * 60
-                    if time_now - time_start > wait_seconds:
-                        result = {'ret': False, 'msg':  "Task is not completed in %s minutes expected." % wait_time, 'entries': response_task_uri.dict}
-                        return result
-                    time.sleep(10)
-            else:
-                result = {'ret': False, 'msg': "Failed to get the info of task '%s'. Error code is %s. Error message is %s. " % \
-                          (task_uri, response_task_uri.status, response_task_uri.text)}
-                LOGGER.error(result['msg'])
-                return result
+        return TaskHandle(self, task_uri, wait_time=wait_time).wait()
+
+    def _wait_task(self, result):
+        """Wait operation started by non-blocking method
+        :params result: TaskHandle, or Dict of result if operation is done already
+        :returns: returns Dict of result
+        """
+        if isinstance(result, TaskHandle):
+            return result.wait()
+        return result
+
+    def _watch_task(self, result, watcher=None):
+        """Follow operation started by non-blocking method in watcher
+        :params result: TaskHandle, or Dict of result if operation is done already
+        :params watcher: TaskWatcher, default is the one shared by all clients
+        :type watcher: TaskWatcher
+        :returns: returns TaskHandle
+        """
+        if not isinstance(result, TaskHandle):
+            result = TaskHandle(self, result=result)
+        if watcher is None:
+            watcher = get_task_watcher()
+        return watcher.add(result)
 
@@ -0,0 +1,132 @@
+###
+#
+# Lenovo Redfish Library - Session shared by several clients of one BMC
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import threading
+
+from .redfish_base import RedfishBase
+from .utils import *
+
+
+class LenovoRedfishSession(object):
+    """One login to a BMC shared by several clients.
+    Clients created by this session use the same auth token and keep-alive connections,
+    and the system, manager and chassis urls are discovered only once for all of them.
+
+    Example:
+        with LenovoRedfishSession(ip='10.10.10.10', username='USERID', password='PASSW0RD') as session:
+            system = session.create_client(SystemClient)
+            update = session.create_client(UpdateClient)
+            system.get_bios_bootmode()
+            update.get_firmware_inventory()
+    """
+
+    def __init__(self, ip='', username='', password='',
+                 configfile='config.ini', auth=''):
+        """Initialize LenovoRedfishSession
+
+        :param ip: The url of the remote system
+        :type ip: str
+        :param username: The user name used for authentication
+        :type username: str
+        :param password: The password used for authentication
+        :type password: str
+        :param configfile: config.ini file
+        :type configfile: str
+        :param auth: basic or session
+        :type auth: str
+        """
+        self._configfile = configfile
+        self._lock = threading.RLock()
+        # Client owning the login, connections and service root
+        self._owner = RedfishBase(ip=ip, username=username, password=password,
+                                  configfile=configfile, auth=auth)
+        self._logged_in = False
+
+    def __enter__(self):
+        self.login()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.logout()
+
+    def get_owner(self):
+        return self._owner
+
+    def get_http_session(self):
+        return self._owner._session
+
+    def get_single_flight(self):
+        return self._owner._single_flight
+
+    def get_auth(self):
+        """Get auth of session
+        :returns: returns Tuple of (session key, authorization key)
+        """
+        with self._lock:
+            return self._owner.get_session_key(), self._owner.get_authorization_key()
+
+    def login(self):
+        """Login once, following calls do nothing until logout"""
+        with self._lock:
+            if not self._logged_in:
+                self._owner.login()
+                self._logged_in = True
+
+    def logout(self):
+        with self._lock:
+            if self._logged_in:
+                self._owner.logout()
+                self._logged_in = False
+
+    def renew(self, session_key):
+        """Re-create session which is not valid anymore
+        :param session_key: session key rejected by bmc. If session has been renewed by another client, nothing is done.
+        :type session_key: str
+        """
+        # Lock of owner is also taken by the owner's own requests renewing the session
+        with self._lock, self._owner._auth_lock:
+            if self._owner.get_session_key() == session_key:
+                self._owner._renew_session()
+
+    def find_resource(self, resource_type):
+        """Find url of resource, discovered only once for all clients
+        :param resource_type: 'system', 'manager' or 'chassis'
+        :type resource_type: str
+        :returns: returns String of resource url. Exception is raised when failed.
+        """
+        with self._lock:
+            if resource_type == 'system':
+                return self._owner._find_system_resource()
+            elif resource_type == 'manager':
+                return self._owner._find_manager_resource()
+            return self._owner._find_chassis_resource()
+
+    def create_client(self, client_class):
+        """Create client attached to this session, login is done if needed
+        :param client_class: SystemClient, ManagerClient, ChassisClient, UpdateClient or AccountClient
+        :type client_class: class
+        :returns: returns client logged in with this session
+        """
+        owner = self._owner
+        client = client_class(ip=owner._ip, username=owner._user, password=owner._password,
+                              configfile=self._configfile, auth=owner._auth, session=self)
+        client.login()
+        return client
@@ -0,0 +1,99 @@
+###
+#
+# Lenovo Redfish Library - Bios attribute registry cache
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import os
+import re
+import threading
+
+from .utils import *
+
+# Registries already read in this process, shared by all clients.
+# Key is AttributeRegistry of Bios resource, like 'BiosAttributeRegistry_ABC123.1.0.0'.
+_registries = {}
+_registries_lock = threading.Lock()
+# One lock for each registry, so only one client downloads it while others wait.
+_download_locks = {}
+
+
+class RegistryCache(object):
+    """Cache of bios attribute registries, in memory and optionally on disk.
+    Registries are keyed by their AttributeRegistry name and version, so servers
+    of same platform and bios level share one registry which is downloaded only once.
+    """
+
+    def __init__(self, cache_dir=''):
+        """Initialize RegistryCache
+        :param cache_dir: directory to save registries, empty means memory only
+        :type cache_dir: str
+        """
+        self._cache_dir = cache_dir
+
+    def _cache_file(self, attribute_registry):
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', attribute_registry)
+        return os.path.join(self._cache_dir, name + '.json')
+
+    def get(self, attribute_registry, download):
+        """Get registry from cache, download it when not cached
+        :param attribute_registry: AttributeRegistry of Bios resource
+        :type attribute_registry: str
+        :param download: function to download registry, returns dict like {'ret': True, 'entries': registry}
+        :type download: function
+        :returns: returns Dict of registry like {'ret': True, 'entries': registry}. Registry is shared, do not modify it.
+        """
+        with _registries_lock:
+            if attribute_registry in _registries:
+                return {'ret': True, 'entries': _registries[attribute_registry]}
+            download_lock = _download_locks.setdefault(attribute_registry, threading.Lock())
+
+        with download_lock:
+            # Another client may have got it while we were waiting.
+            with _registries_lock:
+                if attribute_registry in _registries:
+                    return {'ret': True, 'entries': _registries[attribute_registry]}
+
+            registry = None
+            if self._cache_dir:
+                registry = load_json_file(self._cache_file(attribute_registry)) or None
+            if registry is None:
+                result = download()
+                if result['ret'] == False:
+                    return result
+                registry = result['entries']
+                if self._cache_dir:
+                    try:
+                        if not os.path.isdir(self._cache_dir):
+                            os.makedirs(self._cache_dir)
+                        save_json_file(self._cache_file(attribute_registry), registry)
+                    except Exception as e:
+                        LOGGER.error("Failed to save registry %s into %s. Error message: %s" % \
+                                     (attribute_registry, self._cache_dir, repr(e)))
+            else:
+                LOGGER.debug("Registry %s is loaded from %s." % (attribute_registry, self._cache_dir))
+
+            with _registries_lock:
+                _registries[attribute_registry] = registry
+            return {'ret': True, 'entries': registry}
+
+
+def clear_registry_cache():
+    """Forget registries cached in memory of this process"""
+    with _registries_lock:
+        _registries.clear()
@@ -0,0 +1,315 @@
+###
+#
+# Lenovo Redfish Library - Timing of requests sent to bmc
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import re
+import time
+import threading
+from collections import deque
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .utils import *
+
+# Upper bounds (seconds) of request duration histogram in prometheus metrics.
+DURATION_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+# Requests kept by one profiler for critical path and slowest requests, older ones are only counted in metrics.
+DEFAULT_MAX_RECORDS = 10000
+# Collections whose members are replaced by {id} in uri template.
+COLLECTION_NAMES = ['Systems', 'Managers', 'Chassis', 'Sessions', 'Accounts', 'Roles', 'Entries', 'LogServices',
+                    'EthernetInterfaces', 'Processors', 'Memory', 'Storage', 'Drives', 'Volumes', 'PCIeDevices',
+                    'PCIeFunctions', 'NetworkAdapters', 'NetworkInterfaces', 'NetworkDeviceFunctions', 'Ports',
+                    'Tasks', 'FirmwareInventory', 'SoftwareInventory', 'VirtualMedia', 'Subscriptions', 'Sensors',
+                    'Certificates', 'HostInterfaces', 'SerialInterfaces', 'Registries', 'Controllers']
+
+# Timing of requests being sent by each thread, filled by TimedHTTPAdapter.
+_timing = threading.local()
+# Hooks added to every client created after, like profiler of commandline script.
+_default_hooks = []
+_default_hooks_lock = threading.Lock()
+
+
+def begin_timing():
+    """Start collecting connect and tls time of the request sent by this thread"""
+    stack = getattr(_timing, 'stack', None)
+    if stack is None:
+        stack = _timing.stack = []
+    stack.append({'Connect': 0.0, 'Tls': 0.0, 'Attempts': 0, 'Resends': 0})
+
+
+def end_timing():
+    """Stop collecting timing of the request
+    :returns: returns Dict like {'Connect': 0.01, 'Tls': 0.05, 'Attempts': 1, 'Resends': 0}.
+              Attempts are counted by TimedHTTPAdapter, Resends by client sending the request again after 429, 503 or 401.
+    """
+    stack = getattr(_timing, 'stack', None)
+    if not stack:
+        return {'Connect': 0.0, 'Tls': 0.0, 'Attempts': 0, 'Resends': 0}
+    return stack.pop()
+
+
+def get_retries(timing):
+    """Get times the request is sent again, from timing returned by end_timing()"""
+    return max(timing['Resends'], timing['Attempts'] - 1)
+
+
+def add_timing(name, value):
+    """Add value to timing of the request being sent by this thread"""
+    stack = getattr(_timing, 'stack', None)
+    if stack:
+        stack[-1][name] += value
+
+
+class _TimedConnectionMixin(object):
+    def _new_conn(self):
+        time_start = time.perf_counter()
+        try:
+            return super(_TimedConnectionMixin, self)._new_conn()
+        finally:
+            add_timing('Connect', time.perf_counter() - time_start)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        stack = getattr(_timing, 'stack', None)
+        connect_before = stack[-1]['Connect'] if stack else 0
+        time_start = time.perf_counter()
+        super(_TimedHTTPSConnection, self).connect()
+        # Handshake is the time of connect() not spent in opening tcp connection
+        connect_time = (stack[-1]['Connect'] - connect_before) if stack else 0
+        add_timing('Tls', max(0, time.perf_counter() - time_start - connect_time))
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter recording connect time, tls handshake time and attempts of each request"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _TimedHTTPConnectionPool, 'https': _TimedHTTPSConnectionPool}
+        self.poolmanager.key_fn_by_scheme = dict(self.poolmanager.key_fn_by_scheme)
+
+    def send(self, request, **kwargs):
+        add_timing('Attempts', 1)
+        return super(TimedHTTPAdapter, self).send(request, **kwargs)
+
+
+def get_uri_template(uri):
+    """Get uri with member ids replaced, like /redfish/v1/Systems/{id}/Bios for /redfish/v1/Systems/1/Bios"""
+    path = re.sub(r'^https?://[^/]+', '', uri).split('?')[0]
+    segments = path.split('/')
+    for index in range(1, len(segments)):
+        if segments[index - 1] in COLLECTION_NAMES or segments[index].isdigit():
+            if segments[index] not in ['', 'Members']:
+                segments[index] = '{id}'
+    return '/'.join(segments)
+
+
+def add_default_request_hook(hook):
+    """Add hook called with record of each request by all clients created after"""
+    with _default_hooks_lock:
+        _default_hooks.append(hook)
+
+
+def remove_default_request_hook(hook):
+    with _default_hooks_lock:
+        if hook in _default_hooks:
+            _default_hooks.remove(hook)
+
+
+def get_default_request_hooks():
+    with _default_hooks_lock:
+        return list(_default_hooks)
+
+
+class RequestProfiler(object):
+    """Hook collecting records of requests, of one or many clients.
+    Each record is a Dict of 'Host', 'Method', 'Uri', 'UriTemplate', 'Status', 'Bytes', 'RequestBytes',
+    'Connect', 'Tls', 'Ttfb', 'Total', 'Retries', 'Start' and 'Error'. Times are in seconds, Ttfb is the
+    time until response headers are received, including connect and tls handshake of new connection.
+
+    Example:
+        profiler = RequestProfiler()
+        client.add_request_hook(profiler)
+        client.get_cpu_inventory()
+        print(profiler.format_summary())
+    """
+
+    def __init__(self, max_records=DEFAULT_MAX_RECORDS):
+        """Initialize RequestProfiler
+        :param max_records: requests kept for summary, metrics count all requests
+        :type max_records: int
+        """
+        self._records = deque(maxlen=max_records)
+        # Key is (host, method, uri template, status)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        self.add(record)
+
+    def add(self, record):
+        key = (record['Host'], record['Method'], record['UriTemplate'], str(record['Status']))
+        with self._lock:
+            self._records.append(record)
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = {'Count': 0, 'Seconds': 0.0, 'MaxSeconds': 0.0, 'Bytes': 0, 'Retries': 0,
+                          'Buckets': [0] * len(DURATION_BUCKETS)}
+                self._metrics[key] = metric
+            metric['Count'] += 1
+            metric['Seconds'] += record['Total']
+            metric['MaxSeconds'] = max(metric['MaxSeconds'], record['Total'])
+            metric['Bytes'] += record['Bytes']
+            metric['Retries'] += record['Retries']
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if record['Total'] <= bound:
+                    metric['Buckets'][index] += 1
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
+            self._metrics.clear()
+
+    def get_records(self):
+        with self._lock:
+            return list(self._records)
+
+    def get_summary(self, top=5):
+        """Get summary of requests kept
+        :param top: number of slowest uri templates and requests listed
+        :type top: int
+        :returns: returns Dict of 'Requests', 'Failed', 'Retries', 'Bytes', 'RequestSeconds' (sum of all requests),
+                  'CriticalPathSeconds' (time at least one request is in flight), 'WallSeconds', 'SlowestUris' and 'SlowestRequests'
+        """
+        records = self.get_records()
+        summary = {'Requests': len(records), 'Failed': 0, 'Retries': 0, 'Bytes': 0, 'RequestSeconds': 0.0,
+                   'CriticalPathSeconds': 0.0, 'WallSeconds': 0.0, 'SlowestUris': [], 'SlowestRequests': []}
+        if not records:
+            return summary
+        uris = {}
+        for record in records:
+            if record['Error'] or not isinstance(record['Status'], int) or record['Status'] >= 400:
+                summary['Failed'] += 1
+            summary['Retries'] += record['Retries']
+            summary['Bytes'] += record['Bytes']
+            summary['RequestSeconds'] += record['Total']
+            uri = uris.setdefault((record['Method'], record['UriTemplate']), {'Method': record['Method'],
+                                  'UriTemplate': record['UriTemplate'], 'Count': 0, 'Seconds': 0.0, 'MaxSeconds': 0.0})
+            uri['Count'] += 1
+            uri['Seconds'] += record['Total']
+            uri['MaxSeconds'] = max(uri['MaxSeconds'], record['Total'])
+
+        # Length of union of request intervals, requests run in parallel count once
+        intervals = sorted((record['Start'], record['Start'] + record['Total']) for record in records)
+        critical_path = 0.0
+        current_start, current_end = intervals[0]
+        for start, end in intervals[1:]:
+            if start > current_end:
+                critical_path += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        critical_path += current_end - current_start
+        summary['CriticalPathSeconds'] = round(critical_path, 6)
+        summary['WallSeconds'] = round(max(end for start, end in intervals) - intervals[0][0], 6)
+        summary['RequestSeconds'] = round(summary['RequestSeconds'], 6)
+
+        slowest_uris = sorted(uris.values(), key=lambda uri: uri['Seconds'], reverse=True)[:top]
+        for uri in slowest_uris:
+            uri['AvgSeconds'] = round(uri['Seconds'] / uri['Count'], 6)
+            uri['Seconds'] = round(uri['Seconds'], 6)
+        summary['SlowestUris'] = slowest_uris
+        summary['SlowestRequests'] = sorted(records, key=lambda record: record['Total'], reverse=True)[:top]
+        return summary
+
+    def format_summary(self, title='', top=5):
+        """Get summary as text lines for people"""
+        summary = self.get_summary(top)
+        lines = ["Profile%s: %s requests, %s failed, %s retries, %s bytes received." % \
+                 (' of ' + title if title else '', summary['Requests'], summary['Failed'], summary['Retries'], summary['Bytes'])]
+        lines.append("  Critical path %.3fs, sum of requests %.3fs, wall time %.3fs." % \
+                     (summary['CriticalPathSeconds'], summary['RequestSeconds'], summary['WallSeconds']))
+        if summary['SlowestUris']:
+            lines.append("  Slowest uris:")
+            for uri in summary['SlowestUris']:
+                lines.append("    %-6s %-60s count %-4s total %.3fs avg %.3fs max %.3fs" % \
+                             (uri['Method'], uri['UriTemplate'], uri['Count'], uri['Seconds'], uri['AvgSeconds'], uri['MaxSeconds']))
+        if summary['SlowestRequests']:
+            lines.append("  Slowest requests:")
+            for record in summary['SlowestRequests']:
+                lines.append("    %-6s %-60s status %-4s total %.3fs ttfb %.3fs connect %.3fs tls %.3fs" % \
+                             (record['Method'], record['Uri'], record['Status'], record['Total'],
+                              record['Ttfb'], record['Connect'], record['Tls']))
+        return '\n'.join(lines)
+
+    def to_json(self, top=5):
+        """Get summary, metrics of each uri template and requests kept, as Dict serializable by json"""
+        with self._lock:
+            metrics = [dict(metric, Host=key[0], Method=key[1], UriTemplate=key[2], Status=key[3],
+                            Buckets=dict(zip([str(bound) for bound in DURATION_BUCKETS], metric['Buckets'])))
+                       for key, metric in sorted(self._metrics.items())]
+        return {'Summary': self.get_summary(top), 'Metrics': metrics, 'Requests': self.get_records()}
+
+    def to_prometheus(self, prefix='lenovo_redfish'):
+        """Get metrics of all requests in prometheus text exposition format"""
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        with self._lock:
+            items = sorted((key, dict(metric, Buckets=list(metric['Buckets']))) for key, metric in self._metrics.items())
+        lines = []
+        lines.append("# HELP %s_requests_total Requests sent to bmc." % prefix)
+        lines.append("# TYPE %s_requests_total counter" % prefix)
+        for key, metric in items:
+            labels = 'host="%s",method="%s",uri="%s",status="%s"' % tuple(escape(value) for value in key)
+            lines.append("%s_requests_total{%s} %s" % (prefix, labels, metric['Count']))
+        lines.append("# HELP %s_request_duration_seconds Time of requests sent to bmc." % prefix)
+        lines.append("# TYPE %s_request_duration_seconds histogram" % prefix)
+        for key, metric in items:
+            labels = 'host="%s",method="%s",uri="%s"' % tuple(escape(value) for value in key[:3])
+            for bound, count in zip(DURATION_BUCKETS, metric['Buckets']):
+                lines.append('%s_request_duration_seconds_bucket{%s,status="%s",le="%s"} %s' % (prefix, labels, escape(key[3]), bound, count))
+            lines.append('%s_request_duration_seconds_bucket{%s,status="%s",le="+Inf"} %s' % (prefix, labels, escape(key[3]), metric['Count']))
+            lines.append('%s_request_duration_seconds_sum{%s,status="%s"} %.6f' % (prefix, labels, escape(key[3]), metric['Seconds']))
+            lines.append('%s_request_duration_seconds_count{%s,status="%s"} %s' % (prefix, labels, escape(key[3]), metric['Count']))
+        lines.append("# HELP %s_response_bytes_total Bytes received from bmc." % prefix)
+        lines.append("# TYPE %s_response_bytes_total counter" % prefix)
+        for key, metric in items:
+            labels = 'host="%s",method="%s",uri="%s",status="%s"' % tuple(escape(value) for value in key)
+            lines.append("%s_response_bytes_total{%s} %s" % (prefix, labels, metric['Bytes']))
+        lines.append("# HELP %s_retries_total Requests sent again after connection error, 429, 503 or expired session." % prefix)
+        lines.append("# TYPE %s_retries_total counter" % prefix)
+        for key, metric in items:
+            labels = 'host="%s",method="%s",uri="%s",status="%s"' % tuple(escape(value) for value in key)
+            lines.append("%s_retries_total{%s} %s" % (prefix, labels, metric['Retries']))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,162 @@
+###
+#
+# Lenovo Redfish Library - Cache of resources read from bmc
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from .utils import *
+
+# Bytes of resources kept in memory by one cache.
+DEFAULT_RESPONSE_CACHE_SIZE = 4 * 1024 * 1024
+# Seconds a resource is used without asking bmc again.
+DEFAULT_RESPONSE_TTL = 30
+# Seconds for resource types changing faster or slower than others, 0 means never cached.
+DEFAULT_RESPONSE_TTLS = {
+    'Power': 5,
+    'Thermal': 5,
+    'Sensor': 5,
+    'Task': 0,
+    'TaskService': 0,
+    'Bios': 60,
+    'ServiceRoot': 300,
+}
+
+
+def get_resource_type(resource):
+    """Get resource type from @odata.type, like 'Power' for '#Power.v1_5_0.Power'"""
+    odata_type = resource.get('@odata.type', '') if isinstance(resource, dict) else ''
+    return odata_type.lstrip('#').split('.')[0]
+
+
+class ResponseCache(object):
+    """Resources got by one client, reused until their TTL expires.
+    Expired resources with etag are revalidated by If-None-Match, so bmc only sends them
+    again when they are changed. Least recently used resources are dropped when the
+    cache is over its byte budget, and resources are dropped when they are changed by
+    PATCH, PUT, POST or DELETE to the same uri.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RESPONSE_CACHE_SIZE, ttl=DEFAULT_RESPONSE_TTL, ttls=None):
+        """Initialize ResponseCache
+        :param max_bytes: bytes of resources kept in memory
+        :type max_bytes: int
+        :param ttl: seconds a resource is reused, for types not in ttls
+        :type ttl: int
+        :param ttls: seconds for each resource type, like {'Power': 5}. Merged with DEFAULT_RESPONSE_TTLS.
+        :type ttls: dict
+        """
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._ttls = dict(DEFAULT_RESPONSE_TTLS)
+        self._ttls.update(ttls or {})
+        # Key is uri, value is Dict of 'entries', 'headers', 'etag', 'size' and 'expires'
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._revalidated = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(uri):
+        path, separator, query = uri.partition('?')
+        return path.rstrip('/') + separator + query
+
+    def _get_ttl(self, entries):
+        return self._ttls.get(get_resource_type(entries), self._ttl)
+
+    def lookup(self, uri):
+        """Find resource of uri
+        :returns: returns Dict like {'entries': resource, 'headers': headers, 'etag': etag, 'fresh': True}, or None if not cached.
+                  Resource is a copy which can be modified by caller.
+        """
+        with self._lock:
+            key = self._key(uri)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            fresh = entry['expires'] > time.time()
+            if fresh:
+                self._hits += 1
+            elif not entry['etag']:
+                self._misses += 1
+                return None
+            return {'entries': copy.deepcopy(entry['entries']), 'headers': dict(entry['headers']),
+                    'etag': entry['etag'], 'fresh': fresh}
+
+    def put(self, uri, entries, headers=None, etag=None):
+        """Save resource of uri"""
+        ttl = self._get_ttl(entries)
+        if ttl <= 0 and not etag:
+            return
+        size = len(json.dumps(entries))
+        if size > self._max_bytes:
+            return
+        key = self._key(uri)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {'entries': copy.deepcopy(entries), 'headers': dict(headers or {}),
+                                  'etag': etag, 'size': size, 'expires': time.time() + ttl}
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def refresh(self, uri):
+        """Keep resource of uri for another TTL, after bmc returns 304 Not Modified"""
+        with self._lock:
+            entry = self._entries.get(self._key(uri))
+            if entry is not None:
+                entry['expires'] = time.time() + self._get_ttl(entry['entries'])
+                self._revalidated += 1
+
+    def invalidate(self, uri):
+        """Drop resource of uri, resources under it, and resource owning it if uri is an action"""
+        key = self._key(uri.partition('?')[0])
+        keys = [key]
+        if '/Actions/' in key:
+            keys.append(key.split('/Actions/')[0])
+        with self._lock:
+            for cached_key in list(self._entries.keys()):
+                if any(cached_key == item or cached_key.startswith(item + '/') or cached_key.startswith(item + '?') for item in keys):
+                    self._remove(cached_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        """Get statistics of cache
+        :returns: returns Dict like {'Hits': 10, 'Revalidated': 2, 'Misses': 5, 'Entries': 8, 'Bytes': 40960}
+        """
+        with self._lock:
+            return {'Hits': self._hits, 'Revalidated': self._revalidated, 'Misses': self._misses,
+                    'Entries': len(self._entries), 'Bytes': self._bytes}
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry['size']
@@ -0,0 +1,104 @@
+###
+#
+# Lenovo Redfish Library - Session token cache
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import os
+import json
+import base64
+import hashlib
+import traceback
+
+from .utils import *
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+# Iterations of PBKDF2 to derive the key encrypting one cached session.
+KEY_ITERATIONS = 100000
+
+
+class SessionCache(object):
+    """Cache of session tokens on disk, shared by several runs of client.
+    Each session is encrypted by a key derived from the user's password,
+    so the token can only be read back by someone who knows the password.
+    """
+
+    def __init__(self, cache_file):
+        """Initialize SessionCache
+        :param cache_file: file to save sessions
+        :type cache_file: str
+        """
+        self._cache_file = cache_file
+        if Fernet is None:
+            LOGGER.error("Package 'cryptography' is not installed, session cache %s is disabled." % cache_file)
+
+    def is_enabled(self):
+        return Fernet is not None and self._cache_file != ''
+
+    def _cache_key(self, ip, username, auth):
+        return hashlib.sha256(("%s|%s|%s" % (ip, username, auth)).encode('utf-8')).hexdigest()
+
+    def _fernet(self, password, salt):
+        key = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, KEY_ITERATIONS)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def load(self, ip, username, password, auth):
+        """Load cached session
+        :returns: returns Tuple of (session key, session location), or None if not cached
+        """
+        if not self.is_enabled():
+            return None
+        entry = load_json_file(self._cache_file).get(self._cache_key(ip, username, auth))
+        if entry is None:
+            return None
+        try:
+            salt = base64.b64decode(entry['salt'])
+            data = self._fernet(password, salt).decrypt(entry['token'].encode('utf-8'))
+            session = json.loads(data.decode('utf-8'))
+            return session['key'], session['location']
+        except Exception as e:
+            # Password changed or cache broken, just login again.
+            LOGGER.debug("%s" % traceback.format_exc())
+            LOGGER.info("Failed to load cached session of %s. Error message: %s" % (ip, repr(e)))
+            return None
+
+    def save(self, ip, username, password, auth, session_key, session_location):
+        """Save session into cache"""
+        if not self.is_enabled() or not session_key:
+            return
+        salt = os.urandom(16)
+        data = json.dumps({'key': session_key, 'location': session_location}).encode('utf-8')
+        token = self._fernet(password, salt).encrypt(data)
+        entry = {'salt': base64.b64encode(salt).decode('utf-8'), 'token': token.decode('utf-8')}
+        with lock_json_file(self._cache_file):
+            sessions = load_json_file(self._cache_file)
+            sessions[self._cache_key(ip, username, auth)] = entry
+            save_json_file(self._cache_file, sessions, mode=0o600)
+
+    def remove(self, ip, username, auth):
+        """Remove session from cache"""
+        if not self.is_enabled():
+            return
+        with lock_json_file(self._cache_file):
+            sessions = load_json_file(self._cache_file)
+            if sessions.pop(self._cache_key(ip, username, auth), None) is not None:
+                save_json_file(self._cache_file, sessions, mode=0o600)
@@ -0,0 +1,112 @@
+###
+#
+# Lenovo Redfish Library - Coalescing concurrent identical requests
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import copy
+import threading
+
+from .utils import *
+from .deadline import DeadlineExceeded, OperationCancelled, get_current_deadline
+
+
+class _Call(object):
+    """One request in flight and the threads waiting for it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Run one function for all threads asking for the same key at the same time.
+    The first thread runs it, threads coming while it is running wait and get a copy
+    of its result, so concurrent identical GETs are sent to bmc only once.
+
+    Example:
+        flight = SingleFlight()
+        result = flight.do('/redfish/v1/Systems/1', lambda: client._fetch_url('/redfish/v1/Systems/1'))
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key, function):
+        """Run function, or wait for the one running with same key
+        :param key: key of request, like uri
+        :type key: str
+        :param function: function without parameters
+        :type function: function
+        :returns: returns result of function. Waiting threads get their own copy of it.
+                  Waiting threads stop at their own deadline, and run function themselves
+                  if the thread running it stops at its deadline or is cancelled.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+
+        if not leader:
+            deadline = get_current_deadline()
+            if deadline is None:
+                call.done.wait()
+            else:
+                while not call.done.wait(0.5 if deadline.remaining() is None else min(0.5, deadline.remaining())):
+                    deadline.check()
+            if isinstance(call.error, (DeadlineExceeded, OperationCancelled)):
+                # Deadline of the leader is not the deadline of this thread, try again
+                return self.do(key, function)
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = function()
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+            if waiters > 0 and call.error is None:
+                # Leader may change its result after returning, waiters copy a snapshot of it
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def get_stats(self):
+        """Get statistics of requests
+        :returns: returns Dict like {'Executed': 10, 'Coalesced': 4}
+        """
+        with self._lock:
+            return {'Executed': self._executed, 'Coalesced': self._coalesced}
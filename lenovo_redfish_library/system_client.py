@@ -23,6 +23,7 @@ import os
 import logging
 import json
 import argparse
+import configparser
 import traceback 
 
 from .redfish_base import RedfishBase
@@ -34,12 +35,12 @@ class SystemClient(RedfishBase):
     """A client for managing system"""
 
     def __init__(self, ip='', username='', password='',
-                 configfile='config.ini', auth=''):
+                 configfile='config.ini', auth='', session=None):
         """Initialize SystemClient"""
 
         super(SystemClient, self).__init__(
             ip=ip, username=username, password=password, 
-            configfile=configfile, auth=auth
+            configfile=configfile, auth=auth, session=session
         )
 
     #############################################
@@ -113,9 +114,42 @@ class SystemClient(RedfishBase):
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
 
+    def _download_bios_registry(self, attribute_registry):
+        """Download bios attribute registry json file
+        :params attribute_registry: AttributeRegistry of Bios resource
+        :type attribute_registry: string
+        :returns: returns Dict of registry when succeeded or error message when failed
+        """
+        # Find the AttributeRegistry json file uri from Registries
+        registry_url = "/redfish/v1/Registries"
+        result = self._get_url(registry_url)
+        if result['ret'] != True:
+            return result
+        bios_registry_url = None
+        members_list = result['entries']['Members']
+        for registry in members_list:
+            if attribute_registry in registry['@odata.id']:
+                bios_registry_url = registry['@odata.id']
+        if bios_registry_url is None:
+            return {'ret': False, 'msg': "Can not find %s in Registries" % (attribute_registry)}
+
+        result = self._get_url(bios_registry_url)
+        if result['ret'] != True:
+            return result
+        bios_registry_json_url = result['entries']['Location'][0]['Uri']
+
+        # Download the AttributeRegistry json file
+        return self._get_url(bios_registry_json_url)
+
+    def _get_bios_registry(self, attribute_registry):
+        # Registry is only downloaded when it is not cached
+        return self._registry_cache.get(attribute_registry,
+                                        lambda: self._download_bios_registry(attribute_registry))
+
     def get_bios_attribute_metadata(self):
         """Get bios attribute metadata
-        :returns: returns String of message with bios registry json file name when succeeded or error message when failed
+        :returns: returns Dict of bios attribute registry when succeeded or error message when failed.
+                  Registry is cached and shared by clients, do not modify it.
         """
         result = {}
         try:
@@ -128,33 +162,7 @@ class SystemClient(RedfishBase):
             # Get used AttributeRegistry from Bios url
             attribute_registry = result['entries']['AttributeRegistry']
 
-            # Find the AttributeRegistry json file uri from Registries
-            registry_url = "/redfish/v1/Registries"
-            result = self._get_url(registry_url)
-            if result['ret'] != True:
-                return result
-            bios_registry_url = None
-            members_list = result['entries']['Members']
-            for registry in members_list:
-                if attribute_registry in registry['@odata.id']:
-                    bios_registry_url = registry['@odata.id']
-            if bios_registry_url is None:
-                return {'ret': False, 'msg': "Can not find %s in Registries" % (attribute_registry)}
-
-            result = self._get_url(bios_registry_url)
-            if result['ret'] != True:
-                return result
-            bios_registry_json_url = result['entries']['Location'][0]['Uri']
-
-            # Download the AttributeRegistry json file
-            result = self._get_url(bios_registry_json_url)
-            return result
-            #if result['ret'] != True:
-            #    return result
-            #filename = os.getcwd() + os.sep + bios_registry_json_url.split("/")[-1]
-            #with open(filename, 'w') as f:
-            #    json.dump(result['entries'], f, indent=2)
-            #return {'ret': True, 'msg': "Download Bios AttributeRegistry file %s" % (bios_registry_json_url.split("/")[-1])}
+            return self._get_bios_registry(attribute_registry)
         except Exception as e:
             LOGGER.debug("%s" % traceback.format_exc())
             msg = "Failed to get bios attribute metadata. Error message: %s" % repr(e)
@@ -227,7 +235,7 @@ class SystemClient(RedfishBase):
         result = {}
         try:
             system_url = self._find_system_resource()
-            bmc_type = 'TSM' if 'Self' in system_url else 'XCC'
+            bmc_type = self._get_bmc_type()
             
             if bmc_type == 'XCC':
                 result = self._get_url(system_url)
@@ -629,6 +637,44 @@ class SystemClient(RedfishBase):
     # functions for setting information.
     #############################################
 
+    def _get_bios_pending_url(self, system_url, bios):
+        if '@Redfish.Settings' in bios and 'SettingsObject' in bios['@Redfish.Settings']:
+            return bios['@Redfish.Settings']['SettingsObject']['@odata.id']
+        if self._get_bmc_type() == 'TSM':
+            return system_url + '/Bios' + '/SD' # TSM
+        return system_url + '/Bios' + '/Pending' # XCC
+
+    def _convert_bios_attribute_value(self, attribute, attribute_value):
+        """Convert attribute value to the type defined in bios attribute registry
+        :params attribute: registry entry of the attribute
+        :type attribute: dict
+        :params attribute_value: value to set, string from command line or value from json file
+        :type attribute_value: string, int or bool
+        :returns: returns Dict like {'ret': True, 'entries': converted value} or error message when failed
+        """
+        if attribute.get('ReadOnly') == True:
+            return {'ret': False, 'msg': "This attribute is read only."}
+        if attribute['Type'] == "Integer":
+            if isinstance(attribute_value, bool):
+                return {'ret': False, 'msg': "Please check the attribute value, this should be a number."}
+            try:
+                return {'ret': True, 'entries': int(attribute_value)}
+            except:
+                return {'ret': False, 'msg': "Please check the attribute value, this should be a number."}
+        elif attribute['Type'] == "Boolean":
+            if isinstance(attribute_value, bool):
+                return {'ret': True, 'entries': attribute_value}
+            if str(attribute_value).upper() == "TRUE":
+                return {'ret': True, 'entries': True}
+            elif str(attribute_value).upper() == "FALSE":
+                return {'ret': True, 'entries': False}
+            return {'ret': False, 'msg': "Please check the attribute value, this value is 'true' or 'false'."}
+        elif attribute['Type'] == "Enumeration" and 'Value' in attribute:
+            available_values = [value['ValueName'] for value in attribute['Value'] if 'ValueName' in value]
+            if available_values and attribute_value not in available_values:
+                return {'ret': False, 'msg': "Please check the attribute value, available values are %s." % available_values}
+        return {'ret': True, 'entries': attribute_value}
+
     def set_bios_attribute(self, attribute_name, attribute_value):
         """Set bios attribute.
         :params attribute_name: Bios attribute name
@@ -644,39 +690,15 @@ class SystemClient(RedfishBase):
             if result['ret'] == False: 
                 return result
 
-            if '@Redfish.Settings' in result['entries'] and 'SettingsObject' in result['entries']['@Redfish.Settings']:
-                pending_url = result['entries']['@Redfish.Settings']['SettingsObject']['@odata.id']
-            else:
-                if 'Self' in system_url:
-                    pending_url = system_url + '/Bios' + '/SD' # TSM
-                else:
-                    pending_url = system_url + '/Bios' + '/Pending' # XCC
+            pending_url = self._get_bios_pending_url(system_url, result['entries'])
             result = self.get_bios_attribute_available_value(attribute_name)
             if result['ret'] == False:
                 return result
             
-            parameter = {}
-            attribute = result['entries']
-            if attribute['Type'] == "Integer":
-                try:
-                    attribute_value = int(attribute_value)
-                    parameter = {attribute_name: attribute_value}
-                except:
-                    result = {'ret': False, 'msg': "Please check the attribute value, this should be a number."}
-                    return result
-            elif attribute['Type'] == "Boolean":
-                if attribute_value.upper() == "TRUE":
-                    parameter = {attribute_name: True}
-                elif attribute_value.upper() == "FALSE":
-                    parameter = {attribute_name: False}
-                else:
-                    result = {'ret': False, 'msg': "Please check the attribute value, this value is 'true' or 'false'."}
-                    return result
-            else:
-                parameter = {attribute_name: attribute_value}
-
-            if parameter:
-                attribute = {"Attributes": parameter}
+            result = self._convert_bios_attribute_value(result['entries'], attribute_value)
+            if result['ret'] == False:
+                return result
+            attribute = {"Attributes": {attribute_name: result['entries']}}
             headers = {"If-Match": "*", "Content-Type": "application/json"}
             patch_response = self.patch(pending_url, headers = headers, body=attribute)
             if patch_response.status in [200, 204]:
@@ -692,6 +714,68 @@ class SystemClient(RedfishBase):
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
 
+    def set_bios_attributes(self, attributes):
+        """Set several bios attributes with one request.
+        All values are checked against bios attribute registry first, nothing is set if any value is invalid.
+        :params attributes: Bios attribute names and new values, like {"OperatingModes_ChooseOperatingMode": "MaximumPerformance"}
+        :type attributes: dict
+        :returns: returns the result to set bios attributes, with 'entries' reporting each attribute, \
+                  like {name: {'value': value, 'ret': True/False, 'msg': reason of failure}}
+        """
+        result = {}
+        try:
+            if not attributes:
+                return {'ret': False, 'msg': "Please specify bios attributes to set."}
+
+            system_url = self._find_system_resource()
+            result = self._get_url(system_url + '/Bios')
+            if result['ret'] == False:
+                return result
+            pending_url = self._get_bios_pending_url(system_url, result['entries'])
+            current_attributes = result['entries'].get('Attributes', {})
+
+            result = self._get_bios_registry(result['entries']['AttributeRegistry'])
+            if result['ret'] == False:
+                return result
+            registry = {}
+            for attribute in result['entries']["RegistryEntries"]["Attributes"]:
+                registry[attribute['AttributeName']] = attribute
+
+            # Check all values before setting any of them
+            report = {}
+            parameter = {}
+            for attribute_name in attributes:
+                attribute_value = attributes[attribute_name]
+                if attribute_name not in registry:
+                    check = {'ret': False, 'msg': "This bios attribute is not supported on this platform."}
+                else:
+                    check = self._convert_bios_attribute_value(registry[attribute_name], attribute_value)
+                if check['ret'] == False:
+                    report[attribute_name] = {'value': attribute_value, 'ret': False, 'msg': check['msg']}
+                    continue
+                report[attribute_name] = {'value': check['entries'], 'ret': True}
+                if current_attributes.get(attribute_name) == check['entries']:
+                    report[attribute_name]['msg'] = "Already set."
+                parameter[attribute_name] = check['entries']
+
+            failed = [name for name in report if report[name]['ret'] == False]
+            if failed:
+                return {'ret': False, 'msg': "Invalid value of bios attributes %s, nothing is set." % failed, 'entries': report}
+
+            headers = {"If-Match": "*", "Content-Type": "application/json"}
+            patch_response = self.patch(pending_url, headers=headers, body={"Attributes": parameter})
+            if patch_response.status in [200, 204]:
+                return {'ret': True, 'msg': "Succeed to set %s bios attributes." % len(parameter), 'entries': report}
+            else:
+                LOGGER.error(str(patch_response))
+                return {'ret': False, 'msg': "Failed to set bios attributes. Error code is %s. Error message is %s. " % \
+                        (patch_response.status, patch_response.text), 'entries': report}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to set bios attributes. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
     def lenovo_set_system_boot_order(self, bootorder):
         """Set system boot order.
         :params bootorder: Specify the bios boot order list, like: ["ubuntu", "CD/DVD Rom", "Hard Disk", "USB Storage"]
@@ -701,7 +785,7 @@ class SystemClient(RedfishBase):
         result = {}
         try:
             system_url = self._find_system_resource()
-            bmc_type = 'TSM' if 'Self' in system_url else 'XCC'
+            bmc_type = self._get_bmc_type()
             
             result = self._get_url(system_url)
             if result['ret'] == False: 
@@ -1101,6 +1185,10 @@ system_cmd_list = {
                 'args': [{'argname': "--attribute_name", 'type': str, 'nargs': "?", 'required': True, 'help': "Attribute name of bios"},
                          {'argname': "--attribute_value", 'type': str, 'nargs': "?", 'required': True, 'help': "New value of this attribute"}]
         },
+        "set_bios_attributes": {
+                'help': "Set several attributes of bios with one request",
+                'args': [{'argname': "--file", 'type': str, 'nargs': "?", 'required': True, 'help': "Json file of attribute names and values like {\"name\": \"value\"}, or ini file with 'name = value' lines under any section"}]
+        },
         "lenovo_set_system_boot_order": {
                 'help': "Set system's boot order",
                 'args': [{'argname': "--bootorder", 'type': str, 'nargs': "*", 'required': True, 'help': 'Bios boot order list, like: "CD/DVD Rom" "Hard Disk"'}]
@@ -1132,6 +1220,33 @@ system_cmd_list = {
         }
 }
 
+def read_bios_attributes_file(file_name):
+    """Read bios attributes from json or ini file
+    :file_name: json file of dict like {"name": "value"}, or ini file with 'name = value' lines under any section
+    :type file_name: string
+    :returns: returns Dict of bios attributes when succeeded or error message when failed
+    """
+    try:
+        if file_name.lower().endswith('.ini'):
+            config = configparser.RawConfigParser()
+            # Attribute names are case sensitive
+            config.optionxform = str
+            config.read(file_name)
+            attributes = {}
+            for section in config.sections():
+                attributes.update(dict(config.items(section)))
+        else:
+            with open(file_name, 'r') as f:
+                attributes = json.load(f)
+            if not isinstance(attributes, dict):
+                return {'ret': False, 'msg': "Bios attributes in file %s should be a dict." % file_name}
+        return {'ret': True, 'entries': attributes}
+    except Exception as e:
+        LOGGER.debug("%s" % traceback.format_exc())
+        msg = "Failed to read bios attributes from file %s. Error message: %s" % (file_name, repr(e))
+        LOGGER.error(msg)
+        return {'ret': False, 'msg': msg}
+
 def add_system_parameter(subcommand_parsers):
     for func in system_cmd_list.keys():
         parser_function = subcommand_parsers.add_parser(func, help=system_cmd_list[func]['help'])
@@ -1222,6 +1337,11 @@ def run_system_subcommand(args):
     elif cmd == 'set_bios_attribute':
         result = client.set_bios_attribute(args.attribute_name, args.attribute_value)
 
+    elif cmd == 'set_bios_attributes':
+        result = read_bios_attributes_file(args.file)
+        if result['ret'] == True:
+            result = client.set_bios_attributes(result['entries'])
+
     elif cmd == 'lenovo_set_system_boot_order':
         result = client.lenovo_set_system_boot_order(args.bootorder)
 
@@ -0,0 +1,482 @@
+###
+#
+# Lenovo Redfish Library - Helpers for monitoring long running tasks
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import json
+import time
+import heapq
+import itertools
+import threading
+import traceback
+import email.utils
+import requests
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import *
+from .deadline import DeadlineExceeded, OperationCancelled, get_current_deadline, deadline_scope
+
+END_TASK_STATE = ["Cancelled", "Completed", "Exception", "Killed", "Interrupted", "Suspended", "Done", "Failed when Flashing Image."]
+
+# Seconds between two polls of one task. Polling starts fast for short tasks and slows down for long ones.
+MIN_POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 10
+# Retry-After asked by bmc is followed, but never longer than this.
+MAX_RETRY_AFTER = 60
+# Polls run at the same time by one TaskWatcher.
+DEFAULT_WATCHER_WORKERS = 8
+# Seconds without any byte on the SSE stream before it is opened again.
+SSE_READ_TIMEOUT = 60
+
+
+def parse_retry_after(value):
+    """Parse Retry-After header
+    :param value: seconds or http date
+    :type value: str
+    :returns: returns Seconds to wait, or None if value is empty or not valid
+    """
+    if value is None or value == '':
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0, email.utils.mktime_tz(date) - time.time())
+
+
+class PollBackoff(object):
+    """Interval between polls of one long running operation.
+    It starts sub-second and grows step by step, follows Retry-After asked by bmc,
+    and once PercentComplete moves it is estimated from the progress rate.
+    """
+
+    def __init__(self, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL, factor=1.5):
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._factor = factor
+        self._interval = min_interval
+        self._first_progress = None
+
+    def next_interval(self, retry_after=None, percent=None):
+        """Get seconds to wait before next poll
+        :param retry_after: value of Retry-After header of last response
+        :type retry_after: str
+        :param percent: PercentComplete of task in last response
+        :type percent: int
+        :returns: returns Seconds to wait
+        """
+        seconds = parse_retry_after(retry_after)
+        if seconds is not None:
+            return min(seconds, MAX_RETRY_AFTER)
+
+        interval = self._interval
+        self._interval = min(self._interval * self._factor, self._max_interval)
+        if isinstance(percent, (int, float)) and not isinstance(percent, bool) and 0 < percent < 100:
+            now = time.time()
+            if self._first_progress is None:
+                self._first_progress = (now, percent)
+            elif percent > self._first_progress[1]:
+                # Wake up around half of the remaining time, so completion is seen soon.
+                rate = (percent - self._first_progress[1]) / (now - self._first_progress[0])
+                interval = (100 - percent) / rate / 2
+        return max(self._min_interval, min(interval, self._max_interval))
+
+
+class TaskEventListener(object):
+    """Listen to TaskStateChanged events from the EventService SSE stream of bmc.
+    Monitors waiting on it are woken up as soon as the task changes, instead of waiting for the next poll.
+    """
+
+    def __init__(self, client, sse_uri, task_uri):
+        """Initialize TaskEventListener
+        :param client: client logged in
+        :type client: RedfishBase
+        :param sse_uri: ServerSentEventUri of EventService
+        :type sse_uri: str
+        :param task_uri: uri of task monitored
+        :type task_uri: str
+        """
+        self._client = client
+        self._sse_uri = sse_uri
+        self._task_uri = task_uri
+        self._changed = threading.Event()
+        self._response = None
+        self._stopped = False
+
+    def start(self):
+        thread = threading.Thread(target=self._listen)
+        thread.daemon = True
+        thread.start()
+
+    def _is_task_event(self, event):
+        if 'Task' not in event.get('MessageId', '') and event.get('EventType') != 'StatusChange':
+            return False
+        origin = event.get('OriginOfCondition', {})
+        origin_uri = origin.get('@odata.id', '') if isinstance(origin, dict) else str(origin)
+        return origin_uri == '' or origin_uri.rstrip('/') == self._task_uri.rstrip('/')
+
+    def _listen(self):
+        # Idle stream is opened again after read timeout, so a stream dropped silently does not hang the thread.
+        while not self._stopped:
+            try:
+                if not self._listen_once():
+                    return
+                # Stream is ended by bmc, do not reconnect in a busy loop
+                time.sleep(1)
+            except Exception as e:
+                if self._stopped:
+                    return
+                if isinstance(e, requests.exceptions.ReadTimeout) or \
+                   (isinstance(e, requests.exceptions.ConnectionError) and isinstance(e.args[0] if e.args else None, urllib3.exceptions.ReadTimeoutError)):
+                    LOGGER.debug("No event from %s in %s seconds, listen again." % (self._client._ip, SSE_READ_TIMEOUT))
+                    continue
+                LOGGER.debug("%s" % traceback.format_exc())
+                LOGGER.info("Stop listening to events of %s. Error message: %s" % (self._client._ip, repr(e)))
+                return
+
+    def _listen_once(self):
+        """Read events from one connection of SSE stream
+        :returns: returns True if stream is ended by bmc and should be opened again
+        """
+        url = "https://" + self._client._ip + self._sse_uri
+        response = requests.get(url, headers=self._client._get_auth_headers(), stream=True,
+                                verify=self._client._get_verify(), timeout=(self._client._connect_timeout, SSE_READ_TIMEOUT))
+        try:
+            self._response = response
+            if self._stopped:
+                # stop() is called while connecting, it could not close this response
+                return False
+            if response.status_code != 200:
+                LOGGER.info("Failed to listen to events of %s. Error code is %s." % (self._client._ip, response.status_code))
+                return False
+            # Events are small, read them as they come instead of waiting for a full chunk
+            for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+                if self._stopped:
+                    return False
+                if not line or not line.startswith('data:'):
+                    continue
+                try:
+                    data = json.loads(line[len('data:'):].strip())
+                except ValueError:
+                    continue
+                events = data.get('Events', [data]) if isinstance(data, dict) else []
+                for event in events:
+                    if isinstance(event, dict) and self._is_task_event(event):
+                        self._changed.set()
+            return True
+        finally:
+            response.close()
+
+    def wait(self, timeout):
+        """Wait until task changes or timeout
+        :returns: returns True if an event of task is received
+        """
+        changed = self._changed.wait(timeout)
+        self._changed.clear()
+        return changed
+
+    def stop(self):
+        self._stopped = True
+        if self._response is not None:
+            try:
+                self._response.close()
+            except Exception:
+                pass
+
+
+class TaskHandle(object):
+    """Handle of one long running operation started on bmc, returned by non-blocking methods
+    like lenovo_update_firmware_nowait. The operation is followed by a TaskWatcher, or by the
+    thread calling wait() if the handle is not watched.
+    The client which started the operation must stay logged in until the operation is done.
+    Deadline of the thread creating the handle also limits the polls, wherever they are run.
+    """
+
+    def __init__(self, client, task_uri=None, check=None, finish=None, wait_time=10, timeout_msg=None, result=None):
+        """Initialize TaskHandle
+        :param client: client which started the operation
+        :type client: RedfishBase
+        :param task_uri: uri of task monitored
+        :type task_uri: str
+        :param check: function to check operation once, returns Tuple of (done, result, retry_after). Default checks task_uri.
+        :type check: function
+        :param finish: function to build final result from result of task, like downloading file or deleting task
+        :type finish: function
+        :param wait_time: maximum time(minutes) to wait the operation complete
+        :type wait_time: int
+        :param timeout_msg: message of result when operation is not completed in wait_time
+        :type timeout_msg: str
+        :param result: result known already, like failure before any task is created
+        :type result: dict
+        """
+        self._client = client
+        self._task_uri = task_uri
+        if check is None:
+            check = lambda: client._check_task(task_uri)
+        self._check = check
+        self._finish = finish
+        self._wait_seconds = wait_time * 60
+        if timeout_msg is None:
+            timeout_msg = "Task is not completed in %s minutes expected." % wait_time
+        self._timeout_msg = timeout_msg
+        self._time_start = time.time()
+        self._backoff = PollBackoff()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._callbacks = []
+        self._result = None
+        self._watcher = None
+        self._deadline = get_current_deadline()
+        if result is not None:
+            self._set_result(result)
+
+    def get_task_uri(self):
+        return self._task_uri
+
+    def is_done(self):
+        return self._done.is_set()
+
+    def get_result(self):
+        """Get result of operation
+        :returns: returns Dict of result, or None if operation is not done
+        """
+        return self._result
+
+    def add_done_callback(self, callback):
+        """Call callback(handle) when operation is done, at once if it is done already"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _set_result(self, result):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self._result = result
+            self._done.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                LOGGER.debug("%s" % traceback.format_exc())
+                LOGGER.error("Failed to call back for task %s. Error message: %s" % (self._task_uri, repr(e)))
+
+    def poll(self):
+        """Check operation once
+        :returns: returns Seconds to wait before next poll, or None if operation is done
+        """
+        if self._done.is_set():
+            return None
+        try:
+            if self._deadline is not None:
+                self._deadline.check()
+            with deadline_scope(self._deadline):
+                done, result, retry_after = self._check()
+            if not done:
+                entries = result.get('entries') or {}
+                time_now = time.time()
+                if time_now - self._time_start <= self._wait_seconds:
+                    interval = self._backoff.next_interval(retry_after, entries.get('PercentComplete'))
+                    interval = min(interval, max(0, self._time_start + self._wait_seconds - time_now))
+                    if self._deadline is not None and self._deadline.remaining() is not None:
+                        interval = min(interval, self._deadline.remaining())
+                    return interval
+                result = {'ret': False, 'msg': self._timeout_msg, 'entries': entries}
+            if self._finish is not None:
+                with deadline_scope(self._deadline):
+                    result = self._finish(result)
+        except (DeadlineExceeded, OperationCancelled) as e:
+            # Task keeps running on bmc, only following it is stopped
+            msg = "Stop monitoring task %s. %s" % (self._task_uri, str(e))
+            LOGGER.info(msg)
+            result = {'ret': False, 'msg': msg}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to monitor task %s. Error message: %s" % (self._task_uri, repr(e))
+            LOGGER.error(msg)
+            result = {'ret': False, 'msg': msg}
+        self._set_result(result)
+        return None
+
+    def wait(self, timeout=None):
+        """Wait until operation is done
+        :param timeout: seconds to wait, None means until operation is done
+        :type timeout: float
+        :returns: returns Dict of result, or None if operation is not done in timeout
+        """
+        if self._watcher is not None or self._done.is_set():
+            self._done.wait(timeout)
+            return self._result
+
+        # Not watched, poll in the calling thread
+        deadline = None if timeout is None else time.time() + timeout
+        listener = None
+        if self._task_uri and self._client._task_events and self._client._get_sse_uri():
+            listener = TaskEventListener(self._client, self._client._get_sse_uri(), self._task_uri)
+            listener.start()
+        try:
+            while True:
+                interval = self.poll()
+                if interval is None:
+                    return self._result
+                if deadline is not None:
+                    if deadline <= time.time():
+                        return None
+                    interval = min(interval, deadline - time.time())
+                if listener is not None:
+                    listener.wait(interval)
+                elif self._deadline is not None:
+                    # Woken up at once when the operation is cancelled
+                    self._deadline.sleep(interval)
+                else:
+                    time.sleep(interval)
+        finally:
+            if listener is not None:
+                listener.stop()
+
+
+class TaskWatcher(object):
+    """One thread following many TaskHandles, of one or many BMCs.
+    Handles are queued by time of their next poll and due polls are run by a small pool of workers,
+    so a fleet rollout does not need one parked thread for each server.
+
+    Example:
+        watcher = TaskWatcher()
+        handles = [client.lenovo_update_firmware_nowait(image, watcher=watcher) for client in clients]
+        results = watcher.wait_all(handles)
+    """
+
+    def __init__(self, max_workers=DEFAULT_WATCHER_WORKERS):
+        """Initialize TaskWatcher
+        :param max_workers: maximum number of polls run at the same time
+        :type max_workers: int
+        """
+        self._max_workers = max(1, int(max_workers))
+        # Heap of (time of next poll, sequence, handle)
+        self._queue = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._stopped = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def add(self, handle):
+        """Follow operation of handle until it is done
+        :param handle: handle returned by non-blocking methods
+        :type handle: TaskHandle
+        :returns: returns the handle
+        """
+        handle._watcher = self
+        if handle.is_done():
+            return handle
+        with self._cond:
+            if self._stopped:
+                handle._set_result({'ret': False, 'msg': "Task watcher is stopped."})
+                return handle
+            if self._thread is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            heapq.heappush(self._queue, (time.time(), next(self._sequence), handle))
+            self._cond.notify()
+        return handle
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (not self._queue or self._queue[0][0] > time.time()):
+                    if self._queue:
+                        self._cond.wait(self._queue[0][0] - time.time())
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    return
+                handle = heapq.heappop(self._queue)[2]
+            try:
+                self._executor.submit(self._poll, handle)
+            except RuntimeError:
+                # Executor is shut down by stop()
+                handle._set_result({'ret': False, 'msg': "Task watcher is stopped before task is done."})
+                return
+
+    def _poll(self, handle):
+        interval = handle.poll()
+        if interval is None:
+            return
+        with self._cond:
+            if not self._stopped:
+                heapq.heappush(self._queue, (time.time() + interval, next(self._sequence), handle))
+                self._cond.notify()
+                return
+        handle._set_result({'ret': False, 'msg': "Task watcher is stopped before task is done."})
+
+    def wait_all(self, handles, timeout=None):
+        """Wait until all operations are done
+        :param handles: handles added into this watcher
+        :type handles: list
+        :param timeout: seconds to wait, None means until all operations are done
+        :type timeout: float
+        :returns: returns List of results in order of handles, None for operation not done in timeout
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        results = []
+        for handle in handles:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            results.append(handle.wait(remaining))
+        return results
+
+    def stop(self):
+        """Stop watching, operations not done yet get a failed result"""
+        with self._cond:
+            self._stopped = True
+            queue = self._queue
+            self._queue = []
+            self._cond.notify()
+        for item in queue:
+            item[2]._set_result({'ret': False, 'msg': "Task watcher is stopped before task is done."})
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+_task_watcher = None
+_task_watcher_lock = threading.Lock()
+
+
+def get_task_watcher():
+    """Get TaskWatcher shared by all clients of this process, used when no watcher is given"""
+    global _task_watcher
+    with _task_watcher_lock:
+        if _task_watcher is None:
+            _task_watcher = TaskWatcher()
+        return _task_watcher
@@ -20,6 +20,7 @@
 ###
 
 import os
+import re
 import logging
 import json
 import traceback 
@@ -28,20 +29,54 @@ import time
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
 from .redfish_base import RedfishBase
+from .task_monitor import TaskHandle
+from .multipart_upload import post_multipart
 from .utils import *
 from .utils import add_common_parameter
 from .utils import parse_common_parameter
 
+# Lenovo package name, like lnvgy_fw_xcc_cdi3a4o-8.41_anyos_noarch.uxz
+LENOVO_PACKAGE_NAME = re.compile(r'^lnvgy_fw_([a-z0-9]+)_([a-z0-9]+)-([0-9][0-9a-z.]*)_', re.IGNORECASE)
+# Firmware inventory ids updated by package of each component
+COMPONENT_INVENTORY_IDS = {'xcc': ['BMC-Primary'], 'uefi': ['UEFI'], 'lxpm': ['LXPM'],
+                           'lxpmwindrv': ['LXPMWindowsDriver'], 'lxpmlinuxdrv': ['LXPMLinuxDriver']}
+# Size of HPM.1 image header, firmware revision is at offset 26~27
+HPM_HEADER_SIZE = 32
+
+
+def read_image_version(file_path):
+    """Read version of firmware image. Only name of image or header of HPM.1 image is read, not the whole file.
+    :params file_path: local path or file name of image
+    :type file_path: string
+    :returns: returns Dict like {'Component': 'xcc', 'BuildId': 'CDI3A4O', 'Version': '8.41'}, or None if version is unknown
+    """
+    match = LENOVO_PACKAGE_NAME.match(os.path.basename(file_path))
+    if match:
+        return {'Component': match.group(1).lower(), 'BuildId': match.group(2).upper(), 'Version': match.group(3)}
+    if os.path.isfile(file_path):
+        with open(file_path, 'rb') as f:
+            header = bytearray(f.read(HPM_HEADER_SIZE))
+        if len(header) == HPM_HEADER_SIZE and header[:8] == b'PICMGFWU':
+            # Major revision is binary, minor revision is BCD
+            return {'Component': '', 'BuildId': '', 'Version': '%d.%02x' % (header[26] & 0x7f, header[27])}
+    return None
+
+def _same_version(version1, version2):
+    """Compare version strings, leading zeros of numbers are ignored"""
+    normalize = (lambda version: [part.lstrip('0') or '0' if part.isdigit() else part.lower() for part in version.strip('.').split('.')])
+    return normalize(version1) == normalize(version2)
+
+
 class UpdateClient(RedfishBase):
     """A client for updating firmware"""
 
     def __init__(self, ip='', username='', password='',
-                 configfile='config.ini', auth=''):
+                 configfile='config.ini', auth='', session=None):
         """Initialize UpdateClient"""
 
         super(UpdateClient, self).__init__(
             ip=ip, username=username, password=password, 
-            configfile=configfile, auth=auth
+            configfile=configfile, auth=auth, session=session
         )
 
     #############################################
@@ -71,17 +106,145 @@ class UpdateClient(RedfishBase):
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
 
+    def get_firmware_inventory_changes(self, cache_file=None):
+        """Get firmwares changed since last call. Firmware inventory and etag of each component are saved
+           in cache file, unchanged components are not sent again by bmc which supports If-None-Match.
+           The first call reports all firmwares as added.
+        :params cache_file: file to save firmware inventory of each bmc. \
+                            Default is 'firmware_inventory_cache.json' under current working directory
+        :type cache_file: string
+        :returns: returns Dict of 'Added', 'Removed' and 'Changed' firmwares and 'Unchanged' count when succeeded \
+                  or error message when failed
+        """
+        try:
+            if cache_file == None or cache_file == '':
+                cache_file = os.getcwd() + os.sep + 'firmware_inventory_cache.json'
+
+            result = self._get_url('/redfish/v1/UpdateService')
+            if result['ret'] == False:
+                return result
+            fw_url = result['entries']['FirmwareInventory']['@odata.id']
+
+            # Members are not expanded here, so each one can be validated by its own etag.
+            member_urls = []
+            next_url = fw_url
+            while next_url:
+                result = self._get_url(next_url)
+                if result['ret'] == False:
+                    return result
+                member_urls.extend([member['@odata.id'] for member in result['entries']['Members']])
+                next_url = result['entries'].get('Members@odata.nextLink')
+
+            cached = load_json_file(cache_file).get(self._ip, {})
+            etags = {}
+            for url in cached:
+                if cached[url].get('etag'):
+                    etags[url] = cached[url]['etag']
+            result = self._get_members_if_none_match(member_urls, etags)
+            if result['ret'] == False:
+                return result
+
+            inventory = {}
+            changes = {'Added': [], 'Removed': [], 'Changed': [], 'Unchanged': 0}
+            for url, member in zip(member_urls, result['entries']):
+                if member['entries'] is None:
+                    inventory[url] = cached[url]
+                    changes['Unchanged'] = changes['Unchanged'] + 1
+                    continue
+                firmware = propertyFilter(member['entries'])
+                inventory[url] = {'etag': member['etag'], 'entry': firmware}
+                if url not in cached:
+                    changes['Added'].append(firmware)
+                elif cached[url]['entry'] != firmware:
+                    changes['Changed'].append({'Old': cached[url]['entry'], 'New': firmware})
+                else:
+                    changes['Unchanged'] = changes['Unchanged'] + 1
+            for url in cached:
+                if url not in inventory:
+                    changes['Removed'].append(cached[url]['entry'])
+
+            with lock_json_file(cache_file):
+                all_inventory = load_json_file(cache_file)
+                all_inventory[self._ip] = inventory
+                save_json_file(cache_file, all_inventory)
+            return {'ret': True, 'entries': changes}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to get firmware inventory changes. Error message: %s" % repr(e)
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
     #############################################
     # functions for updating firmware.
     #############################################
 
-    def lenovo_update_firmware(self, image, target=None, fsprotocol='HTTPPUSH', fsip=None, fsdir=None, fsusername=None, fspassword=None):
+    def _check_firmware_current(self, image, file_path, target=None):
+        """Check whether the component updated by image already runs version of image
+        :params image: image's file name
+        :type image: string
+        :params file_path: local path of image, or file name if image is on file server
+        :type file_path: string
+        :params target: target of update
+        :type target: string
+        :returns: returns Dict with 'Current' True or False, and versions compared
+        """
+        try:
+            image_info = read_image_version(file_path)
+            if image_info is None:
+                return {'ret': True, 'entries': {'Current': False, 'Reason': "Version of image '%s' is unknown." % image}}
+            decision = {'Current': False, 'ImageVersion': image_info['Version'], 'BuildId': image_info['BuildId']}
+
+            if target:
+                ids = [target.split('/')[-1]]
+            else:
+                ids = COMPONENT_INVENTORY_IDS.get(image_info['Component'], [])
+            if not ids and not image_info['BuildId']:
+                decision['Reason'] = "Component updated by image '%s' is unknown." % image
+                return {'ret': True, 'entries': decision}
+
+            result = self.get_firmware_inventory()
+            if result['ret'] == False:
+                return result
+            # Ids of COMPONENT_INVENTORY_IDS are compared exactly, 'LXPM' is not 'LXPMLinuxDriver' and 'UEFI' is not 'UEFI-Backup'.
+            # TSM target 'BMC' or 'UEFI' is the prefix of its inventory id, used only if no inventory id is the target.
+            inventory_ids = [firmware.get('Id', '').lower() for firmware in result['entries']]
+            match_prefix = bool(target) and not any(id.lower() in inventory_ids for id in ids)
+            for firmware in result['entries']:
+                firmware_id = firmware.get('Id', '')
+                installed_version = firmware.get('Version') or ''
+                if ids:
+                    if match_prefix:
+                        if not any(firmware_id.lower().startswith(id.lower()) for id in ids):
+                            continue
+                    elif firmware_id.lower() not in [id.lower() for id in ids]:
+                        continue
+                elif image_info['BuildId'] not in installed_version.upper():
+                    continue
+                decision['Id'] = firmware_id
+                decision['InstalledVersion'] = installed_version
+                for token in re.split(r'[^0-9A-Za-z.]+', installed_version):
+                    if token and _same_version(token, image_info['Version']):
+                        decision['Current'] = True
+                        decision['Reason'] = "'%s' already runs version %s." % (firmware_id, image_info['Version'])
+                        return {'ret': True, 'entries': decision}
+            if 'Id' not in decision:
+                decision['Reason'] = "No firmware inventory matches image '%s'." % image
+            else:
+                decision['Reason'] = "'%s' runs version %s, image version is %s." % (decision['Id'], decision['InstalledVersion'], image_info['Version'])
+            return {'ret': True, 'entries': decision}
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            msg = "Failed to check firmware version of image '%s'. Error message: %s" % (image, repr(e))
+            LOGGER.error(msg)
+            return {'ret': False, 'msg': msg}
+
+    def lenovo_update_firmware(self, image, target=None, fsprotocol='HTTPPUSH', fsip=None, fsdir=None, fsusername=None, fspassword=None, skip_if_current=False):
         """Update firmware.
         :params targets: target. For XCC: only 'BMC-Backup'. For TSM: only 'BMC' or 'UEFI'.
         :type targets: string
         :params image: image's file path or url
         :type image: string
-        :params fsprotocol: transfer protocol, like HTTPPUSH, SFTP
+        :params fsprotocol: transfer protocol, like HTTPPUSH, SFTP, TFTP, HTTP
         :type fsprotocol: string
         :params fsip: file server ip, like sftp or tftp server ip
         :type fsip: string
@@ -91,19 +254,51 @@ class UpdateClient(RedfishBase):
         :type fspassword: string
         :params fsdir: full path of dir on file server(sftp/tftp) or local machine(httppush), under which image is saved 
         :type fsdir: string
-        :returns: returns the result of firmware updating
+        :params skip_if_current: if True, compare version of image with firmware inventory first, and skip the update when the target already runs it
+        :type skip_if_current: bool
+        :returns: returns the result of firmware updating. When version is checked, the decision is in 'precheck' of the result
+        """
+        return self._wait_task(self._start_update_firmware(image, target, fsprotocol, fsip, fsdir, fsusername, fspassword, skip_if_current))
+
+    def lenovo_update_firmware_nowait(self, image, target=None, fsprotocol='HTTPPUSH', fsip=None, fsdir=None, fsusername=None, fspassword=None, skip_if_current=False, watcher=None):
+        """Start updating firmware without waiting it completes.
+        Parameters are same as lenovo_update_firmware.
+        :params watcher: TaskWatcher following the update, default is the one shared by all clients
+        :type watcher: TaskWatcher
+        :returns: returns TaskHandle, call its wait() to get the result of firmware updating
+        """
+        return self._watch_task(self._start_update_firmware(image, target, fsprotocol, fsip, fsdir, fsusername, fspassword, skip_if_current), watcher)
+
+    def _start_update_firmware(self, image, target=None, fsprotocol='HTTPPUSH', fsip=None, fsdir=None, fsusername=None, fspassword=None, skip_if_current=False):
+        """Start updating firmware
+        :returns: returns TaskHandle of update task, or Dict of result if update is done already
         """
         result = {}
+        precheck = None
+        # Image served by image server, until the update is done
+        published_path = None
         try:
+            if skip_if_current:
+                # Image is local for HTTPPUSH and image server, otherwise only its name is known
+                if fsprotocol.lower() == "httppush" or (fsprotocol.lower() == "http" and not fsip and self._image_server is not None):
+                    file_path = os.path.join(fsdir or os.getcwd(), image)
+                else:
+                    file_path = image
+                result = self._check_firmware_current(image, file_path, target)
+                if result['ret'] == False:
+                    return result
+                precheck = result['entries']
+                LOGGER.info("Version check of '%s': %s" % (image, precheck['Reason']))
+                if precheck['Current']:
+                    return {'ret': True, 'msg': "Skip updating '%s'. %s" % (image, precheck['Reason']), 'precheck': precheck}
+
             update_service_url = '/redfish/v1/UpdateService'
-            result = self._get_url(update_service_url)
+            result = self._get_update_service_uris()
             if result['ret'] == False:
                 return result
+            update_uris = result['entries']
 
-            # Check bmc type. XCC has 'HttpPushUri', TSM no this.
-            bmc_type = 'TSM'
-            if 'HttpPushUri' in result['entries'].keys():
-                bmc_type = 'XCC'
+            bmc_type = self._get_bmc_type()
 
             if bmc_type == 'XCC':
                 if target != None and target.lower() == "bmc-backup":
@@ -134,19 +329,14 @@ class UpdateClient(RedfishBase):
                                       (target, response.status, response.text)}
                             LOGGER.error(result['msg'])
                             return result
-                    firmware_update_url =  self.get_base_url() + result['entries']["HttpPushUri"]
-                    headers = {"Content-Type":"application/octet-stream"}
-                    if self._auth == 'session':
-                        headers["X-Auth-Token"] = self.get_session_key()
-                    else:
-                        headers["Authorization"] = self.get_authorization_key()
-                    files = {'data-binary':open(file_path,'rb')}
-                    if self._cafile is not None and self._cafile != "":
-                        response = requests.post(firmware_update_url, headers=headers, files=files, verify=self._cafile)
-                    else:
-                        # Ignore SSL Certificates
-                        requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-                        response = requests.post(firmware_update_url, headers=headers, files=files, verify=False)
+                    firmware_update_url =  self.get_base_url() + update_uris["HttpPushUri"]
+                    # Stream the image, only one chunk of it is in memory.
+                    # XCC has always received this upload with octet-stream Content-Type, keep it.
+                    with open(file_path, 'rb') as f_image:
+                        fields = [('data-binary', (os.path.basename(file_path), f_image, None))]
+                        response = post_multipart(self, firmware_update_url, fields,
+                                                  self._upload_chunk_size, self._upload_callback,
+                                                  content_type="application/octet-stream")
                     response_code = response.status_code
                     
                     # After BMC-Backup updated, need to set HttpPushUriTargets to null.
@@ -160,15 +350,27 @@ class UpdateClient(RedfishBase):
                             result = {'ret': False, 'msg': "Failed to clear target '%s'. Error code is %s. Error message is %s. " % \
                                       (target, response_patch.status, response_patch.text)}
                             LOGGER.error(result['msg'])
-                else: # sftp/tftp
-                    firmware_update_url = result['entries']['Actions']['#UpdateService.SimpleUpdate']['target']
+                else: # sftp/tftp/http
+                    firmware_update_url = update_uris['SimpleUpdate']
                     # Update firmware via file server
+                    if fsprotocol.lower() == "http" and not fsip and self._image_server is not None:
+                        # Serve the image from this process, fsdir is the local directory of image
+                        if fsdir == None or fsdir == '':
+                            fsdir = os.getcwd()
+                        file_path = os.path.join(fsdir, image)
+                        if (not os.path.exists(file_path)):
+                            result = {'ret': False, 'msg': "File '%s' does not exist." % file_path}
+                            return result
+                        fsdir = "/" + self._image_server.publish(file_path)
+                        published_path = file_path
+                        fsip = self._image_server.get_host(self._ip)
+
                     # Define an anonymous function formatting parameter
                     dir = (lambda fsdir: "/" + fsdir.strip("/") if fsdir else fsdir)
                     fsdir = dir(fsdir)
 
-                    if fsprotocol.lower() not in ["sftp", "tftp"]:
-                        result = {'ret': False, 'msg': "Protocol only supports HTTPPUSH, SFTP and TFTP."}
+                    if fsprotocol.lower() not in ["sftp", "tftp", "http"]:
+                        result = {'ret': False, 'msg': "Protocol only supports HTTPPUSH, SFTP, TFTP and HTTP."}
                         return result
 
                     # Build an dictionary to store the request body
@@ -186,19 +388,22 @@ class UpdateClient(RedfishBase):
 
                 if response_code in [200, 204]:
                     result = {'ret': True, 'msg': "Succeed to update the firmware."}
+                    if precheck is not None:
+                        result['precheck'] = precheck
                     return result
                 elif response_code == 202:
                     if fsprotocol.lower() == "httppush":
                         task_uri = response.json()['@odata.id']
                     else:
                         task_uri = response.dict['@odata.id']
-                    print("Start to refresh the firmware, please wait about 3~10 minutes...")
-                    result = self._task_monitor(task_uri)
-                    if result['ret'] == True:
-                        result['msg'] = "Succeed to update the firmware. Image is '%s'." % image
-                    # Delete task
-                    self.delete(task_uri, None)
-                    return result
+                    print_progress("Start to refresh the firmware, please wait about 3~10 minutes...")
+                    handle = TaskHandle(self, task_uri, finish=lambda result: self._finish_update_firmware(result, task_uri, image, precheck))
+                    if published_path is not None:
+                        # BMC may pull the image until the task is done, whether it succeeds or fails
+                        image_server, image_path = self._image_server, published_path
+                        handle.add_done_callback(lambda handle: image_server.unpublish(image_path))
+                        published_path = None
+                    return handle
                 else:
                     result = {'ret': False, 'msg': "Failed to update '%s'. Error code is %s. Error message is %s. " % \
                               (image, response_code, response.text)}
@@ -206,7 +411,7 @@ class UpdateClient(RedfishBase):
                     return result
 
             if bmc_type == 'TSM':
-                if "MultipartHttpPushUri" in result['entries'] and fsprotocol.upper() == "HTTPPUSH":
+                if update_uris["MultipartHttpPushUri"] and fsprotocol.upper() == "HTTPPUSH":
                     if target == None or target.upper() not in ['BMC', 'UEFI']:
                         result = {'ret': False, 'msg': "You must specify the target: BMC or UEFI."}
                         return result
@@ -222,61 +427,37 @@ class UpdateClient(RedfishBase):
                         result = {'ret': False, 'msg': "File '%s' does not exist." % file_path}
                         return result
 
-                    multipart_uri = self.get_base_url() + result['entries']["MultipartHttpPushUri"]
+                    multipart_uri = self.get_base_url() + update_uris["MultipartHttpPushUri"]
                     manager_url = self._find_manager_resource()
                     parameters = {"Targets": [manager_url]}
                     
-                    # Create temporary files to write to the OEM value
-                    parameters_file = os.getcwd() + os.sep + "parameters.json"
-                    oem_parameters_file = os.getcwd() + os.sep + "oem_parameters.json"
-                    with open(parameters_file, 'w') as f:
-                        f.write(json.dumps(parameters))
-                    with open(oem_parameters_file, 'w') as f:
-                        f.write(json.dumps(oem_parameters))
-
-                    f_parameters = open(parameters_file, 'rb')
-                    f_oem_parameters = open(oem_parameters_file, 'rb')
-                    # Specify the parameters required to update the firmware
-                    files = {'UpdateParameters': ("parameters.json", f_parameters, 'application/json'),
-                             'OemParameters': ("oem_parameters.json", f_oem_parameters, 'application/json'),
-                             'UpdateFile': (image, open(file_path, 'rb'), 'multipart/form-data')}
-
-                    # Send a post command through requests to update the firmware
-                    # Ignore SSL Certificates
-                    requests.packages.urllib3.disable_warnings(InsecureRequestWarning)  
-                    print("Start to upload the image, may take about 3~10 minutes...")
-                    headers = {}
-                    if self._auth == 'session':
-                        headers["X-Auth-Token"] = self.get_session_key()
-                    else:
-                        headers["Authorization"] = self.get_authorization_key()
-                    response = requests.post(multipart_uri, headers=headers, files=files, verify=False)
+                    # Specify the parameters required to update the firmware, built in memory
+                    # so concurrent updates do not share any file in working directory
+                    fields = [('UpdateParameters', ("parameters.json", json.dumps(parameters).encode('utf-8'), 'application/json')),
+                              ('OemParameters', ("oem_parameters.json", json.dumps(oem_parameters).encode('utf-8'), 'application/json'))]
+
+                    # Send a post command through requests to update the firmware, the image is streamed
+                    print_progress("Start to upload the image, may take about 3~10 minutes...")
+                    with open(file_path, 'rb') as f_image:
+                        fields.append(('UpdateFile', (image, f_image, 'multipart/form-data')))
+                        response = post_multipart(self, multipart_uri, fields,
+                                                  self._upload_chunk_size, self._upload_callback)
                     response_code = response.status_code
-                    
-                    f_parameters.close()
-                    f_oem_parameters.close()
-                    # Delete temporary files if they exist
-                    if os.path.exists(parameters_file):
-                        os.remove(parameters_file)
-                    if os.path.exists(oem_parameters_file):
-                        os.remove(oem_parameters_file)
 
                     if response_code in [200, 202, 204]:
                         # For BMC update, BMC will restart automatically, the session connection will be disconnected, user have to wait BMC to restart.
                         # For UEFI update, the script can monitor the update task via BMC. 
                         if target.upper() == "BMC":
                             task_uri = response.headers['Location']
-                            print("BMC update task is: %s." % task_uri)
+                            print_progress("BMC update task is: %s." % task_uri)
                             result = {'ret': True, 'msg': "Succeed to update bmc. Image is '%s'. Wait about 5 minutes for bmc to restart." % image, 'task': task_uri}
+                            if precheck is not None:
+                                result['precheck'] = precheck
                             return result
                         else:
                             task_uri = response.headers['Location']
-                            print("Start to refresh the firmware, please wait about 3~10 minutes...")
-                            result = self._task_monitor(task_uri)
-                            if result['ret'] == True:
-                                result['msg'] = "Succeed to update the firmware. Image is '%s'." % image
-                            self.delete(task_uri, None)
-                            return result
+                            print_progress("Start to refresh the firmware, please wait about 3~10 minutes...")
+                            return TaskHandle(self, task_uri, finish=lambda result: self._finish_update_firmware(result, task_uri, image, precheck))
                     else:
                         result = {'ret': False, 'msg': "Failed to update '%s'. Error code is %s. Error message is %s. " % \
                                   (image, response_code, response.text)}
@@ -290,21 +471,38 @@ class UpdateClient(RedfishBase):
             msg = "Failed to update the firmware. Error message: %s" % repr(e)
             LOGGER.error(msg)
             return {'ret': False, 'msg': msg}
+        finally:
+            if published_path is not None:
+                self._image_server.unpublish(published_path)
+
+    def _finish_update_firmware(self, result, task_uri, image, precheck=None):
+        if result['ret'] == True:
+            result['msg'] = "Succeed to update the firmware. Image is '%s'." % image
+        if precheck is not None:
+            result['precheck'] = precheck
+        # Delete task
+        self.delete(task_uri, None)
+        return result
 
 update_cmd_list = {
         "get_firmware_inventory": {
                 'help': "Get firmware's inventory", 
                 'args': []
         },
+        "get_firmware_inventory_changes": {
+                'help': "Get firmwares added, removed or changed since last run",
+                'args': [{'argname': "--cache_file", 'type': str, 'nargs': "?", 'required': False, 'help': "File to save firmware inventory of each bmc. Default is 'firmware_inventory_cache.json' under current working directory"}]
+        },
         "lenovo_update_firmware": {
                 'help': "Update firmware",
                 'args': [{'argname': "--image", 'type': str, 'nargs': "?", 'required': True, 'help': "Image's file name"},
                          {'argname': "--target", 'type': str, 'nargs': "?", 'required': False, 'help': "For XCC: 'BMC-Backup' only. For TSM: 'BMC' or 'UEFI'"},
-                         {'argname': "--fsprotocol", 'type': str, 'nargs': "?", 'required': False, 'help': "Transfer protocol. For XCC: 'HTTPPUSH', 'SFTP' or 'TFTP'. Fox TSM: 'HTTPPUSH' only"},
+                         {'argname': "--fsprotocol", 'type': str, 'nargs': "?", 'required': False, 'help': "Transfer protocol. For XCC: 'HTTPPUSH', 'SFTP', 'TFTP' or 'HTTP'. Fox TSM: 'HTTPPUSH' only"},
                          {'argname': "--fsip", 'type': str, 'nargs': "?", 'required': False, 'help': "File server's ip, like: SFTP or TFTP server ip"},
                          {'argname': "--fsdir", 'type': str, 'nargs': "?", 'required': False, 'help': "Full path of dir on file server(SFTP/TFTP) or local machine(HTTPPUSH), under which image is saved."},
                          {'argname': "--fsusername", 'type': str, 'nargs': "?", 'required': False, 'help': "User name to access SFTP file server"},
-                         {'argname': "--fspassword", 'type': str, 'nargs': "?", 'required': False, 'help': "Password to access SFTP file server"}]
+                         {'argname': "--fspassword", 'type': str, 'nargs': "?", 'required': False, 'help': "Password to access SFTP file server"},
+                         {'argname': "--skip_if_current", 'type': int, 'nargs': "?", 'required': False, 'help': "1: skip the update if target already runs version of image, 0: always update. Default is 0"}]
         }
 }
 
@@ -344,6 +542,9 @@ def run_update_subcommand(args):
     if cmd == 'get_firmware_inventory':
         result = client.get_firmware_inventory()
 
+    elif cmd == 'get_firmware_inventory_changes':
+        result = client.get_firmware_inventory_changes(args.cache_file)
+
     elif cmd == 'lenovo_update_firmware':
         if args.fsprotocol == None:
             args.fsprotocol = 'HTTPPUSH'
@@ -353,7 +554,8 @@ def run_update_subcommand(args):
                                                args.fsip, 
                                                args.fsdir, 
                                                args.fsusername, 
-                                               args.fspassword)
+                                               args.fspassword,
+                                               args.skip_if_current == 1)
     else:
         result = {'ret': False, 'msg': "Subcommand is not supported."}
 
@@ -0,0 +1,335 @@
+###
+#
+# Lenovo Redfish Library - Embedded HTTP server receiving files uploaded by BMCs
+#
+# Copyright Notice:
+#
+# Copyright 2020 Lenovo Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+###
+
+import os
+import re
+import uuid
+import threading
+import traceback
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, unquote
+
+from .utils import *
+
+# Bytes read from connection and written to disk at one time.
+RECEIVE_CHUNK_SIZE = 64 * 1024
+
+
+class UploadSlot(object):
+    """Folder on UploadReceiver where one BMC uploads files for one operation.
+    Folder name is unique, so files received are matched to the BMC and operation which asked for them.
+    """
+
+    def __init__(self, receiver, bmc_ip, folder, directory):
+        self._receiver = receiver
+        self.bmc_ip = bmc_ip
+        self.folder = folder
+        self.directory = directory
+        self._files = []
+        self._files_lock = threading.Lock()
+        self._received = threading.Event()
+
+    def get_files(self):
+        """Get local paths of files received"""
+        with self._files_lock:
+            return list(self._files)
+
+    def is_received(self):
+        return self._received.is_set()
+
+    def wait(self, timeout=None):
+        """Wait until one file is received
+        :returns: returns True if file is received
+        """
+        return self._received.wait(timeout)
+
+    def close(self):
+        """Stop accepting uploads into this folder"""
+        self._receiver.unregister(self)
+
+    def _save(self, filename, chunks):
+        filename = re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.basename(filename.replace('\\', '/'))) or 'upload.bin'
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        file_path = os.path.join(self.directory, filename)
+        # Part file is unique to this upload, in case BMC sends the same file again while it is being received
+        part_path = "%s.%s.part" % (file_path, uuid.uuid4().hex[:8])
+        try:
+            with open(part_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(part_path, file_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        with self._files_lock:
+            if file_path not in self._files:
+                self._files.append(file_path)
+        self._received.set()
+        return file_path
+
+
+class _MultipartReader(object):
+    """Read parts of multipart/form-data body chunk by chunk, without holding whole body"""
+
+    def __init__(self, chunks, boundary):
+        self._chunks = iter(chunks)
+        self._delimiter = b'\r\n--' + boundary.encode('ascii')
+        # Body starts with delimiter without leading CRLF
+        self._buffer = b'\r\n'
+        self._eof = False
+
+    def _fill(self):
+        if self._eof:
+            return False
+        try:
+            self._buffer += next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            return False
+        return True
+
+    def _skip_to_delimiter(self):
+        while True:
+            index = self._buffer.find(self._delimiter)
+            if index >= 0:
+                self._buffer = self._buffer[index + len(self._delimiter):]
+                return True
+            self._buffer = self._buffer[-len(self._delimiter):]
+            if not self._fill():
+                return False
+
+    def _iter_data(self):
+        keep = len(self._delimiter) - 1
+        while True:
+            index = self._buffer.find(self._delimiter)
+            if index >= 0:
+                data = self._buffer[:index]
+                self._buffer = self._buffer[index + len(self._delimiter):]
+                if data:
+                    yield data
+                return
+            if len(self._buffer) > keep:
+                data = self._buffer[:-keep]
+                self._buffer = self._buffer[-keep:]
+                yield data
+            if not self._fill():
+                raise Exception("Multipart body is truncated.")
+
+    def parts(self):
+        """Yield Tuple of (headers, data chunks) for each part. Data must be read before next part."""
+        if not self._skip_to_delimiter():
+            return
+        while True:
+            while len(self._buffer) < 2 and self._fill():
+                pass
+            if self._buffer.startswith(b'--'):
+                return
+            while b'\r\n\r\n' not in self._buffer:
+                if len(self._buffer) > RECEIVE_CHUNK_SIZE or not self._fill():
+                    raise Exception("Header of part is not valid.")
+            header_data, self._buffer = self._buffer.split(b'\r\n\r\n', 1)
+            headers = {}
+            for line in header_data.decode('utf-8', 'replace').split('\r\n'):
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+            data = self._iter_data()
+            yield headers, data
+            # Skip data not read by caller
+            for chunk in data:
+                pass
+
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        LOGGER.debug("Upload receiver: %s - %s" % (self.client_address[0], format % args))
+
+    def _iter_body(self):
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    # Skip trailers
+                    while self.rfile.readline() not in [b'\r\n', b'\n', b'']:
+                        pass
+                    return
+                remaining = size
+                while remaining > 0:
+                    data = self.rfile.read(min(RECEIVE_CHUNK_SIZE, remaining))
+                    if not data:
+                        raise Exception("Connection is closed before body is received.")
+                    remaining -= len(data)
+                    yield data
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get('Content-Length', 0))
+            while remaining > 0:
+                data = self.rfile.read(min(RECEIVE_CHUNK_SIZE, remaining))
+                if not data:
+                    raise Exception("Connection is closed before body is received.")
+                remaining -= len(data)
+                yield data
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _receive(self):
+        path = unquote(urlparse(self.path).path)
+        slot = self.server.receiver._find_slot(path)
+        if slot is None:
+            self.close_connection = True
+            self._reply(404)
+            return
+        if slot.bmc_ip != self.client_address[0]:
+            LOGGER.info("File for %s is uploaded from %s." % (slot.bmc_ip, self.client_address[0]))
+        try:
+            content_type = self.headers.get('Content-Type', '')
+            if content_type.lower().startswith('multipart/form-data') and 'boundary=' in content_type:
+                boundary = content_type.split('boundary=', 1)[1].split(';')[0].strip().strip('"')
+                for headers, data in _MultipartReader(self._iter_body(), boundary).parts():
+                    match = re.search(r'filename="?([^";]*)"?', headers.get('content-disposition', ''))
+                    if match is None:
+                        continue
+                    file_path = slot._save(match.group(1), data)
+                    LOGGER.info("File %s is received from %s." % (file_path, slot.bmc_ip))
+            else:
+                filename = path.rstrip('/')[len(slot.folder) + 1:].strip('/')
+                file_path = slot._save(filename, self._iter_body())
+                LOGGER.info("File %s is received from %s." % (file_path, slot.bmc_ip))
+            self._reply(201)
+        except Exception as e:
+            LOGGER.debug("%s" % traceback.format_exc())
+            LOGGER.error("Failed to receive file from %s. Error message: %s" % (self.client_address[0], repr(e)))
+            self.close_connection = True
+            self._reply(500)
+
+    def do_PUT(self):
+        self._receive()
+
+    def do_POST(self):
+        self._receive()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class UploadReceiver(object):
+    """HTTP server run in this process, receiving files uploaded by BMCs like TSM FFDC data
+    and bmc configuration backup, instead of a separately managed web server.
+    Each upload is served by its own thread and streamed to disk, files are saved under
+    directory/<bmc ip>/<operation id>/, so operations run at the same time on one BMC do not
+    overwrite each other's files. Only folders registered for an operation accept uploads.
+
+    Example:
+        with UploadReceiver('/var/ffdc', port=8080) as receiver:
+            client.set_upload_receiver(receiver)
+            client.lenovo_export_ffdc()
+    """
+
+    def __init__(self, directory, port=8080, host='', advertise_ip=None):
+        """Initialize UploadReceiver
+        :param directory: directory to save files received
+        :type directory: str
+        :param port: port to listen
+        :type port: int
+        :param host: address to listen, empty means all addresses
+        :type host: str
+        :param advertise_ip: ip given to BMCs to upload files. Default is the local address used to reach each BMC.
+        :type advertise_ip: str
+        """
+        self._directory = directory
+        self._port = port
+        self._host = host
+        self._advertise_ip = advertise_ip
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def start(self):
+        with self._lock:
+            if self._server is not None:
+                return
+            self._server = _ThreadingHTTPServer((self._host, self._port), _UploadHandler)
+            self._server.receiver = self
+            # Port 0 means any free port
+            self._port = self._server.server_address[1]
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        with self._lock:
+            server = self._server
+            self._server = None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    def get_port(self):
+        return self._port
+
+    def get_address(self, bmc_ip):
+        """Get ip of this receiver which BMC can reach"""
+        if self._advertise_ip:
+            return self._advertise_ip
+        if self._host:
+            return self._host
+        return get_local_address(bmc_ip)
+
+    def register(self, bmc_ip):
+        """Register folder where BMC uploads files for one operation
+        :param bmc_ip: ip of BMC
+        :type bmc_ip: str
+        :returns: returns UploadSlot, its folder is the path to give BMC
+        """
+        self.start()
+        slot_id = uuid.uuid4().hex
+        folder = 'upload/' + slot_id
+        # Each operation has its own directory, like FFDC and config backup of one BMC run at the same time
+        directory = os.path.join(self._directory, re.sub(r'[^A-Za-z0-9_.-]', '_', bmc_ip), slot_id)
+        slot = UploadSlot(self, bmc_ip, folder, directory)
+        with self._lock:
+            self._slots[folder] = slot
+        return slot
+
+    def unregister(self, slot):
+        """Stop accepting uploads into folder of slot"""
+        with self._lock:
+            self._slots.pop(slot.folder, None)
+
+    def _find_slot(self, path):
+        parts = path.strip('/').split('/')
+        with self._lock:
+            return self._slots.get('/'.join(parts[:2]))
@@ -24,6 +24,17 @@ import sys, os
 import argparse
 import configparser
 import logging
+import json
+import threading
+import socket
+import time
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
 
 def client_logger(file_name, log_format, log_level=logging.ERROR):
     formatter = logging.Formatter(log_format)
@@ -130,12 +141,159 @@ def read_config(config_file):
         fileserver_cfg_list = cfg.items(section='FileServerCfg')
         for item in fileserver_cfg_list:
             config_ini_info[item[0]] = item[1]
+        # Optional section, config files of old versions do not have it
+        if cfg.has_section('ThrottleCfg'):
+            for item in cfg.items(section='ThrottleCfg'):
+                config_ini_info[item[0]] = item[1]
         result = {'ret': True, 'entries': config_ini_info}
     except Exception as e:
         result = {'ret': False, 'msg': "Failed to parse configuration file %s, Error is %s ." % (config_file, repr(e))}
         LOGGER.error("Error: in parsing file %s, found exception: %s" %(config_file, str(e)))
     return result
 
+def configure_logger(config_file):
+    """Set level and file of LOGGER from LogCfg section of configuration file
+    :config_file: Configuration file
+    :type config_file: string
+    :returns: returns Dict of 'ret' and 'msg'
+    """
+    levels = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+    cfg = configparser.ConfigParser()
+    try:
+        if os.sep not in config_file:
+            config_file = os.path.dirname(os.path.abspath(__file__)) + os.sep + config_file
+        cfg.read(config_file)
+        if not cfg.has_section('LogCfg'):
+            return {'ret': True, 'msg': "No LogCfg in %s." % config_file}
+        log_level = cfg.get('LogCfg', 'LogLevel', fallback='').strip().lower()
+        log_name = cfg.get('LogCfg', 'LogName', fallback='').strip() or LOGFILE
+        log_dir = cfg.get('LogCfg', 'LogDir', fallback='').strip()
+        if log_level != '' and log_level not in levels:
+            return {'ret': False, 'msg': "Invalid LogLevel %s, should be one of %s." % (log_level, list(levels.keys()))}
+        if log_level != '':
+            LOGGER.setLevel(levels[log_level])
+        log_file = os.path.abspath(os.path.join(log_dir, log_name))
+        for handler in list(LOGGER.handlers):
+            if isinstance(handler, logging.FileHandler) and handler.baseFilename != log_file:
+                LOGGER.removeHandler(handler)
+                handler.close()
+                new_handler = logging.FileHandler(log_file)
+                new_handler.setFormatter(logging.Formatter(LOGFORMAT))
+                LOGGER.addHandler(new_handler)
+        return {'ret': True, 'msg': "Log level %s, log file %s." % (logging.getLevelName(LOGGER.level), log_file)}
+    except Exception as e:
+        return {'ret': False, 'msg': "Failed to set logger from configuration file %s, Error is %s ." % (config_file, repr(e))}
+
+def print_progress(msg):
+    """Show progress of long operations to user on stderr, stdout only carries results like json lines of --targets
+    :msg: progress message
+    :type msg: string
+    """
+    LOGGER.info(msg)
+    print(msg, file=sys.stderr)
+    sys.stderr.flush()
+
+# Serialize read-modify-write of json cache files shared by clients in one process.
+json_file_lock = threading.RLock()
+
+def load_json_file(file_name):
+    """Load json data saved by save_json_file
+    :file_name: json file name
+    :type file_name: string
+    :returns: returns Dict of data, empty if file does not exist or is broken
+    """
+    with json_file_lock:
+        if not os.path.exists(file_name):
+            return {}
+        try:
+            with open(file_name, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            LOGGER.error("Failed to load file %s, found exception: %s" % (file_name, repr(e)))
+            return {}
+
+@contextmanager
+def lock_json_file(file_name):
+    """Lock json file for read-modify-write, against threads of this process and other processes
+    sharing the file, like command line scripts polling different BMCs with one cache file.
+    Lock is taken on file_name.lock, it is left in place for the next user.
+    :file_name: json file name
+    :type file_name: string
+    """
+    with json_file_lock:
+        with open(file_name + '.lock', 'a+') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.05)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def save_json_file(file_name, data, mode=None):
+    """Save json data into file. File is replaced atomically, readers never see partial content.
+    :file_name: json file name
+    :type file_name: string
+    :data: data to save
+    :type data: dict
+    :mode: permission bits the file is created with, like 0o600. None means the default of umask.
+    :type mode: int
+    """
+    with json_file_lock:
+        tmp_file = "%s.%s.tmp" % (file_name, os.getpid())
+        if mode is None:
+            f = open(tmp_file, 'w')
+        else:
+            # Created with its permission, it is never readable by others even for a moment.
+            # Temporary file left by a crashed run may have other permission, create it again.
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            f = os.fdopen(os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode), 'w')
+        with f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, file_name)
+
+def get_local_address(remote_ip):
+    """Get local ip used to reach remote ip, like the address BMC uses to reach servers run in this process
+    :remote_ip: ip of remote host
+    :type remote_ip: string
+    :returns: returns String of local ip
+    """
+    family = socket.AF_INET6 if ':' in remote_ip else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        # No packet is sent, only route to remote host is looked up
+        sock.connect((remote_ip.strip('[]'), 9))
+        return sock.getsockname()[0]
+    finally:
+        sock.close()
+
+def format_host(address, port=None):
+    """Get host part of url, IPv6 address is put in brackets
+    :address: ip or host name
+    :type address: string
+    :port: port, None means no port
+    :type port: int
+    :returns: returns String like '10.0.0.1:8081' or '[fd00::1]:8081'
+    """
+    if ':' in address and not address.startswith('['):
+        address = '[%s]' % address
+    if port is None:
+        return address
+    return '%s:%s' % (address, port)
+
 def add_common_parameter(argget):
     argget.add_argument('-i', '--ip', type=str, help=('BMC IP address'))
     argget.add_argument('-u', '--user', type=str, help='BMC user name')
@@ -0,0 +1,211 @@
+import asyncio
+import threading
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from lenovo_redfish_library.redfish_base import RedfishBase, get_expand_query
+from lenovo_redfish_library.async_redfish_base import AsyncRedfishBase
+
+COLLECTION = '/redfish/v1/Systems/1/LogServices/SEL/Entries'
+
+
+class FakeCollection(object):
+    """Collection service answering _get_url of client"""
+
+    def __init__(self, count, page_size=None, top_skip=False, expand=False, reject_expand=False,
+                 ignore_skip=False, loop_next_link=False):
+        self.members = [{'@odata.id': '%s/%s' % (COLLECTION, index), 'Id': str(index)} for index in range(count)]
+        self.page_size = page_size
+        self.top_skip = top_skip
+        self.expand = expand
+        self.reject_expand = reject_expand
+        self.ignore_skip = ignore_skip
+        self.loop_next_link = loop_next_link
+        self.requests = []
+
+    def get_url(self, url):
+        self.requests.append(url)
+        parsed = urlparse(url)
+        path = parsed.path.rstrip('/')
+        query = {name: values[0] for name, values in parse_qs(parsed.query).items()}
+        if path != COLLECTION:
+            index = int(path.rsplit('/', 1)[1])
+            return {'ret': True, 'entries': dict(self.members[index])}
+        if '$expand' in query and self.reject_expand:
+            return {'ret': False, 'msg': 'Error code is 400.'}
+        start = 0 if self.ignore_skip else int(query.get('$skip', 0))
+        size = self.page_size or len(self.members)
+        if self.top_skip and '$top' in query:
+            size = int(query['$top'])
+        page = self.members[start:start + size]
+        if '$expand' not in query:
+            page = [{'@odata.id': member['@odata.id']} for member in page]
+        entries = {'Members': page, 'Members@odata.count': len(self.members)}
+        if self.loop_next_link:
+            entries['Members@odata.nextLink'] = COLLECTION
+        elif not (self.top_skip and '$top' in query) and start + size < len(self.members):
+            entries['Members@odata.nextLink'] = '%s?$skip=%s' % (COLLECTION, start + size)
+        return {'ret': True, 'entries': entries}
+
+    def collection_requests(self):
+        return [url for url in self.requests if urlparse(url).path.rstrip('/') == COLLECTION]
+
+
+def make_client(service):
+    client = RedfishBase.__new__(RedfishBase)
+    features = {'TopSkipQuery': service.top_skip}
+    if service.expand or service.reject_expand:
+        features['ExpandQuery'] = {'ExpandAll': True, 'Levels': True}
+    client._protocol_features = features
+    client._expand_query = None
+    client._expand_rejected = set()
+    client._max_workers = 1
+    client._member_slots = threading.BoundedSemaphore(1)
+    client._counter_lock = threading.Lock()
+    client._round_trips_saved = 0
+    client._get_url = service.get_url
+    return client
+
+
+def ids(members):
+    return [member['Id'] for member in members]
+
+
+def test_follows_next_link():
+    service = FakeCollection(7, page_size=3)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION)) == [str(index) for index in range(7)]
+    assert len(service.collection_requests()) == 3
+
+
+def test_top_skip_pages():
+    service = FakeCollection(7, top_skip=True)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION, page_size=3)) == [str(index) for index in range(7)]
+    assert service.collection_requests() == ['%s?$top=3&$skip=%s' % (COLLECTION, skip) for skip in [0, 3, 6]]
+
+
+def test_top_skip_stops_at_count():
+    service = FakeCollection(6, top_skip=True)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION, page_size=3)) == [str(index) for index in range(6)]
+    assert len(service.collection_requests()) == 2
+
+
+def test_skip_by_service():
+    service = FakeCollection(7, top_skip=True)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION, page_size=3, skip=2)) == [str(index) for index in range(2, 7)]
+    assert service.collection_requests()[0] == COLLECTION + '?$top=3&$skip=2'
+    service.requests = []
+    assert ids(client.iter_collection(COLLECTION, skip=5)) == ['5', '6']
+    assert service.collection_requests() == [COLLECTION + '?$skip=5']
+
+
+@pytest.mark.parametrize('skip', [0, 2, 3, 4, 7, 9])
+def test_skip_without_top_skip_support(skip):
+    service = FakeCollection(7, page_size=3)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION, page_size=3, skip=skip)) == [str(index) for index in range(skip, 7)]
+    # $skip is only sent on nextLink given by the service
+    assert service.collection_requests()[0] == COLLECTION
+    # Members skipped are not read one by one
+    assert len(service.requests) - len(service.collection_requests()) == max(0, 7 - skip)
+
+
+def test_stops_when_service_ignores_skip():
+    service = FakeCollection(6, top_skip=True, ignore_skip=True)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION, page_size=3)) == ['0', '1', '2']
+    assert len(service.collection_requests()) == 2
+
+
+def test_stops_when_next_link_repeats_page():
+    service = FakeCollection(3, loop_next_link=True)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION)) == ['0', '1', '2']
+    assert len(service.collection_requests()) == 2
+
+
+def test_expanded_members_are_not_read_again():
+    service = FakeCollection(5, page_size=2, expand=True)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION)) == [str(index) for index in range(5)]
+    assert service.requests == service.collection_requests()
+    assert all('$expand=*($levels=1)' in url for url in service.requests)
+    assert client.get_round_trips_saved() == 5
+
+
+def test_expand_rejected_falls_back_to_members():
+    service = FakeCollection(4, page_size=2, reject_expand=True)
+    client = make_client(service)
+    assert ids(client.iter_collection(COLLECTION)) == [str(index) for index in range(4)]
+    # Members are read one by one after $expand is rejected
+    assert len(service.requests) - len(service.collection_requests()) == 4
+    assert client.get_round_trips_saved() == 0
+
+
+def test_expand_rejection_is_remembered_per_collection():
+    service = FakeCollection(2, reject_expand=True)
+    client = make_client(service)
+    for _ in range(3):
+        assert ids(client.iter_collection(COLLECTION + '/')) == ['0', '1']
+    assert len([url for url in service.collection_requests() if '$expand' in url]) == 1
+    # Other collections are still asked with $expand
+    other = []
+    client._get_url = lambda url: other.append(url) or {'ret': True, 'entries': {'Members': []}}
+    assert list(client.iter_collection('/redfish/v1/Chassis')) == []
+    assert other == ['/redfish/v1/Chassis?$expand=*($levels=1)']
+
+
+@pytest.mark.parametrize('expand, query', [
+    ({'NoLinks': True, 'ExpandAll': True, 'Levels': True}, '$expand=.($levels=1)'),
+    ({'NoLinks': True}, '$expand=.'),
+    ({'ExpandAll': True, 'Levels': True}, '$expand=*($levels=1)'),
+    ({'ExpandAll': True}, '$expand=*'),
+    ({'Levels': True}, ''),
+    (None, ''),
+])
+def test_expand_query(expand, query):
+    features = {'ExpandQuery': expand} if expand is not None else {}
+    assert get_expand_query(features) == query
+
+
+def test_async_collection_uses_same_expand_and_remembers_rejection():
+    service = FakeCollection(3, page_size=2, reject_expand=True)
+    client = AsyncRedfishBase.__new__(AsyncRedfishBase)
+    client._protocol_features = {'ExpandQuery': {'ExpandAll': True, 'Levels': True}}
+    client._expand_query = None
+    client._expand_rejected = set()
+
+    async def get_url(url):
+        return service.get_url(url)
+
+    client._get_url = get_url
+
+    async def read_twice():
+        return [await client._get_collection(COLLECTION) for _ in range(2)]
+
+    for result in asyncio.run(read_twice()):
+        assert result['ret'] is True
+        assert ids(result['entries']) == ['0', '1', '2']
+    assert [url for url in service.collection_requests() if '$expand' in url] == [COLLECTION + '?$expand=*($levels=1)']
+
+
+def test_stop_iterating_stops_paging():
+    service = FakeCollection(9, page_size=3)
+    client = make_client(service)
+    members = client.iter_collection(COLLECTION)
+    assert [next(members)['Id'] for _ in range(2)] == ['0', '1']
+    members.close()
+    assert len(service.collection_requests()) == 1
+
+
+def test_get_collection_reports_failure():
+    service = FakeCollection(2)
+    client = make_client(service)
+    client._get_url = lambda url: {'ret': False, 'msg': 'Error code is 500.'}
+    result = client._get_collection(COLLECTION)
+    assert result['ret'] is False
+    assert 'Error code is 500.' in result['msg']
@@ -0,0 +1,99 @@
+import pytest
+
+from lenovo_redfish_library.manager_client import ManagerClient
+
+
+class FakeLog(object):
+    """One log service of bmc, entries kept oldest first"""
+
+    def __init__(self, newest_first):
+        self.newest_first = newest_first
+        self.entries = []
+
+    def add(self, id, created):
+        self.entries.append({'Id': id, 'Created': created})
+
+    def members(self):
+        return list(reversed(self.entries)) if self.newest_first else list(self.entries)
+
+
+def make_client(log, features=None):
+    client = ManagerClient.__new__(ManagerClient)
+    client._ip = '10.0.0.1'
+    client._get_log_services = lambda type: {'ret': True, 'entries': [{'Id': type, 'Entries': {'@odata.id': '/log/Entries'}}]}
+    client._get_protocol_features = lambda: features or {}
+
+    def iter_collection(url, page_size=None, skip=0):
+        members = log.members()
+        if '$filter' in url:
+            created = url.split("'")[1]
+            members = [entry for entry in members if entry['Created'] >= created]
+        return iter(members[skip:])
+
+    client.iter_collection = iter_collection
+    return client
+
+
+def poll(client, cursor_file):
+    result = client.get_new_event_log('manager', str(cursor_file))
+    assert result['ret'] is True, result
+    return sorted(entry['Id'] for entry in result['entries'][0]['Entries'])
+
+
+@pytest.mark.parametrize('newest_first', [True, False])
+@pytest.mark.parametrize('first_count', [0, 1])
+@pytest.mark.parametrize('features', [{}, {'FilterQuery': True}, {'TopSkipQuery': True}])
+def test_new_entries_after_empty_or_single_entry_first_poll(tmp_path, newest_first, first_count, features):
+    log = FakeLog(newest_first)
+    for index in range(first_count):
+        log.add('e%d' % index, '2020-01-01T00:00:0%d' % index)
+    client = make_client(log, features)
+    cursor_file = tmp_path / 'cursor.json'
+
+    assert poll(client, cursor_file) == ['e%d' % index for index in range(first_count)]
+    assert poll(client, cursor_file) == []
+
+    log.add('n1', '2020-01-02T00:00:00')
+    assert poll(client, cursor_file) == ['n1']
+    log.add('n2', '2020-01-03T00:00:00')
+    log.add('n3', '2020-01-04T00:00:00')
+    assert poll(client, cursor_file) == ['n2', 'n3']
+    assert poll(client, cursor_file) == []
+    log.add('n4', '2020-01-05T00:00:00')
+    assert poll(client, cursor_file) == ['n4']
+
+
+@pytest.mark.parametrize('newest_first', [True, False])
+def test_order_detected_from_entry_seen_when_created_is_same(tmp_path, newest_first):
+    log = FakeLog(newest_first)
+    log.add('a', '2020-01-01T00:00:00')
+    client = make_client(log)
+    cursor_file = tmp_path / 'cursor.json'
+    assert poll(client, cursor_file) == ['a']
+    log.add('b', '2020-01-01T00:00:00')
+    assert poll(client, cursor_file) == ['b']
+    log.add('c', '2020-01-02T00:00:00')
+    assert poll(client, cursor_file) == ['c']
+
+
+def test_detect_log_order():
+    assert ManagerClient._detect_log_order([]) is None
+    assert ManagerClient._detect_log_order([{'Id': '1', 'Created': 'a'}]) is None
+    assert ManagerClient._detect_log_order([{'Id': '2', 'Created': 'b'}, {'Id': '1', 'Created': 'a'}]) is True
+    assert ManagerClient._detect_log_order([{'Id': '1', 'Created': 'a'}, {'Id': '2', 'Created': 'b'}]) is False
+    same = [{'Id': '1', 'Created': 'a'}, {'Id': '2', 'Created': 'a'}]
+    assert ManagerClient._detect_log_order(same) is None
+    assert ManagerClient._detect_log_order(same, '1') is False
+    assert ManagerClient._detect_log_order(same, '2') is True
+
+
+def test_cursors_of_other_log_types_are_kept(tmp_path):
+    log = FakeLog(True)
+    log.add('a', '2020-01-01T00:00:00')
+    client = make_client(log)
+    client._get_log_services = lambda type: {'ret': True, 'entries': [{'Id': type, 'Entries': {'@odata.id': '/%s/Entries' % type}}]}
+    cursor_file = str(tmp_path / 'cursor.json')
+    client.get_new_event_log('system', cursor_file)
+    client.get_new_event_log('manager', cursor_file)
+    result = client.get_new_event_log('system', cursor_file)
+    assert result['entries'][0]['Entries'] == []
@@ -0,0 +1,144 @@
+import os
+import hashlib
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+import pytest
+
+from lenovo_redfish_library import file_download
+from lenovo_redfish_library.file_download import download_file
+
+DATA = os.urandom(300 * 1024)
+
+
+class FileServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), FileHandler)
+        self.support_range = True
+        # Connection is dropped after this many bytes, only for the first responses
+        self.drop_after = None
+        self.drops = 0
+        self.ranges = []
+        self.lock = threading.Lock()
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        start, end = 0, len(DATA) - 1
+        requested = self.headers.get('Range')
+        with server.lock:
+            server.ranges.append(requested)
+        if requested and server.support_range:
+            first, last = requested.split('=')[1].split('-')
+            start = int(first)
+            end = int(last) if last else end
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %s-%s/%s' % (start, end, len(DATA)))
+        else:
+            self.send_response(200)
+        body = DATA[start:end + 1]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        with server.lock:
+            drop = server.drop_after is not None and server.drops < 2 and len(body) > server.drop_after
+            if drop:
+                server.drops += 1
+        if drop:
+            self.wfile.write(body[:server.drop_after])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(file_download, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(file_download, 'MIN_RANGE_SIZE', 64 * 1024)
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server):
+    return 'http://127.0.0.1:%s/ffdc.tgz' % server.server_address[1]
+
+
+def check_file(result, file_path):
+    assert result['ret'] is True, result
+    with open(file_path, 'rb') as f:
+        assert f.read() == DATA
+    assert result['entries']['Sha256'] == hashlib.sha256(DATA).hexdigest()
+    assert not os.path.exists(file_path + '.part')
+
+
+def test_download_one_stream(server, tmp_path):
+    file_path = str(tmp_path / 'ffdc.tgz')
+    result = download_file(url(server), file_path, chunk_size=4096, sha256=hashlib.sha256(DATA).hexdigest())
+    check_file(result, file_path)
+    assert server.ranges == [None]
+
+
+def test_download_resumes_dropped_connection(server, tmp_path):
+    server.drop_after = 100 * 1024
+    file_path = str(tmp_path / 'ffdc.tgz')
+    result = download_file(url(server), file_path, chunk_size=4096)
+    check_file(result, file_path)
+    assert server.ranges == [None, 'bytes=%s-' % (100 * 1024), 'bytes=%s-' % (200 * 1024)]
+
+
+def test_download_restarts_when_range_is_ignored(server, tmp_path):
+    server.drop_after = 100 * 1024
+    server.support_range = False
+    file_path = str(tmp_path / 'ffdc.tgz')
+    result = download_file(url(server), file_path, chunk_size=4096)
+    check_file(result, file_path)
+    assert server.ranges == [None, 'bytes=%s-' % (100 * 1024), 'bytes=%s-' % (100 * 1024)]
+
+
+def test_download_by_ranges(server, tmp_path):
+    file_path = str(tmp_path / 'ffdc.tgz')
+    result = download_file(url(server), file_path, chunk_size=4096, workers=4)
+    check_file(result, file_path)
+    assert server.ranges[0] == 'bytes=0-0'
+    assert sorted(server.ranges[1:]) == sorted(['bytes=0-76799', 'bytes=76800-153599', 'bytes=153600-230399', 'bytes=230400-307199'])
+
+
+def test_download_by_ranges_falls_back_to_one_stream(server, tmp_path, monkeypatch):
+    # Range of size probe is answered, ranges of workers are not
+    monkeypatch.setattr(file_download, '_get_range_size', lambda *args: len(DATA))
+    server.support_range = False
+    file_path = str(tmp_path / 'ffdc.tgz')
+    result = download_file(url(server), file_path, chunk_size=4096, workers=4)
+    check_file(result, file_path)
+    assert server.ranges[-1] is None
+
+
+def test_download_fails_on_size_mismatch(server, tmp_path):
+    file_path = str(tmp_path / 'ffdc.tgz')
+    result = download_file(url(server), file_path, expected_size=len(DATA) + 1)
+    assert result['ret'] is False
+    assert 'is expected' in result['msg']
+    assert not os.path.exists(file_path)
+    assert not os.path.exists(file_path + '.part')
+
+
+def test_download_fails_after_retries(server, tmp_path):
+    server.drop_after = 1024
+    file_path = str(tmp_path / 'ffdc.tgz')
+    result = download_file(url(server), file_path, retries=1)
+    assert result['ret'] is False
+    assert not os.path.exists(file_path + '.part')
+    assert len(server.ranges) == 2
@@ -0,0 +1,79 @@
+import pytest
+
+from lenovo_redfish_library.update_client import UpdateClient, read_image_version, _same_version
+
+
+def make_client(inventory):
+    client = UpdateClient.__new__(UpdateClient)
+    client.get_firmware_inventory = lambda: {'ret': True, 'entries': inventory}
+    return client
+
+
+def check(client, image, target=None):
+    result = client._check_firmware_current(image, image, target)
+    assert result['ret'] is True, result
+    return result['entries']
+
+
+def test_read_image_version_from_package_name():
+    assert read_image_version('/fw/lnvgy_fw_xcc_cdi3a4o-8.41_anyos_noarch.uxz') == \
+        {'Component': 'xcc', 'BuildId': 'CDI3A4O', 'Version': '8.41'}
+    assert read_image_version('image.bin') is None
+
+
+def test_read_image_version_from_hpm_header(tmp_path):
+    header = bytearray(32)
+    header[:8] = b'PICMGFWU'
+    header[26] = 0x81
+    header[27] = 0x13
+    image = tmp_path / 'bmc.hpm'
+    image.write_bytes(bytes(header) + b'\0' * 100)
+    assert read_image_version(str(image)) == {'Component': '', 'BuildId': '', 'Version': '1.13'}
+
+
+def test_same_version():
+    assert _same_version('8.41', '08.41')
+    assert _same_version('2.90', '2.90.')
+    assert not _same_version('2.90', '2.9')
+    assert not _same_version('8.41', '8.40')
+
+
+LXPM_IMAGE = 'lnvgy_fw_lxpm_pdl142k-2.10_anyos_noarch.uxz'
+UEFI_IMAGE = 'lnvgy_fw_uefi_ive166m-2.90_anyos_32-64.uxz'
+
+
+@pytest.mark.parametrize('image,inventory,expected_id', [
+    # Drivers of LXPM have the same version, LXPM itself is older
+    (LXPM_IMAGE, [{'Id': 'LXPM', 'Version': 'PDL140K-2.00'},
+                  {'Id': 'LXPMLinuxDriver', 'Version': 'PDL142K-2.10'},
+                  {'Id': 'LXPMWindowsDriver', 'Version': 'PDL142K-2.10'}], 'LXPM'),
+    # Backup bank already has the image version, primary UEFI does not
+    (UEFI_IMAGE, [{'Id': 'UEFI-Backup', 'Version': 'IVE166M-2.90'},
+                  {'Id': 'UEFI', 'Version': 'IVE164M-2.80'}], 'UEFI'),
+])
+def test_sibling_component_with_same_version_is_not_current(image, inventory, expected_id):
+    entries = check(make_client(inventory), image)
+    assert entries['Current'] is False
+    assert entries['Id'] == expected_id
+
+
+def test_component_with_same_version_is_current():
+    inventory = [{'Id': 'UEFI-Backup', 'Version': 'IVE164M-2.80'}, {'Id': 'UEFI', 'Version': 'IVE166M-2.90'}]
+    entries = check(make_client(inventory), UEFI_IMAGE)
+    assert entries['Current'] is True
+    assert entries['Id'] == 'UEFI'
+
+
+def test_tsm_target_is_prefix_of_inventory_id(tmp_path):
+    header = bytearray(32)
+    header[:8] = b'PICMGFWU'
+    header[26] = 0x01
+    header[27] = 0x13
+    image = tmp_path / 'bmc.hpm'
+    image.write_bytes(bytes(header))
+    client = make_client([{'Id': 'BMC-FW', 'Version': '1.13'}, {'Id': 'UEFI-FW', 'Version': '1.00'}])
+    result = client._check_firmware_current('bmc.hpm', str(image), 'BMC')
+    assert result['entries']['Current'] is True
+    assert result['entries']['Id'] == 'BMC-FW'
+    result = client._check_firmware_current('bmc.hpm', str(image), 'UEFI')
+    assert result['entries']['Current'] is False
@@ -0,0 +1,30 @@
+import sys
+import importlib
+
+import pytest
+
+from lenovo_redfish_library.fleet import FleetExecutor, is_read_only
+
+# Package exports main function under the same name as the module
+main_module = importlib.import_module('lenovo_redfish_library.main')
+
+
+def test_is_read_only():
+    assert is_read_only('get_cpu_inventory')
+    assert not is_read_only('set_bios_attribute')
+    assert not is_read_only(None)
+    assert not is_read_only('')
+
+
+def test_fleet_without_subcommand_is_rejected(monkeypatch, tmp_path, capsys):
+    targets = tmp_path / 'targets.csv'
+    targets.write_text('10.0.0.1,USERID,PASSW0RD,session\n')
+    jobs = []
+    monkeypatch.setattr(FleetExecutor, 'run_jobs', lambda *args: jobs.append(args))
+    argv = ['lenovo_redfish_client', '--targets', str(targets)]
+    monkeypatch.setattr(sys, 'argv', argv)
+    with pytest.raises(SystemExit) as error:
+        main_module.main(argv)
+    assert error.value.code == 1
+    assert 'Please specify correct subcommand.' in capsys.readouterr().out
+    assert jobs == []
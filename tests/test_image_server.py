@@ -0,0 +1,146 @@
+import os
+
+import pytest
+import requests
+
+from lenovo_redfish_library.utils import format_host
+from lenovo_redfish_library.image_server import ImageServer
+from lenovo_redfish_library.update_client import UpdateClient
+from lenovo_redfish_library.manager_client import ManagerClient
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / 'lnvgy_fw_uefi.uxz'
+    path.write_bytes(b'image' * 1000)
+    return path
+
+
+@pytest.fixture
+def server():
+    server = ImageServer(port=0, host='127.0.0.1')
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_format_host():
+    assert format_host('10.0.0.1', 8081) == '10.0.0.1:8081'
+    assert format_host('fd00::1', 8081) == '[fd00::1]:8081'
+    assert format_host('[fd00::1]', 8081) == '[fd00::1]:8081'
+    assert format_host('fd00::1') == '[fd00::1]'
+    assert format_host('bmc.example.com') == 'bmc.example.com'
+
+
+def test_url_of_ipv6_address(image):
+    server = ImageServer(port=8081, advertise_ip='fd00::1')
+    server.start = lambda: None
+    url = server.get_url('fd00::2', str(image))
+    assert url.startswith('http://[fd00::1]:8081/images/')
+    assert url.endswith('/lnvgy_fw_uefi.uxz')
+
+
+def test_served_until_unpublished_by_all(server, image):
+    url = server.get_url('127.0.0.1', str(image))
+    server.publish(str(image))
+    assert requests.get(url).content == image.read_bytes()
+    server.unpublish(str(image))
+    assert requests.get(url, headers={'Range': 'bytes=0-4'}).content == b'image'
+    server.unpublish(str(image))
+    assert requests.get(url).status_code == 404
+    # Unpublished more times than published
+    server.unpublish(str(image))
+    assert server.get_url('127.0.0.1', str(image)) == url
+    assert requests.get(url).status_code == 200
+
+
+class FakeImageServer(object):
+    def __init__(self):
+        self.published = []
+
+    def publish(self, file_path):
+        self.published.append(file_path)
+        return 'images/0123456789abcdef'
+
+    def unpublish(self, file_path):
+        self.published.remove(file_path)
+
+    def get_address(self, bmc_ip):
+        return 'fd00::1'
+
+    def get_port(self):
+        return 8081
+
+    def get_host(self, bmc_ip):
+        return format_host(self.get_address(bmc_ip), self.get_port())
+
+
+class Response(object):
+    def __init__(self, status, entries=None):
+        self.status = status
+        self.dict = entries or {}
+        self.text = ''
+
+
+def make_update_client(image_server, response):
+    client = UpdateClient.__new__(UpdateClient)
+    client._image_server = image_server
+    client._get_update_service_uris = lambda: {'ret': True, 'entries': {'SimpleUpdate': '/redfish/v1/UpdateService/Actions/UpdateService.SimpleUpdate'}}
+    client._get_bmc_type = lambda: 'XCC'
+    client._ip = 'fd00::2'
+    client.posted = []
+    client.post = lambda url, body=None: client.posted.append(body) or response
+    return client
+
+
+def test_update_image_is_unpublished_when_task_is_done(image):
+    image_server = FakeImageServer()
+    client = make_update_client(image_server, Response(202, {'@odata.id': '/redfish/v1/TaskService/Tasks/1'}))
+    handle = client._start_update_firmware(image.name, fsprotocol='HTTP', fsdir=str(image.parent))
+    assert client.posted[0]['ImageURI'] == '[fd00::1]:8081/images/0123456789abcdef/' + image.name
+    assert image_server.published == [str(image)]
+    handle._set_result({'ret': False, 'msg': 'Task failed.'})
+    assert image_server.published == []
+
+
+def test_update_image_is_unpublished_when_update_is_not_started(image):
+    image_server = FakeImageServer()
+    client = make_update_client(image_server, Response(400))
+    result = client._start_update_firmware(image.name, fsprotocol='HTTP', fsdir=str(image.parent))
+    assert result['ret'] is False
+    assert image_server.published == []
+
+
+def make_manager_client(image_server, response):
+    client = ManagerClient.__new__(ManagerClient)
+    client._image_server = image_server
+    client._published_media = {}
+    client._ip = 'fd00::2'
+    client._find_manager_resource = lambda: '/redfish/v1/Managers/1'
+    client._get_bmc_type = lambda: 'XCC'
+    media = {'@odata.id': '/redfish/v1/Managers/1/VirtualMedia/EXT1', 'Id': 'EXT1', 'ImageName': None}
+    client._get_collection = lambda url: {'ret': True, 'entries': [media]}
+    client.patched = []
+    client.patch = lambda url, body=None: client.patched.append(body) or response
+    return client, media
+
+
+def test_media_is_served_until_unmounted(image):
+    image_server = FakeImageServer()
+    client, media = make_manager_client(image_server, Response(204))
+    result = client.lenovo_mount_virtual_media(image.name, 'HTTP', None, str(image.parent))
+    assert result['ret'] is True, result
+    assert client.patched[0]['Image'] == 'http://[fd00::1]:8081/images/0123456789abcdef/' + image.name
+    assert image_server.published == [str(image)]
+    media['ImageName'] = image.name
+    result = client.lenovo_umount_virtual_media(image.name)
+    assert result['ret'] is True, result
+    assert image_server.published == []
+
+
+def test_media_is_unpublished_when_mount_fails(image):
+    image_server = FakeImageServer()
+    client, media = make_manager_client(image_server, Response(400))
+    result = client.lenovo_mount_virtual_media(image.name, 'HTTP', None, str(image.parent))
+    assert result['ret'] is False
+    assert image_server.published == []
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+import requests
+import urllib3.filepost
+from requests.models import RequestEncodingMixin
+
+from lenovo_redfish_library import multipart_upload
+from lenovo_redfish_library.multipart_upload import MultipartEncoder, post_multipart
+
+BOUNDARY = 'b0a4c1e2d3f40516273849a0b1c2d3e4'
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / 'lnvgy_fw_xcc.uxz'
+    path.write_bytes(bytes(range(256)) * 1000 + b'tail')
+    return path
+
+
+def encode_with_requests(monkeypatch, files):
+    monkeypatch.setattr(urllib3.filepost, 'choose_boundary', lambda: BOUNDARY)
+    return RequestEncodingMixin._encode_files(files, None)
+
+
+def stream(encoder):
+    return b''.join(encoder)
+
+
+@pytest.mark.parametrize('chunk_size', [1000, 7, 10 ** 7])
+def test_image_body_matches_requests(monkeypatch, image, chunk_size):
+    with open(str(image), 'rb') as f_image:
+        body, content_type = encode_with_requests(monkeypatch, [('data-binary', (image.name, f_image, None))])
+    with open(str(image), 'rb') as f_image:
+        encoder = MultipartEncoder([('data-binary', (image.name, f_image, None))], chunk_size=chunk_size, boundary=BOUNDARY)
+        assert encoder.content_type == content_type
+        assert len(encoder) == len(body)
+        assert stream(encoder) == body
+        # Body is the same when it is sent once more, e.g. on redirect
+        assert stream(encoder) == body
+
+
+def test_parameters_and_image_body_matches_requests(monkeypatch, image):
+    parameters = json.dumps({"Targets": ["/redfish/v1/Managers/1"]}).encode('utf-8')
+    oem_parameters = json.dumps({"FlashType": "HPMFwUpdate"}).encode('utf-8')
+    with open(str(image), 'rb') as f_image:
+        files = [('UpdateParameters', ("parameters.json", parameters, 'application/json')),
+                 ('OemParameters', ("oem_parameters.json", oem_parameters, 'application/json')),
+                 ('UpdateFile', (image.name, f_image, 'multipart/form-data'))]
+        body, content_type = encode_with_requests(monkeypatch, files)
+    with open(str(image), 'rb') as f_image:
+        fields = [('UpdateParameters', ("parameters.json", parameters, 'application/json')),
+                  ('OemParameters', ("oem_parameters.json", oem_parameters, 'application/json')),
+                  ('UpdateFile', (image.name, f_image, 'multipart/form-data'))]
+        encoder = MultipartEncoder(fields, chunk_size=4096, boundary=BOUNDARY)
+        assert encoder.content_type == content_type
+        assert len(encoder) == len(body)
+        assert stream(encoder) == body
+
+
+def test_progress_reaches_total(image):
+    progress = []
+    with open(str(image), 'rb') as f_image:
+        encoder = MultipartEncoder([('data-binary', (image.name, f_image, None))], chunk_size=65536,
+                                   callback=lambda sent, total, speed: progress.append((sent, total)))
+        stream(encoder)
+    assert progress[-1] == (len(encoder), len(encoder))
+    assert [sent for sent, total in progress] == sorted(sent for sent, total in progress)
+
+
+class FakeClient(object):
+    _request_hooks = []
+
+    def _get_auth_headers(self):
+        return {'X-Auth-Token': 'token'}
+
+    def _get_verify(self):
+        return False
+
+    def _get_timeout(self):
+        return 30
+
+
+@pytest.mark.parametrize('content_type', [None, 'application/octet-stream'])
+def test_post_multipart_content_type(monkeypatch, image, content_type):
+    sent = {}
+
+    def fake_post(url, headers=None, data=None, **kwargs):
+        sent['headers'] = headers
+        sent['body'] = stream(data)
+        sent['encoder'] = data
+        return 'response'
+
+    monkeypatch.setattr(multipart_upload.requests, 'post', fake_post)
+    with open(str(image), 'rb') as f_image:
+        response = post_multipart(FakeClient(), 'https://bmc/upload', [('data-binary', (image.name, f_image, None))],
+                                  content_type=content_type)
+    assert response == 'response'
+    assert sent['headers']['X-Auth-Token'] == 'token'
+    assert sent['headers']['Content-Type'] == (content_type or sent['encoder'].content_type)
+    # Body is multipart in both cases
+    assert sent['body'].startswith(b'--' + sent['encoder']._boundary.encode('ascii') + b'\r\n')
+    assert len(sent['body']) == len(sent['encoder'])
@@ -0,0 +1,129 @@
+import pytest
+import requests
+
+from lenovo_redfish_library import rate_limit
+from lenovo_redfish_library.rate_limit import CircuitBreaker, CircuitOpen, HostGuard, TokenBucket, get_connection_failure
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, 'time', clock.time)
+    return clock
+
+
+def test_token_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(2, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.now += 10
+    # Tokens are refilled up to burst only
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_token_bucket_default_burst(clock):
+    bucket = TokenBucket(1.5)
+    assert [bucket.reserve() for _ in range(2)] == [0, 0]
+    assert bucket.reserve() > 0
+
+
+def test_breaker_opens_after_failures(clock):
+    breaker = CircuitBreaker(failures=3, reset_time=30)
+    for _ in range(2):
+        breaker.allow('10.0.0.1')
+        breaker.record_failure()
+    assert breaker.get_state() == CircuitBreaker.CLOSED
+    assert breaker.is_failing()
+    breaker.allow('10.0.0.1')
+    breaker.record_failure()
+    assert breaker.get_state() == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.allow('10.0.0.1')
+
+
+def test_breaker_success_resets_count(clock):
+    breaker = CircuitBreaker(failures=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.get_state() == CircuitBreaker.CLOSED
+
+
+def test_breaker_half_open_probe(clock):
+    breaker = CircuitBreaker(failures=1, reset_time=30)
+    breaker.record_failure()
+    clock.now += 31
+    breaker.allow('10.0.0.1')
+    assert breaker.get_state() == CircuitBreaker.HALF_OPEN
+    # Only one request probes the bmc
+    with pytest.raises(CircuitOpen):
+        breaker.allow('10.0.0.1')
+    breaker.record_failure()
+    assert breaker.get_state() == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.allow('10.0.0.1')
+    clock.now += 31
+    breaker.allow('10.0.0.1')
+    breaker.record_success()
+    assert breaker.get_state() == CircuitBreaker.CLOSED
+    breaker.allow('10.0.0.1')
+    breaker.allow('10.0.0.1')
+
+
+def test_breaker_release_lets_another_probe(clock):
+    breaker = CircuitBreaker(failures=1, reset_time=30)
+    breaker.record_failure()
+    clock.now += 31
+    breaker.allow('10.0.0.1')
+    breaker.release()
+    breaker.allow('10.0.0.1')
+
+
+def test_breaker_disabled(clock):
+    breaker = CircuitBreaker(failures=0)
+    for _ in range(10):
+        breaker.allow('10.0.0.1')
+        breaker.record_failure()
+    assert breaker.get_state() == CircuitBreaker.CLOSED
+
+
+def test_host_guard_waits_for_retry_after(clock):
+    guard = HostGuard('10.0.0.1')
+    assert guard.get_delay() == 0
+    assert guard.record_busy('5', 1) == 5
+    assert guard.get_delay() == pytest.approx(5)
+    # No Retry-After, backoff by attempt
+    assert guard.record_busy(None, 2) == 4
+    clock.now += 6
+    assert guard.get_delay() == 0
+
+
+def test_host_guard_rate(clock):
+    guard = HostGuard('10.0.0.1')
+    guard.configure(rate=1, burst=1)
+    assert guard.get_delay() == 0
+    assert guard.get_delay() == pytest.approx(1)
+    guard.configure(rate=0)
+    assert guard.get_delay() == 0
+
+
+def test_connection_failure_is_found_in_cause():
+    error = requests.exceptions.ConnectTimeout('timed out')
+    try:
+        try:
+            raise error
+        except Exception as e:
+            raise Exception('Retries exhausted') from e
+    except Exception as wrapped:
+        assert get_connection_failure(wrapped) is error
+    assert get_connection_failure(ValueError('bad json')) is None
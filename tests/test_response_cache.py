@@ -0,0 +1,99 @@
+import time
+
+from lenovo_redfish_library import response_cache
+from lenovo_redfish_library.response_cache import ResponseCache, get_resource_type
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, 'time', clock.time)
+    return ResponseCache(**kwargs), clock
+
+
+def test_resource_type():
+    assert get_resource_type({'@odata.type': '#Power.v1_5_0.Power'}) == 'Power'
+    assert get_resource_type({}) == ''
+    assert get_resource_type(None) == ''
+
+
+def test_fresh_until_ttl(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=30)
+    cache.put('/redfish/v1/Systems/1/', {'Id': '1'}, headers={'ETag': 'W/"1"'})
+    found = cache.lookup('/redfish/v1/Systems/1')
+    assert found == {'entries': {'Id': '1'}, 'headers': {'ETag': 'W/"1"'}, 'etag': None, 'fresh': True}
+    # Caller gets its own copy
+    found['entries']['Id'] = '2'
+    assert cache.lookup('/redfish/v1/Systems/1')['entries'] == {'Id': '1'}
+    clock.now += 31
+    assert cache.lookup('/redfish/v1/Systems/1') is None
+    assert cache.get_stats()['Hits'] == 2
+    assert cache.get_stats()['Misses'] == 1
+
+
+def test_ttl_of_resource_type(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=30, ttls={'Chassis': 100})
+    cache.put('/redfish/v1/Chassis/1/Power', {'@odata.type': '#Power.v1_5_0.Power'})
+    cache.put('/redfish/v1/Chassis/1', {'@odata.type': '#Chassis.v1_10_0.Chassis'})
+    cache.put('/redfish/v1/TaskService/Tasks/1', {'@odata.type': '#Task.v1_4_0.Task'})
+    assert cache.lookup('/redfish/v1/TaskService/Tasks/1') is None
+    clock.now += 6
+    assert cache.lookup('/redfish/v1/Chassis/1/Power') is None
+    clock.now += 60
+    assert cache.lookup('/redfish/v1/Chassis/1')['fresh'] is True
+
+
+def test_expired_with_etag_is_revalidated(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=10)
+    cache.put('/redfish/v1/Systems/1', {'Id': '1'}, etag='W/"1"')
+    clock.now += 11
+    found = cache.lookup('/redfish/v1/Systems/1')
+    assert found['fresh'] is False
+    assert found['etag'] == 'W/"1"'
+    # bmc returns 304 Not Modified
+    cache.refresh('/redfish/v1/Systems/1')
+    assert cache.lookup('/redfish/v1/Systems/1')['fresh'] is True
+    assert cache.get_stats()['Revalidated'] == 1
+
+
+def test_task_with_etag_is_always_revalidated(monkeypatch):
+    cache, clock = make_cache(monkeypatch)
+    cache.put('/redfish/v1/TaskService/Tasks/1', {'@odata.type': '#Task.v1_4_0.Task'}, etag='"a"')
+    assert cache.lookup('/redfish/v1/TaskService/Tasks/1')['fresh'] is False
+
+
+def test_invalidate(monkeypatch):
+    cache, clock = make_cache(monkeypatch)
+    for uri in ['/redfish/v1/Systems/1', '/redfish/v1/Systems/1/Bios', '/redfish/v1/Systems/1?$expand=*',
+                '/redfish/v1/Systems/10', '/redfish/v1/Managers/1']:
+        cache.put(uri, {'Id': uri})
+    cache.invalidate('/redfish/v1/Systems/1/Actions/ComputerSystem.Reset')
+    assert cache.lookup('/redfish/v1/Systems/1') is None
+    assert cache.lookup('/redfish/v1/Systems/1/Bios') is None
+    assert cache.lookup('/redfish/v1/Systems/1?$expand=*') is None
+    assert cache.lookup('/redfish/v1/Systems/10') is not None
+    assert cache.lookup('/redfish/v1/Managers/1') is not None
+
+
+def test_least_recently_used_dropped(monkeypatch):
+    size = len('{"Id": "a", "Data": "%s"}' % ('x' * 100))
+    cache, clock = make_cache(monkeypatch, max_bytes=size * 2)
+    cache.put('/a', {'Id': 'a', 'Data': 'x' * 100})
+    cache.put('/b', {'Id': 'b', 'Data': 'x' * 100})
+    cache.lookup('/a')
+    cache.put('/c', {'Id': 'c', 'Data': 'x' * 100})
+    assert cache.lookup('/b') is None
+    assert cache.lookup('/a') is not None
+    assert cache.lookup('/c') is not None
+    assert cache.get_stats()['Bytes'] == size * 2
+    # Resource bigger than the whole cache is not kept
+    cache.put('/d', {'Data': 'x' * size * 3})
+    assert cache.lookup('/d') is None
+    assert cache.get_stats()['Entries'] == 2
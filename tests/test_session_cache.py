@@ -0,0 +1,90 @@
+import os
+import json
+import stat
+
+import pytest
+
+from lenovo_redfish_library import utils
+from lenovo_redfish_library.session_cache import SessionCache
+
+pytest.importorskip('cryptography')
+
+
+def test_save_and_load(tmp_path):
+    cache = SessionCache(str(tmp_path / 'sessions.json'))
+    cache.save('10.0.0.1', 'USERID', 'PASSW0RD', 'session', 'token-1', '/redfish/v1/SessionService/Sessions/1')
+    cache.save('10.0.0.2', 'USERID', 'PASSW0RD', 'session', 'token-2', '/redfish/v1/SessionService/Sessions/2')
+    assert cache.load('10.0.0.1', 'USERID', 'PASSW0RD', 'session') == ('token-1', '/redfish/v1/SessionService/Sessions/1')
+    assert SessionCache(str(tmp_path / 'sessions.json')).load('10.0.0.2', 'USERID', 'PASSW0RD', 'session') == \
+        ('token-2', '/redfish/v1/SessionService/Sessions/2')
+
+
+def test_token_is_encrypted(tmp_path):
+    cache_file = tmp_path / 'sessions.json'
+    cache = SessionCache(str(cache_file))
+    cache.save('10.0.0.1', 'USERID', 'PASSW0RD', 'session', 'token-1', '/redfish/v1/SessionService/Sessions/1')
+    content = cache_file.read_text()
+    for plain in ['token-1', 'Sessions/1', '10.0.0.1', 'USERID', 'PASSW0RD']:
+        assert plain not in content
+    assert len(json.loads(content)) == 1
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='permission bits are only checked on posix')
+def test_file_is_created_private(tmp_path, monkeypatch):
+    cache_file = tmp_path / 'sessions.json'
+    # Stale temporary file of a crashed run, readable by others
+    tmp_file = tmp_path / ('sessions.json.%s.tmp' % os.getpid())
+    tmp_file.write_text('{}')
+    os.chmod(str(tmp_file), 0o644)
+    modes = []
+    replace = os.replace
+
+    def check_replace(source, target):
+        # File is private before it gets its name
+        modes.append(stat.S_IMODE(os.stat(source).st_mode))
+        replace(source, target)
+
+    monkeypatch.setattr(utils.os, 'replace', check_replace)
+    old_umask = os.umask(0)
+    try:
+        cache = SessionCache(str(cache_file))
+        cache.save('10.0.0.1', 'USERID', 'PASSW0RD', 'session', 'token-1', '/redfish/v1/SessionService/Sessions/1')
+        cache.save('10.0.0.2', 'USERID', 'PASSW0RD', 'session', 'token-2', '/redfish/v1/SessionService/Sessions/2')
+        cache.remove('10.0.0.1', 'USERID', 'session')
+    finally:
+        os.umask(old_umask)
+    assert modes == [0o600] * 3
+    assert stat.S_IMODE(os.stat(str(cache_file)).st_mode) == 0o600
+
+
+def test_other_password_or_user_is_not_loaded(tmp_path):
+    cache = SessionCache(str(tmp_path / 'sessions.json'))
+    cache.save('10.0.0.1', 'USERID', 'PASSW0RD', 'session', 'token-1', '/redfish/v1/SessionService/Sessions/1')
+    assert cache.load('10.0.0.1', 'USERID', 'other', 'session') is None
+    assert cache.load('10.0.0.1', 'admin', 'PASSW0RD', 'session') is None
+    assert cache.load('10.0.0.1', 'USERID', 'PASSW0RD', 'basic') is None
+
+
+def test_broken_entry_is_not_loaded(tmp_path):
+    cache_file = tmp_path / 'sessions.json'
+    cache = SessionCache(str(cache_file))
+    cache.save('10.0.0.1', 'USERID', 'PASSW0RD', 'session', 'token-1', '/redfish/v1/SessionService/Sessions/1')
+    sessions = json.loads(cache_file.read_text())
+    for entry in sessions.values():
+        entry['token'] = entry['token'][:-4] + 'AAAA'
+    cache_file.write_text(json.dumps(sessions))
+    assert cache.load('10.0.0.1', 'USERID', 'PASSW0RD', 'session') is None
+
+
+def test_remove(tmp_path):
+    cache = SessionCache(str(tmp_path / 'sessions.json'))
+    cache.save('10.0.0.1', 'USERID', 'PASSW0RD', 'session', 'token-1', '/redfish/v1/SessionService/Sessions/1')
+    cache.remove('10.0.0.1', 'USERID', 'session')
+    assert cache.load('10.0.0.1', 'USERID', 'PASSW0RD', 'session') is None
+
+
+def test_disabled_by_empty_file():
+    cache = SessionCache('')
+    assert not cache.is_enabled()
+    cache.save('10.0.0.1', 'USERID', 'PASSW0RD', 'session', 'token-1', '/redfish/v1/SessionService/Sessions/1')
+    assert cache.load('10.0.0.1', 'USERID', 'PASSW0RD', 'session') is None
@@ -0,0 +1,78 @@
+import time
+import threading
+
+from lenovo_redfish_library.redfish_base import RedfishBase
+
+
+class Response(object):
+    def __init__(self, status):
+        self.status = status
+
+
+class FakeBmc(object):
+    """Bmc accepting only the newest session"""
+
+    def __init__(self, threads):
+        self.valid_key = 'session-2'
+        self.sessions_created = 0
+        self.lock = threading.Lock()
+        # All threads are rejected with the old session before any of them renews it
+        self.barrier = threading.Barrier(threads)
+
+
+def make_client(bmc):
+    client = RedfishBase.__new__(RedfishBase)
+    client._auth = 'session'
+    client._ip = '10.0.0.1'
+    client._shared_session = None
+    client._auth_thread = None
+    client._auth_lock = threading.Lock()
+    state = {'key': 'session-1'}
+    client.get_session_key = lambda: state['key']
+
+    def send(path, *args, **kwargs):
+        key = state['key']
+        if key != bmc.valid_key:
+            if key == 'session-1':
+                bmc.barrier.wait(5)
+            return Response(401)
+        return Response(200)
+
+    def renew():
+        state['key'] = None
+        # Login takes a while, other threads must wait for it instead of logging in too
+        time.sleep(0.05)
+        with bmc.lock:
+            bmc.sessions_created += 1
+            bmc.valid_key = 'session-%s' % (bmc.sessions_created + 1)
+        state['key'] = bmc.valid_key
+
+    client._send_guarded_request = send
+    client._renew_session = renew
+    return client, state
+
+
+def test_concurrent_401_renews_session_once():
+    bmc = FakeBmc(8)
+    client, state = make_client(bmc)
+    statuses = []
+
+    def worker():
+        statuses.append(client._send_authenticated_request('/redfish/v1/Systems/1').status)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert bmc.sessions_created == 1
+    assert statuses == [200] * 8
+    assert state['key'] == 'session-2'
+
+
+def test_401_of_login_request_is_returned():
+    bmc = FakeBmc(1)
+    client, state = make_client(bmc)
+    client._auth_thread = threading.get_ident()
+    assert client._send_authenticated_request('/redfish/v1/SessionService/Sessions').status == 401
+    assert bmc.sessions_created == 0
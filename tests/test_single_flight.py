@@ -0,0 +1,85 @@
+import time
+import threading
+
+from lenovo_redfish_library.single_flight import SingleFlight
+
+
+def run_concurrently(flight, key, function, count):
+    results = [None] * count
+    errors = [None] * count
+
+    def worker(index):
+        try:
+            results[index] = flight.do(key, function)
+        except Exception as e:
+            errors[index] = e
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(flight, key, count):
+    for _ in range(500):
+        if flight._calls[key].waiters >= count:
+            return
+        time.sleep(0.01)
+    raise AssertionError("Threads are not waiting for the call.")
+
+
+def test_concurrent_calls_run_once():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def function():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'ret': True, 'entries': {'Members': []}}
+
+    leader, results, errors = run_concurrently(flight, '/redfish/v1/Systems', function, 1)
+    started.wait(5)
+    waiters, waiter_results, waiter_errors = run_concurrently(flight, '/redfish/v1/Systems', function, 4)
+    wait_for_waiters(flight, '/redfish/v1/Systems', 4)
+    release.set()
+    for thread in leader + waiters:
+        thread.join(5)
+    assert len(calls) == 1
+    assert flight.get_stats() == {'Executed': 1, 'Coalesced': 4}
+    assert all(result == results[0] for result in waiter_results)
+    # Each thread has its own copy of the result
+    waiter_results[0]['entries']['Members'].append('x')
+    assert results[0]['entries']['Members'] == []
+    assert waiter_results[1]['entries']['Members'] == []
+
+
+def test_error_is_raised_in_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def function():
+        started.set()
+        release.wait(5)
+        raise ValueError('bmc is not reachable')
+
+    leader, results, errors = run_concurrently(flight, 'key', function, 1)
+    started.wait(5)
+    waiters, waiter_results, waiter_errors = run_concurrently(flight, 'key', function, 2)
+    wait_for_waiters(flight, 'key', 2)
+    release.set()
+    for thread in leader + waiters:
+        thread.join(5)
+    assert isinstance(errors[0], ValueError)
+    assert all(isinstance(error, ValueError) for error in waiter_errors)
+
+
+def test_later_calls_run_again():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == 1
+    assert flight.do('key', lambda: 2) == 2
+    assert flight.get_stats() == {'Executed': 2, 'Coalesced': 0}
+    assert flight._calls == {}
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+import requests
+
+from lenovo_redfish_library.multipart_upload import MultipartEncoder
+from lenovo_redfish_library.upload_receiver import UploadReceiver, _MultipartReader
+
+BOUNDARY = '7d3a1f2e4b5c6d7e'
+# Image contains a line which looks like the delimiter but is not
+IMAGE = os.urandom(100 * 1024) + b'\r\n--' + BOUNDARY[:-1].encode('ascii') + b'-tail'
+
+
+def body_of(fields):
+    return b''.join(MultipartEncoder(fields, boundary=BOUNDARY))
+
+
+def split(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def read_parts(chunks):
+    return [(headers, b''.join(data)) for headers, data in _MultipartReader(chunks, BOUNDARY).parts()]
+
+
+@pytest.mark.parametrize('size', [1, 7, 4096, 10 ** 6])
+def test_reader_parts(size):
+    body = body_of([('parameters', ('parameters.json', b'{"Targets": []}', 'application/json')),
+                    ('file', ('ffdc.tgz', IMAGE, None))])
+    parts = read_parts(split(body, size))
+    assert [data for headers, data in parts] == [b'{"Targets": []}', IMAGE]
+    assert parts[0][0] == {'content-disposition': 'form-data; name="parameters"; filename="parameters.json"',
+                           'content-type': 'application/json'}
+
+
+def test_reader_skips_parts_not_read():
+    body = body_of([('a', ('a.bin', b'a' * 1000, None)), ('b', ('b.bin', b'b' * 10, None))])
+    names = [headers['content-disposition'] for headers, data in _MultipartReader(split(body, 100), BOUNDARY).parts()]
+    assert len(names) == 2
+
+
+def test_reader_truncated_body():
+    body = body_of([('file', ('ffdc.tgz', IMAGE, None))])
+    with pytest.raises(Exception, match='truncated'):
+        read_parts(split(body[:len(body) // 2], 4096))
+
+
+@pytest.fixture
+def receiver(tmp_path):
+    receiver = UploadReceiver(str(tmp_path / 'upload'), port=0, host='127.0.0.1')
+    receiver.start()
+    yield receiver
+    receiver.stop()
+
+
+def test_receive_multipart_upload(receiver):
+    slot = receiver.register('127.0.0.1')
+    url = 'http://127.0.0.1:%s/%s/' % (receiver.get_port(), slot.folder)
+    encoder = MultipartEncoder([('file', ('../ffdc 1.tgz', IMAGE, None))], chunk_size=4096)
+    response = requests.post(url, data=encoder, headers={'Content-Type': encoder.content_type})
+    assert response.status_code == 201
+    assert slot.wait(5)
+    files = slot.get_files()
+    assert [os.path.basename(path) for path in files] == ['ffdc_1.tgz']
+    with open(files[0], 'rb') as f:
+        assert f.read() == IMAGE
+
+
+def test_receive_put_upload(receiver):
+    slot = receiver.register('127.0.0.1')
+    url = 'http://127.0.0.1:%s/%s/backup.json' % (receiver.get_port(), slot.folder)
+    response = requests.put(url, data=iter([b'{"a":', b' 1}']))
+    assert response.status_code == 201
+    with open(slot.get_files()[0], 'rb') as f:
+        assert f.read() == b'{"a": 1}'
+
+
+def test_unregistered_folder_is_rejected(receiver):
+    slot = receiver.register('127.0.0.1')
+    slot.close()
+    url = 'http://127.0.0.1:%s/%s/backup.json' % (receiver.get_port(), slot.folder)
+    assert requests.put(url, data=b'data').status_code == 404
+    assert not slot.is_received()